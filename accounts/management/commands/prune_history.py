@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import retention
+
+
+class Command(BaseCommand):
+    help = 'Delete old notifications, login history and finished tasks per RETENTION_POLICIES'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--policy', action='append', dest='policies',
+                            help='Only run this policy (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows per delete transaction')
+        parser.add_argument('--archive', action='store_true',
+                            help='Write deleted rows to gzip JSON lines under RETENTION_ARCHIVE_DIR first')
+        parser.add_argument('--archive-dir', default=None, help='Override RETENTION_ARCHIVE_DIR')
+        parser.add_argument('--pause', type=float, default=0,
+                            help='Seconds to sleep between batches')
+        parser.add_argument('--dry-run', action='store_true', help='Only count what would be deleted')
+
+    def handle(self, *args, **options):
+        try:
+            policies = retention.policies(options['policies'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        archive_dir = None
+        if options['archive'] or options['archive_dir']:
+            archive_dir = options['archive_dir'] or settings.RETENTION_ARCHIVE_DIR
+
+        total_rows = 0
+        total_time = 0.0
+        for policy in policies:
+            report = retention.prune(
+                policy,
+                batch_size=options['batch_size'],
+                archive_dir=archive_dir,
+                dry_run=options['dry_run'],
+                pause=options['pause'],
+            )
+            total_rows += report.deleted
+            total_time += report.elapsed
+            if options['dry_run']:
+                line = f"{report.name}: {report.deleted} row(s) would be deleted"
+            else:
+                line = (
+                    f"{report.name}: {report.deleted} row(s) deleted "
+                    f"in {report.batches} batch(es), {report.elapsed:.2f}s"
+                )
+            if report.archive:
+                line += f" -> {report.archive}"
+            self.stdout.write(line)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Total: {total_rows} row(s) {'to reclaim' if options['dry_run'] else 'reclaimed'} in {total_time:.2f}s"
+        ))
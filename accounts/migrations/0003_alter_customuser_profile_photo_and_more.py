@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:49
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_customuser_accounts_cu_is_appr_65d03b_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customuser',
+            name='profile_photo',
+            field=models.ImageField(blank=True, null=True, storage=core.storage.get_storage, upload_to='profile_photos/'),
+        ),
+        migrations.AlterField(
+            model_name='customuser',
+            name='verification_document',
+            field=models.FileField(blank=True, null=True, storage=core.storage.get_storage, upload_to='verification_docs/'),
+        ),
+    ]
@@ -5,6 +5,8 @@ from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
+from core.storage import get_storage
+
 
 class CustomUser(AbstractUser):
     """Custom user model with additional fields"""
@@ -18,8 +20,8 @@ class CustomUser(AbstractUser):
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='resident')
     phone_number = models.CharField(max_length=20, blank=True)
     address = models.TextField(blank=True)
-    profile_photo = models.ImageField(upload_to='profile_photos/', blank=True, null=True)
-    verification_document = models.FileField(upload_to='verification_docs/', blank=True, null=True)
+    profile_photo = models.ImageField(upload_to='profile_photos/', storage=get_storage, blank=True, null=True)
+    verification_document = models.FileField(upload_to='verification_docs/', storage=get_storage, blank=True, null=True)
     
     # Approval status
     is_approved = models.BooleanField(default=False)
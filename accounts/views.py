@@ -5,16 +5,18 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, logout, authenticate, update_session_auth_hash
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse
 from django.utils.translation import gettext as _
 from django.utils import timezone
 from django.db.models import Q, Count
 from django.core.paginator import Paginator
+from core import media
 from .models import CustomUser, LoginHistory, ResidencyValidation
 from .forms import (
     UserRegistrationForm, UserProfileForm, ChangePasswordForm,
     UserApprovalForm, ResidencyValidationForm
 )
+import os
 import random
 
 
@@ -260,8 +262,9 @@ def view_single_document(request, user_id):
     user = get_object_or_404(CustomUser, id=user_id)
     
     if user.verification_document:
-        # Serve the file
-        return HttpResponse(user.verification_document.read(), content_type='application/pdf')
+        # Optimized: stream with Range/ETag support instead of reading it into memory
+        extension = os.path.splitext(user.verification_document.name)[1]
+        return media.serve(request, user.verification_document, filename=f'verification-{user.username}{extension}')
     
     messages.error(request, _('Document not found.'))
     return redirect('accounts:view_user_documents', user_id=user_id)
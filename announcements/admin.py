@@ -2,7 +2,7 @@
 Announcements admin
 """
 from django.contrib import admin
-from .models import Announcement, AnnouncementNotification
+from .models import Announcement, AnnouncementFanout, AnnouncementNotification
 
 
 @admin.register(Announcement)
@@ -20,3 +20,11 @@ class AnnouncementNotificationAdmin(admin.ModelAdmin):
     search_fields = ['announcement__title', 'user__username']
     readonly_fields = ['sent_at', 'read_at']
 
+
+
+@admin.register(AnnouncementFanout)
+class AnnouncementFanoutAdmin(admin.ModelAdmin):
+    list_display = ['announcement', 'status', 'processed', 'total', 'updated_at', 'finished_at']
+    list_filter = ['status']
+    search_fields = ['announcement__title']
+    readonly_fields = ['cursor', 'processed', 'total', 'last_error', 'created_at', 'updated_at', 'finished_at']
@@ -0,0 +1,140 @@
+"""
+Chunked, resumable delivery of announcement notifications
+
+Publishing an announcement only records an ``AnnouncementFanout`` job and
+queues a task for it; a worker (``manage.py run_worker``) writes the
+notifications. Residents are streamed in primary-key order and every batch
+(announcement notifications, general notifications, inbox counters and the
+job cursor) is committed in one transaction. A crash therefore loses at most the batch in
+flight, and a restart continues after the last committed resident without
+creating duplicates.
+
+A failed batch makes the task retry with backoff; jobs can also be resumed
+by hand with ``manage.py resume_announcement_fanouts``.
+"""
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.translation import gettext as _
+
+from accounts.models import CustomUser
+from notifications import counters
+from notifications.models import Notification
+from taskqueue.queue import enqueue
+
+from .models import AnnouncementFanout, AnnouncementNotification
+
+STALE_AFTER = timedelta(minutes=5)  # A running job without progress for this long is taken over
+
+
+def residents():
+    """Approved residents who accept in-app announcement notifications"""
+    return CustomUser.objects.filter(is_approved=True, role='resident').exclude(
+        notification_preferences__app_announcements=False
+    )
+
+
+def batch_size():
+    return getattr(settings, 'ANNOUNCEMENT_FANOUT_BATCH_SIZE', 500)
+
+
+def schedule(announcement):
+    """Record a fan-out job and queue it in the current transaction"""
+    fanout, created = AnnouncementFanout.objects.get_or_create(
+        announcement=announcement,
+        defaults={'total': residents().count()},
+    )
+    if created:
+        enqueue(run, args=[fanout.pk], queue='notifications')
+    return fanout
+
+
+def claim(fanout_id, stale_after=STALE_AFTER):
+    """Mark a job running unless another worker is actively processing it"""
+    now = timezone.now()
+    return AnnouncementFanout.objects.filter(pk=fanout_id).filter(
+        Q(status__in=['pending', 'failed']) | Q(status='running', updated_at__lt=now - stale_after)
+    ).update(status='running', updated_at=now, last_error='') == 1
+
+
+def run(fanout_id, size=None, stale_after=STALE_AFTER):
+    """
+    Deliver the remaining notifications of a job; returns False if it was not claimed.
+
+    Errors are recorded on the job and re-raised so the task queue retries.
+    """
+    if not claim(fanout_id, stale_after):
+        return False
+    fanout = AnnouncementFanout.objects.select_related('announcement').get(pk=fanout_id)
+    size = size or batch_size()
+    try:
+        pending = (
+            residents()
+            .filter(pk__gt=fanout.cursor)
+            .order_by('pk')
+            .values_list('pk', flat=True)
+            .iterator(chunk_size=size)
+        )
+        while True:
+            user_ids = list(islice(pending, size))
+            if not user_ids:
+                break
+            _deliver_batch(fanout, user_ids)
+    except Exception as exc:
+        AnnouncementFanout.objects.filter(pk=fanout_id).update(
+            status='failed', last_error=str(exc), updated_at=timezone.now()
+        )
+        raise
+
+    AnnouncementFanout.objects.filter(pk=fanout_id).update(
+        status='done', finished_at=timezone.now(), updated_at=timezone.now()
+    )
+    return True
+
+
+def _deliver_batch(fanout, user_ids):
+    announcement = fanout.announcement
+    with transaction.atomic():
+        AnnouncementNotification.objects.bulk_create(
+            [AnnouncementNotification(announcement=announcement, user_id=user_id) for user_id in user_ids],
+            ignore_conflicts=True,
+        )
+        Notification.objects.bulk_create([
+            Notification(
+                user_id=user_id,
+                title=_('New Announcement'),
+                message=f'{announcement.title}',
+                notification_type='announcement',
+                link=f'/announcements/{announcement.id}/',
+            )
+            for user_id in user_ids
+        ])
+        counters.adjust(
+            residents().filter(pk__in=user_ids).values('pk'),
+            unread_notifications=1,
+            total_notifications=1,
+        )
+        # Advancing the cursor in the same transaction is what makes a resume
+        # skip exactly the residents that were already notified
+        AnnouncementFanout.objects.filter(pk=fanout.pk).update(
+            cursor=user_ids[-1],
+            processed=F('processed') + len(user_ids),
+            updated_at=timezone.now(),
+        )
+
+
+def resume_unfinished(size=None, stale_after=STALE_AFTER):
+    """Run every job that is pending, failed or stuck; returns how many were claimed"""
+    resumed = 0
+    for fanout_id in AnnouncementFanout.objects.exclude(status='done').values_list('pk', flat=True):
+        try:
+            claimed = run(fanout_id, size=size, stale_after=stale_after)
+        except Exception:
+            # Recorded on the job; keep going with the others
+            claimed = True
+        resumed += claimed
+    return resumed
@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from announcements import fanout
+from announcements.models import AnnouncementFanout
+
+
+class Command(BaseCommand):
+    help = 'Finish announcement notification fan-outs that were interrupted or failed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Residents per transaction (default: ANNOUNCEMENT_FANOUT_BATCH_SIZE)')
+        parser.add_argument('--stale-after', type=int, default=int(fanout.STALE_AFTER.total_seconds()),
+                            help='Seconds without progress before a running job is taken over')
+
+    def handle(self, *args, **options):
+        resumed = fanout.resume_unfinished(
+            size=options['batch_size'],
+            stale_after=timedelta(seconds=options['stale_after']),
+        )
+        self.stdout.write(self.style.SUCCESS(f'Resumed {resumed} fan-out job(s)'))
+
+        failed = AnnouncementFanout.objects.filter(status='failed').select_related('announcement')
+        for job in failed:
+            self.stdout.write(self.style.ERROR(f'{job.announcement.title}: {job.last_error}'))
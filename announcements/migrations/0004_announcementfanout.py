@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('announcements', '0003_announcement_announcemen_status_f6c2cd_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnnouncementFanout',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('cursor', models.BigIntegerField(default=0)),
+                ('total', models.IntegerField(default=0)),
+                ('processed', models.IntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('announcement', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='fanout', to='announcements.announcement')),
+            ],
+            options={
+                'verbose_name': 'Announcement Fan-out',
+                'verbose_name_plural': 'Announcement Fan-outs',
+                'indexes': [models.Index(fields=['status', 'updated_at'], name='announcemen_status_2da334_idx')],
+            },
+        ),
+    ]
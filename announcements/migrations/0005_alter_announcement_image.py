@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:49
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('announcements', '0004_announcementfanout'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='announcement',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=core.storage.get_storage, upload_to='announcement_images/'),
+        ),
+    ]
@@ -4,6 +4,7 @@ Announcements models
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 from accounts.models import CustomUser
+from core.storage import get_storage
 
 
 class Announcement(models.Model):
@@ -54,7 +55,7 @@ class Announcement(models.Model):
     view_count = models.IntegerField(default=0)
     
     # Attachments
-    image = models.ImageField(upload_to='announcement_images/', blank=True, null=True)
+    image = models.ImageField(upload_to='announcement_images/', storage=get_storage, blank=True, null=True)
     
     class Meta:
         verbose_name = _('Announcement')
@@ -86,3 +87,44 @@ class AnnouncementNotification(models.Model):
     def __str__(self):
         return f"{self.announcement.title} → {self.user.username}"
 
+
+
+class AnnouncementFanout(models.Model):
+    """Progress of delivering an announcement's notifications to every resident"""
+
+    STATUS_CHOICES = [
+        ('pending', _('Pending')),
+        ('running', _('Running')),
+        ('done', _('Done')),
+        ('failed', _('Failed')),
+    ]
+
+    announcement = models.OneToOneField(Announcement, on_delete=models.CASCADE, related_name='fanout')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+
+    # Residents are processed in primary-key order; ``cursor`` is the last one
+    # whose notifications were committed, so a restart continues after it
+    cursor = models.BigIntegerField(default=0)
+    total = models.IntegerField(default=0)
+    processed = models.IntegerField(default=0)
+
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('Announcement Fan-out')
+        verbose_name_plural = _('Announcement Fan-outs')
+        indexes = [
+            models.Index(fields=['status', 'updated_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.announcement.title} ({self.processed}/{self.total})"
+
+    @property
+    def percent(self):
+        if not self.total:
+            return 100 if self.status == 'done' else 0
+        return min(100, int(self.processed * 100 / self.total))
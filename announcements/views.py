@@ -3,16 +3,23 @@ Announcements app views
 """
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.conf import settings
 from django.contrib import messages
 from django.http import JsonResponse
-from django.utils.translation import gettext as _
+from django.utils.translation import gettext as _, ngettext
 from django.utils import timezone
 from django.db.models import Q
 from django.core.paginator import Paginator
 from .models import Announcement, AnnouncementNotification
 from .forms import AnnouncementForm
+from . import fanout
+from core import viewcounts
+from core.pagecache import cache_anonymous
+from notifications import broadcasts, counters, dispatch
+from notifications.models import BroadcastNotification
 
 
+@cache_anonymous('announcements.Announcement')
 def announcement_list(request):
     """Public announcements (approved, published, unexpired)"""
     # Optimized: Add select_related to avoid N+1 queries
@@ -38,6 +45,7 @@ def announcement_list(request):
     paginator = Paginator(announcements, 10)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
+    page_obj.object_list = viewcounts.attach_pending(page_obj.object_list)
     
     context = {
         'page_obj': page_obj,
@@ -48,13 +56,17 @@ def announcement_list(request):
     return render(request, 'announcements/announcement_list.html', context)
 
 
+def _count_cached_view(request, pk):
+    viewcounts.record_view(Announcement(pk=pk), request)
+
+
+@cache_anonymous('announcements.Announcement', on_hit=_count_cached_view)
 def announcement_detail(request, pk):
     """Announcement detail with view counter"""
     announcement = get_object_or_404(Announcement, pk=pk)
     
-    # Increment view count
-    announcement.view_count += 1
-    announcement.save(update_fields=['view_count'])
+    # Optimized: buffered in the cache, written in batches (no row write per view)
+    viewcounts.record_view(announcement, request)
     
     return render(request, 'announcements/announcement_detail.html', {'announcement': announcement})
 
@@ -84,7 +96,7 @@ def create_announcement(request):
             # Notify all residents
             notify_all_residents_about_announcement(announcement)
             
-            messages.success(request, _('Announcement created and published successfully!'))
+            messages.success(request, _('Announcement created and published successfully! Residents are being notified in the background.'))
             return redirect('announcements:announcement_detail', pk=announcement.pk)
     else:
         form = AnnouncementForm()
@@ -129,7 +141,7 @@ def manage_announcements(request):
         return redirect('announcements:announcement_list')
     
     # Optimized: Add select_related to avoid N+1 queries
-    announcements = Announcement.objects.select_related('created_by', 'approved_by').order_by('-created_at')
+    announcements = Announcement.objects.select_related('created_by', 'approved_by', 'fanout').order_by('-created_at')
     
     # Filter by status
     status = request.GET.get('status')
@@ -229,10 +241,25 @@ def delete_announcement(request, pk):
 @login_required
 def my_notifications(request):
     """User's announcement notifications (mark read on view)"""
-    notifications = AnnouncementNotification.objects.filter(user=request.user).select_related('announcement')
-    
-    # Mark all as read
-    notifications.filter(is_read=False).update(is_read=True, read_at=timezone.now())
+    if settings.ANNOUNCEMENT_DELIVERY == 'fanout':
+        notifications = AnnouncementNotification.objects.filter(user=request.user).select_related('announcement')
+        
+        # Mark all as read
+        notifications.filter(is_read=False).update(is_read=True, read_at=timezone.now())
+    else:
+        # Announcement broadcasts, with read state from the user's watermark
+        counter = counters.get_counter(request.user)
+        announcement_broadcasts = broadcasts.visible(request.user, counter).filter(announcement__isnull=False)
+        notifications = broadcasts.with_read_state(
+            announcement_broadcasts, counter
+        ).select_related('announcement')
+        
+        # Mark all as read
+        unread_ids = list(broadcasts.unread(request.user, counter).filter(
+            announcement__isnull=False
+        ).values_list('pk', flat=True))
+        if unread_ids:
+            broadcasts.mark_read(request.user, unread_ids)
     
     # Pagination
     paginator = Paginator(notifications, 20)
@@ -252,59 +279,44 @@ def create_announcement_notification(announcement, user):
 
 
 def notify_all_residents_about_announcement(announcement):
-    """Notify all residents about new announcement - optimized with bulk_create"""
-    from accounts.models import CustomUser
-    from notifications.models import Notification
-    
-    residents = CustomUser.objects.filter(is_approved=True, role='resident')
-    
-    # Optimized: Use bulk_create to avoid N+1 queries
-    announcement_notifications = []
-    general_notifications = []
-    
-    for resident in residents:
-        # Create announcement notification
-        announcement_notifications.append(
-            AnnouncementNotification(
-                announcement=announcement,
-                user=resident
-            )
-        )
-        
-        # Create general notification
-        general_notifications.append(
-            Notification(
-                user=resident,
-                title=_('New Announcement'),
-                message=f'{announcement.title}',
-                notification_type='announcement',
-                link=f'/announcements/{announcement.id}/'
-            )
-        )
-    
-    # Bulk create all notifications at once
-    if announcement_notifications:
-        AnnouncementNotification.objects.bulk_create(
-            announcement_notifications,
-            ignore_conflicts=True  # Ignore if notification already exists
-        )
-    if general_notifications:
-        Notification.objects.bulk_create(general_notifications)
+    """Notify all residents about new announcement - one broadcast row, or background fan-out"""
+    if settings.ANNOUNCEMENT_DELIVERY == 'fanout':
+        return fanout.schedule(announcement)
+    
+    if BroadcastNotification.objects.filter(announcement=announcement).exists():
+        return None
+    return broadcasts.publish(
+        title=_('New Announcement'),
+        message=f'{announcement.title}',
+        audience='residents',
+        notification_type='announcement',
+        link=f'/announcements/{announcement.id}/',
+        announcement=announcement,
+    )
+
+
+def _summarize_pending(count, actors):
+    return _('Announcements Pending Approval'), ngettext(
+        '%(count)d announcement is waiting for your approval',
+        '%(count)d announcements are waiting for your approval',
+        count,
+    ) % {'count': count}
 
 
 def notify_chairman_for_approval(announcement):
     """Notify chairman that announcement needs approval"""
     from accounts.models import CustomUser
-    from notifications.models import Notification
     
     chairmen = CustomUser.objects.filter(role='chairman', is_approved=True)
     
     for chairman in chairmen:
-        Notification.objects.create(
-            user=chairman,
+        dispatch.notify(
+            chairman,
             title=_('Announcement Pending Approval'),
             message=f'{announcement.title} by {announcement.created_by.username}',
             notification_type='announcement',
-            link=f'/announcements/pending/'
+            link=f'/announcements/pending/',
+            group_key='announcements:pending',
+            summarize=_summarize_pending,
         )
 
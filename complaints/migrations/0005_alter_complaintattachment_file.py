@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:49
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0004_complaint_delay_reason_complaint_rating_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='complaintattachment',
+            name='file',
+            field=models.FileField(storage=core.storage.get_storage, upload_to='complaint_attachments/'),
+        ),
+    ]
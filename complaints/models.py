@@ -4,6 +4,8 @@ Complaints models
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 from accounts.models import CustomUser
+from core import references
+from core.storage import get_storage
 
 
 class ComplaintCategory(models.Model):
@@ -97,31 +99,14 @@ class Complaint(models.Model):
 
         # Generate anonymous reference if needed (for tracking without identity)
         if self.is_anonymous and not self.anonymous_reference:
-            import random
-            import string
-
-            # Optimized: Add max attempts to prevent infinite loop
-            max_attempts = 100
-            attempts = 0
-            while attempts < max_attempts:
-                reference = ''.join(
-                    random.choices(string.ascii_uppercase + string.digits, k=10)
-                )
-                if not Complaint.objects.filter(anonymous_reference=reference).exists():
-                    self.anonymous_reference = reference
-                    break
-                attempts += 1
-            else:
-                # Fallback: Use timestamp-based reference if all attempts fail
-                import time
-                self.anonymous_reference = f"REF{int(time.time())}{random.randint(1000, 9999)}"
+            self.anonymous_reference = references.allocate('complaint')
         super().save(*args, **kwargs)
 
 
 class ComplaintAttachment(models.Model):
     """Attachments for complaints"""
     complaint = models.ForeignKey(Complaint, on_delete=models.CASCADE, related_name='attachments')
-    file = models.FileField(upload_to='complaint_attachments/')
+    file = models.FileField(upload_to='complaint_attachments/', storage=get_storage)
     uploaded_by = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     description = models.CharField(max_length=255, blank=True)
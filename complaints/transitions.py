@@ -0,0 +1,147 @@
+"""
+Complaint status state machine
+
+Every status change goes through here so the allowed transitions, the
+timestamps they set and the ``ComplaintStatusHistory`` row they leave are
+defined once. ``bulk_transition`` applies one transition to many complaints
+with a single ``bulk_update`` and a single ``bulk_create`` for the history.
+
+Full timeline: pending (Submitted) → under_review → in_progress → resolved → closed
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from notifications import badges
+
+from .models import Complaint, ComplaintStatusHistory
+
+TRANSITIONS = {
+    'pending': ['under_review', 'rejected'],
+    'under_review': ['in_progress', 'rejected'],
+    'in_progress': ['resolved', 'under_review'],
+    'resolved': ['closed', 'in_progress'],
+    'closed': [],
+    'rejected': ['pending'],
+}
+
+# History notes used when the caller gives none
+DEFAULT_NOTES = {
+    'under_review': 'Complaint accepted for review',
+    'closed': 'Complaint closed',
+}
+
+# Timestamp each target status may set; bulk_update skips auto_now, so updated_at is set explicitly
+TIMESTAMP_FIELDS = {
+    'under_review': 'accepted_at',
+    'in_progress': 'accepted_at',
+    'resolved': 'resolved_at',
+    'closed': 'closed_at',
+}
+
+# Target statuses only the chairman may set (as in mark_resolved/close_complaint)
+CHAIRMAN_ONLY = {'resolved', 'closed'}
+
+MAX_BULK = 500
+
+
+class InvalidTransition(Exception):
+    """The complaint cannot move from its current status to the requested one"""
+
+
+def can_transition(old_status, new_status):
+    return new_status in TRANSITIONS.get(old_status, [])
+
+
+def can_set_status(user, new_status):
+    """Whether ``user`` may move complaints to ``new_status`` at all"""
+    if new_status in CHAIRMAN_ONLY:
+        return user.is_chairman()
+    return user.is_official()
+
+
+def update_fields(new_status):
+    fields = ['status', 'updated_at']
+    if new_status in TIMESTAMP_FIELDS:
+        fields.append(TIMESTAMP_FIELDS[new_status])
+    return fields
+
+
+def _apply(complaint, new_status, user, notes, now):
+    """Move one complaint in memory and return its unsaved history row"""
+    old_status = complaint.status
+    if not can_transition(old_status, new_status):
+        raise InvalidTransition(f'{old_status} → {new_status}')
+
+    complaint.status = new_status
+    complaint.updated_at = now
+    if new_status == 'under_review' and old_status == 'pending':
+        complaint.accepted_at = now
+    elif new_status == 'in_progress' and not complaint.accepted_at:
+        # Keep accepted_at for the first time it moves out of pending
+        complaint.accepted_at = now
+    elif new_status == 'resolved':
+        complaint.resolved_at = now
+    elif new_status == 'closed':
+        complaint.closed_at = now
+
+    return ComplaintStatusHistory(
+        complaint=complaint,
+        old_status=old_status,
+        new_status=new_status,
+        changed_by=user,
+        notes=notes or DEFAULT_NOTES.get(new_status, ''),
+    )
+
+
+def transition(complaint, new_status, user, notes='', **changes):
+    """
+    Move one complaint to ``new_status`` and record it in its history.
+
+    Extra field values (e.g. ``resolution_notes``) are saved with the change.
+    Raises ``InvalidTransition`` without writing anything.
+    """
+    with transaction.atomic():
+        history = _apply(complaint, new_status, user, notes, timezone.now())
+        for field, value in changes.items():
+            setattr(complaint, field, value)
+        complaint.save(update_fields=update_fields(new_status) + list(changes))
+        history.save()
+    return history
+
+
+def bulk_transition(complaint_ids, new_status, user, notes=''):
+    """
+    Apply one transition to many complaints.
+
+    Complaints that cannot make the transition are skipped, not failed, so a
+    stale selection still moves everything it can. Returns
+    ``(updated_ids, skipped)`` where ``skipped`` maps id → reason.
+    """
+    complaint_ids = list(dict.fromkeys(complaint_ids))[:MAX_BULK]
+    now = timezone.now()
+    updated, histories, skipped = [], [], {}
+
+    with transaction.atomic():
+        complaints = Complaint.objects.select_for_update().filter(pk__in=complaint_ids)
+        found = {complaint.pk: complaint for complaint in complaints}
+        for complaint_id in complaint_ids:
+            complaint = found.get(complaint_id)
+            if complaint is None:
+                skipped[complaint_id] = 'not found'
+                continue
+            try:
+                histories.append(_apply(complaint, new_status, user, notes, now))
+            except InvalidTransition:
+                skipped[complaint_id] = f'cannot move from {complaint.status} to {new_status}'
+                continue
+            updated.append(complaint)
+
+        Complaint.objects.bulk_update(updated, update_fields(new_status))
+        ComplaintStatusHistory.objects.bulk_create(histories)
+
+    # bulk_update skips post_save, so drop the complaint badges here (after commit)
+    if updated:
+        user_ids = {complaint.user_id for complaint in updated}
+        transaction.on_commit(lambda: badges.invalidate_complaints(user_ids))
+
+    return [complaint.pk for complaint in updated], skipped
@@ -19,11 +19,14 @@ urlpatterns = [
     path('<int:pk>/delete/', views.delete_complaint, name='delete_complaint'),
     
     # Attachments
+    path('attachment/<int:attachment_id>/', views.download_attachment, name='download_attachment'),
     path('attachment/<int:attachment_id>/delete/', views.delete_attachment, name='delete_attachment'),
     
     # APIs
     path('api/statistics/', views.complaint_statistics_api, name='complaint_statistics_api'),
     path('api/tracking/<int:pk>/', views.complaint_tracking_api, name='complaint_tracking_api'),
+    path('api/<int:pk>/comments/', views.complaint_comments_api, name='complaint_comments_api'),
+    path('api/bulk-transition/', views.bulk_transition_api, name='bulk_transition_api'),
     
     # Anonymous
     path('anonymous-success/', views.anonymous_success, name='anonymous_success'),
@@ -6,14 +6,19 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
 from django.utils.translation import gettext as _
-from django.utils import timezone
 from django.db.models import Q, Count, Avg
 from django.core.paginator import Paginator
+from django.views.decorators.http import require_http_methods
+from core import comments as comment_feed
+from core import media
+from core import registry
 from .models import (
-    Complaint, ComplaintCategory, ComplaintAttachment, 
-    ComplaintComment, ComplaintStatusHistory
+    Complaint, ComplaintAttachment, 
+    ComplaintComment
 )
 from .forms import ComplaintForm, ComplaintCommentForm, ComplaintRatingForm
+from . import transitions
+import os
 import random
 import string
 
@@ -68,7 +73,7 @@ def complaint_list(request):
     page_obj = paginator.get_page(page_number)
     
     # Categories for filter
-    categories = ComplaintCategory.objects.all()
+    categories = registry.rows('complaints.ComplaintCategory')
     
     context = {
         'page_obj': page_obj,
@@ -149,12 +154,9 @@ def complaint_detail(request, pk):
         messages.error(request, _('Please login to view complaints.'))
         return redirect('accounts:login')
     
-    # Filter comments based on role - optimized with select_related
-    if request.user.is_official():
-        comments = complaint.comments.select_related('user').all()
-    else:
-        # Residents only see non-internal comments
-        comments = complaint.comments.select_related('user').filter(is_internal=False)
+    # Only the latest page of comments; older ones load from the comment feed
+    visible_comments = _visible_comments(complaint, request.user)
+    comments, has_older_comments = comment_feed.latest(visible_comments)
     
     # Comment & rating forms
     comment_form = ComplaintCommentForm()
@@ -183,6 +185,8 @@ def complaint_detail(request, pk):
     context = {
         'complaint': complaint,
         'comments': comments,
+        'comment_count': visible_comments.count() if has_older_comments else len(comments),
+        'has_older_comments': has_older_comments,
         'comment_form': comment_form,
         'rating_form': rating_form,
         'priority_choices': Complaint.PRIORITY_CHOICES,
@@ -191,6 +195,47 @@ def complaint_detail(request, pk):
     return render(request, 'complaints/complaint_detail.html', context)
 
 
+def _visible_comments(complaint, user):
+    """Comments a user may read - residents never see internal notes"""
+    comments = complaint.comments.select_related('user')
+    if not user.is_official():
+        comments = comments.filter(is_internal=False)
+    return comments
+
+
+def _serialize_comment(comment):
+    return {
+        'id': comment.id,
+        'user': comment.user.username,
+        'comment': comment.comment,
+        'is_internal': comment.is_internal,
+        'created_at': comment.created_at.isoformat(),
+    }
+
+
+@login_required
+@require_http_methods(['GET', 'POST'])
+def complaint_comments_api(request, pk):
+    """API: comment feed (GET ?after=/?before=/?limit=) and posting (POST)"""
+    complaint = get_object_or_404(Complaint, pk=pk)
+    if not request.user.is_official() and complaint.user_id != request.user.id:
+        return JsonResponse({'error': 'Access denied'}, status=403)
+    
+    if request.method == 'GET':
+        return comment_feed.feed_response(request, _visible_comments(complaint, request.user), _serialize_comment)
+    
+    form = ComplaintCommentForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({'error': 'Comment cannot be empty', 'errors': form.errors}, status=400)
+    comment = form.save(commit=False)
+    comment.complaint = complaint
+    comment.user = request.user
+    # Only officials can leave internal notes
+    comment.is_internal = comment.is_internal and request.user.is_official()
+    comment.save()
+    return JsonResponse({'success': True, 'comment': _serialize_comment(comment)})
+
+
 @login_required
 def update_complaint(request, pk):
     """Update complaint with valid status transitions"""
@@ -204,47 +249,12 @@ def update_complaint(request, pk):
         new_status = request.POST.get('status')
         notes = request.POST.get('notes', '')
         
-        # Validate status transition - full timeline:
-        # pending (Submitted) → under_review → in_progress → resolved → closed
-        valid_transitions = {
-            'pending': ['under_review', 'rejected'],
-            'under_review': ['in_progress', 'rejected'],
-            'in_progress': ['resolved', 'under_review'],
-            'resolved': ['closed', 'in_progress'],
-            'closed': [],
-            'rejected': ['pending'],
-        }
-        
-        if new_status not in valid_transitions.get(complaint.status, []):
+        try:
+            transitions.transition(complaint, new_status, request.user, notes)
+        except transitions.InvalidTransition:
             messages.error(request, _('Invalid status transition.'))
             return redirect('complaints:complaint_detail', pk=pk)
         
-        # Create status history
-        ComplaintStatusHistory.objects.create(
-            complaint=complaint,
-            old_status=complaint.status,
-            new_status=new_status,
-            changed_by=request.user,
-            notes=notes
-        )
-        
-        # Update complaint
-        old_status = complaint.status
-        complaint.status = new_status
-        
-        if new_status == 'under_review' and old_status == 'pending':
-            complaint.accepted_at = timezone.now()
-        elif new_status == 'in_progress' and old_status in ['pending', 'under_review']:
-            # Keep accepted_at for first time it moves out of pending
-            if not complaint.accepted_at:
-                complaint.accepted_at = timezone.now()
-        elif new_status == 'resolved':
-            complaint.resolved_at = timezone.now()
-        elif new_status == 'closed':
-            complaint.closed_at = timezone.now()
-        
-        complaint.save()
-        
         messages.success(request, _('Complaint status updated.'))
         return redirect('complaints:complaint_detail', pk=pk)
     
@@ -270,23 +280,41 @@ def accept_complaint(request, pk):
         messages.error(request, _('Can only accept newly submitted complaints.'))
         return redirect('complaints:complaint_detail', pk=pk)
     
-    # Create status history for move to under_review
-    ComplaintStatusHistory.objects.create(
-        complaint=complaint,
-        old_status='pending',
-        new_status='under_review',
-        changed_by=request.user,
-        notes='Complaint accepted for review'
-    )
-    
-    complaint.status = 'under_review'
-    complaint.accepted_at = timezone.now()
-    complaint.save()
+    transitions.transition(complaint, 'under_review', request.user)
     
     messages.success(request, _('Complaint accepted.'))
     return redirect('complaints:complaint_detail', pk=pk)
 
 
+@login_required
+@require_http_methods(['POST'])
+def bulk_transition_api(request):
+    """API: apply one status transition to many complaints (officials)
+
+    POST ``status``, ``ids`` (repeated or comma-separated) and optional ``notes``.
+    Complaints that cannot make the transition are reported back, not failed.
+    """
+    if not request.user.is_official():
+        return JsonResponse({'error': 'Access denied'}, status=403)
+    
+    new_status = request.POST.get('status', '')
+    if new_status not in dict(Complaint.STATUS_CHOICES):
+        return JsonResponse({'error': 'Invalid status'}, status=400)
+    if not transitions.can_set_status(request.user, new_status):
+        return JsonResponse({'error': 'Access denied'}, status=403)
+    try:
+        ids = [int(value) for raw in request.POST.getlist('ids') for value in raw.split(',') if value.strip()]
+    except ValueError:
+        return JsonResponse({'error': 'Invalid complaint id'}, status=400)
+    if not ids:
+        return JsonResponse({'error': 'No complaints selected'}, status=400)
+    if len(ids) > transitions.MAX_BULK:
+        return JsonResponse({'error': f'At most {transitions.MAX_BULK} complaints per request'}, status=400)
+    
+    updated, skipped = transitions.bulk_transition(ids, new_status, request.user, request.POST.get('notes', ''))
+    return JsonResponse({'success': True, 'updated': updated, 'skipped': skipped})
+
+
 @login_required
 def update_priority(request, pk):
     """Update complaint priority (Secretary only)"""
@@ -322,19 +350,13 @@ def mark_resolved(request, pk):
         resolution_notes = request.POST.get('resolution_notes', '')
         proof_file = request.FILES.get('proof')
         
-        # Create status history
-        ComplaintStatusHistory.objects.create(
-            complaint=complaint,
-            old_status=complaint.status,
-            new_status='resolved',
-            changed_by=request.user,
-            notes=resolution_notes
-        )
-        
-        complaint.status = 'resolved'
-        complaint.resolved_at = timezone.now()
-        complaint.resolution_notes = resolution_notes
-        complaint.save()
+        try:
+            transitions.transition(
+                complaint, 'resolved', request.user, resolution_notes, resolution_notes=resolution_notes
+            )
+        except transitions.InvalidTransition:
+            messages.error(request, _('Only complaints in progress can be resolved.'))
+            return redirect('complaints:complaint_detail', pk=pk)
         
         # Add proof if provided
         if proof_file:
@@ -365,18 +387,7 @@ def close_complaint(request, pk):
         messages.error(request, _('Can only close resolved complaints.'))
         return redirect('complaints:complaint_detail', pk=pk)
     
-    # Create status history
-    ComplaintStatusHistory.objects.create(
-        complaint=complaint,
-        old_status='resolved',
-        new_status='closed',
-        changed_by=request.user,
-        notes='Complaint closed'
-    )
-    
-    complaint.status = 'closed'
-    complaint.closed_at = timezone.now()
-    complaint.save()
+    transitions.transition(complaint, 'closed', request.user)
     
     messages.success(request, _('Complaint closed.'))
     return redirect('complaints:complaint_detail', pk=pk)
@@ -403,6 +414,19 @@ def delete_complaint(request, pk):
     return render(request, 'complaints/delete_complaint.html', {'complaint': complaint})
 
 
+@login_required
+def download_attachment(request, attachment_id):
+    """Stream a complaint attachment to the complainant or an official"""
+    attachment = get_object_or_404(ComplaintAttachment.objects.select_related('complaint'), pk=attachment_id)
+    
+    if not (request.user.is_official() or attachment.complaint.user_id == request.user.id):
+        messages.error(request, _('Access denied.'))
+        return redirect('complaints:complaint_list')
+    
+    extension = os.path.splitext(attachment.file.name)[1]
+    return media.serve(request, attachment.file, filename=f'complaint-{attachment.complaint_id}-{attachment.pk}{extension}')
+
+
 @login_required
 def delete_attachment(request, attachment_id):
     """Delete complaint attachment"""
@@ -0,0 +1,17 @@
+from django.apps import AppConfig
+
+
+class CoreConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'core'
+    verbose_name = 'Core'
+
+    def ready(self):
+        from . import checks  # noqa: F401 (registers the system checks)
+        from . import fragments, images, media, pagecache, registry, storage
+        fragments.connect_signals()
+        images.connect_signals()
+        media.connect_signals()
+        pagecache.connect_signals()
+        registry.connect_signals()
+        storage.connect_signals()
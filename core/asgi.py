@@ -1,5 +1,9 @@
 """
 ASGI config for core project.
+
+This is the entry point for production (see Procfile). Besides regular
+requests it serves long-lived responses such as the server-sent badge stream
+(``/api/badges/stream/``), which fall back to polling under WSGI.
 """
 
 import os
@@ -9,4 +13,3 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 application = get_asgi_application()
-
@@ -0,0 +1,309 @@
+"""
+Two-tier cache backend: a small per-process L1 in front of a shared L2.
+
+Every gunicorn worker keeps a bounded LRU of recently used values (L1) and
+falls back to a shared cache (L2: file system, database or Redis) on a miss.
+Keys are spread over a fixed number of version buckets stored in L2. Any
+write bumps the bucket of the key it touches, and workers re-read the bucket
+versions at most every ``SYNC_INTERVAL`` seconds, so an invalidation in one
+worker reaches the L1 of every other worker within that interval. Counters
+(``incr``/``decr``) bypass L1 and the buckets; read them through the L2 alias.
+
+Example::
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache.TwoTierCache',
+            'LOCATION': 'shared',          # alias of the L2 cache
+            'OPTIONS': {
+                'MAX_ENTRIES': 1000,       # L1 size per process
+                'L1_TIMEOUT': 30,          # max seconds a value lives in L1
+                'SYNC_INTERVAL': 1,        # seconds between bucket syncs
+                'VERSION_BUCKETS': 64,
+            },
+        },
+        'shared': {...},
+    }
+"""
+import os
+import pickle
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from uuid import uuid4
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.files import locks
+
+_MISSING = object()
+
+
+class TwoTierCache(BaseCache):
+    """Bounded in-process L1 backed by a shared L2 with bucketed version keys"""
+
+    version_key_prefix = 'two_tier:bucket'
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._l2_alias = location or 'shared'
+        self._l1_timeout = float(options.get('L1_TIMEOUT', 30))
+        self._sync_interval = float(options.get('SYNC_INTERVAL', 1))
+        self._bucket_count = int(options.get('VERSION_BUCKETS', 64))
+
+        # key -> (pickled value, expires_at, bucket, bucket_version)
+        self._l1 = OrderedDict()
+        self._lock = threading.Lock()
+        self._versions = [0] * self._bucket_count
+        self._synced_at = None
+
+    @property
+    def l2(self):
+        return caches[self._l2_alias]
+
+    # ------------------------------------------------------------------
+    # Version buckets
+    # ------------------------------------------------------------------
+    def _bucket(self, key):
+        return zlib.crc32(key.encode()) % self._bucket_count
+
+    def _version_key(self, bucket):
+        return f'{self.version_key_prefix}:{bucket}'
+
+    def _current_versions(self):
+        """Bucket versions as last read from L2 (refreshed every SYNC_INTERVAL)"""
+        now = time.monotonic()
+        if self._synced_at is None or now - self._synced_at >= self._sync_interval:
+            keys = [self._version_key(i) for i in range(self._bucket_count)]
+            try:
+                stored = self.l2.get_many(keys)
+            except Exception:
+                # L2 unavailable: drop L1 rather than serve values we can't validate
+                stored = None
+            with self._lock:
+                if stored is None:
+                    self._l1.clear()
+                else:
+                    self._versions = [stored.get(k, 0) for k in keys]
+                self._synced_at = now
+        return self._versions
+
+    def _bump(self, buckets):
+        """Give the buckets new versions in L2 so every worker drops its L1 copies"""
+        # A fresh token rather than incr: two concurrent bumps can never
+        # collapse into one, even on an L2 whose incr is not atomic
+        versions = {bucket: uuid4().hex for bucket in set(buckets)}
+        self.l2.set_many({self._version_key(bucket): version for bucket, version in versions.items()}, timeout=None)
+        with self._lock:
+            for bucket, version in versions.items():
+                self._versions[bucket] = version
+
+    # ------------------------------------------------------------------
+    # L1 helpers
+    # ------------------------------------------------------------------
+    def _l1_get(self, key, versions):
+        with self._lock:
+            entry = self._l1.get(key)
+            if entry is None:
+                return _MISSING
+            pickled, expires_at, bucket, version = entry
+            if expires_at <= time.monotonic() or versions[bucket] != version:
+                del self._l1[key]
+                return _MISSING
+            self._l1.move_to_end(key)
+        return pickle.loads(pickled)
+
+    def _l1_set(self, key, value, timeout, version):
+        l1_timeout = self._l1_timeout
+        if timeout is not None:
+            l1_timeout = min(l1_timeout, timeout)
+        if l1_timeout <= 0:
+            self._l1_discard(key)
+            return
+        bucket = self._bucket(key)
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._l1[key] = (pickled, time.monotonic() + l1_timeout, bucket, version)
+            self._l1.move_to_end(key)
+            while len(self._l1) > self._max_entries:
+                self._l1.popitem(last=False)
+
+    def _l1_discard(self, key):
+        with self._lock:
+            self._l1.pop(key, None)
+
+    def _timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    # ------------------------------------------------------------------
+    # Cache API
+    # ------------------------------------------------------------------
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        versions = self._current_versions()
+        value = self._l1_get(key, versions)
+        if value is not _MISSING:
+            return value
+
+        # Remember the bucket version *before* reading L2 so a concurrent
+        # write in another worker can only make this copy look older
+        known_version = versions[self._bucket(key)]
+        value = self.l2.get(key, _MISSING)
+        if value is _MISSING:
+            return default
+        self._l1_set(key, value, None, known_version)
+        return value
+
+    def get_many(self, keys, version=None):
+        versions = self._current_versions()
+        found = {}
+        misses = {}
+        for key in keys:
+            made_key = self.make_and_validate_key(key, version=version)
+            value = self._l1_get(made_key, versions)
+            if value is _MISSING:
+                misses[made_key] = (key, versions[self._bucket(made_key)])
+            else:
+                found[key] = value
+        if misses:
+            for made_key, value in self.l2.get_many(list(misses)).items():
+                key, known_version = misses[made_key]
+                found[key] = value
+                self._l1_set(made_key, value, None, known_version)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        timeout = self._timeout(timeout)
+        self.l2.set(key, value, timeout=timeout)
+        bucket = self._bucket(key)
+        self._bump([bucket])
+        self._l1_set(key, value, timeout, self._versions[bucket])
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(timeout)
+        made = {self.make_and_validate_key(key, version=version): value for key, value in data.items()}
+        failed = self.l2.set_many(made, timeout=timeout)
+        self._bump(self._bucket(key) for key in made)
+        for key, value in made.items():
+            if key not in failed:
+                self._l1_set(key, value, timeout, self._versions[self._bucket(key)])
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        timeout = self._timeout(timeout)
+        added = self.l2.add(key, value, timeout=timeout)
+        if added:
+            bucket = self._bucket(key)
+            self._bump([bucket])
+            self._l1_set(key, value, timeout, self._versions[bucket])
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._l1_discard(key)
+        return self.l2.touch(key, timeout=self._timeout(timeout))
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        deleted = self.l2.delete(key)
+        self._l1_discard(key)
+        self._bump([self._bucket(key)])
+        return deleted
+
+    def delete_many(self, keys, version=None):
+        made = [self.make_and_validate_key(key, version=version) for key in keys]
+        if not made:
+            return
+        self.l2.delete_many(made)
+        for key in made:
+            self._l1_discard(key)
+        self._bump(self._bucket(key) for key in made)
+
+    def incr(self, key, delta=1, version=None):
+        # Counters go straight to L2 and never bump a bucket: frequent
+        # increments would keep invalidating unrelated L1 entries. Read
+        # counters through the L2 alias (see core.checks.counter_caches)
+        key = self.make_and_validate_key(key, version=version)
+        self._l1_discard(key)
+        return self.l2.incr(key, delta)
+
+    def has_key(self, key, version=None):
+        return self.get(key, _MISSING, version=version) is not _MISSING
+
+    def clear(self):
+        self.l2.clear()
+        # Restart every bucket from a fresh epoch so no other worker can
+        # mistake a pre-clear L1 entry for a current one
+        epoch = uuid4().hex
+        self.l2.set_many(
+            {self._version_key(i): epoch for i in range(self._bucket_count)},
+            timeout=None,
+        )
+        with self._lock:
+            self._l1.clear()
+            self._synced_at = None
+
+
+class LockingFileCache(FileBasedCache):
+    """
+    File-system cache whose ``add`` and ``incr``/``decr`` are atomic across
+    the processes sharing the directory.
+
+    Django's file cache implements both as a read followed by a write, so
+    concurrent counters lose updates (and ``incr`` resets the expiry). Here
+    they hold an exclusive lock on one of ``lock_stripes`` lock files chosen
+    by key, and ``incr`` keeps the key's expiry.
+    """
+
+    lock_stripes = 16
+
+    def _lock_path(self, key, version):
+        key = self.make_and_validate_key(key, version=version)
+        return os.path.join(self._dir, f'counters-{zlib.crc32(key.encode()) % self.lock_stripes}.lock')
+
+    def _locked(self, key, version):
+        self._createdir()
+        return _FileLock(self._lock_path(key, version))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._locked(key, version):
+            return super().add(key, value, timeout, version)
+
+    def incr(self, key, delta=1, version=None):
+        fname = self._key_to_file(key, version)
+        with self._locked(key, version):
+            try:
+                with open(fname, 'rb') as f:
+                    expiry = pickle.load(f)
+                    value = pickle.loads(zlib.decompress(f.read()))
+            except FileNotFoundError:
+                raise ValueError(f"Key '{key}' not found")
+            if expiry is not None and expiry < time.time():
+                raise ValueError(f"Key '{key}' not found")
+            value += delta
+            fd, tmp_path = tempfile.mkstemp(dir=self._dir)
+            with open(fd, 'wb') as f:
+                f.write(pickle.dumps(expiry, self.pickle_protocol))
+                f.write(zlib.compress(pickle.dumps(value, self.pickle_protocol)))
+            os.replace(tmp_path, fname)
+        return value
+
+
+class _FileLock:
+    def __init__(self, path):
+        self.path = path
+
+    def __enter__(self):
+        self.file = open(self.path, 'a+b')
+        locks.lock(self.file, locks.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        locks.unlock(self.file)
+        self.file.close()
@@ -0,0 +1,56 @@
+"""
+System checks
+
+Counters kept in a cache (rate limits, buffered view counts) need an
+``incr``/``decr`` that is atomic across processes; Django's database cache
+and plain file cache read and then write, losing concurrent updates.
+
+``core.media`` only forgets a cached public file when a field tracked by
+``core.storage`` releases it, so every public media field must be tracked.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+from django.core.checks import Error, Tags, Warning, register
+
+from .cache import LockingFileCache, TwoTierCache
+
+ATOMIC_COUNTER_BACKENDS = (RedisCache, LockingFileCache, LocMemCache)
+
+# Settings naming the cache alias of a counter user, with their default
+COUNTER_CACHE_SETTINGS = {
+    'ENGAGEMENT_CACHE': 'shared',
+    'VIEW_COUNT_CACHE': 'shared',
+}
+
+
+@register(Tags.caches)
+def counter_caches(app_configs, **kwargs):
+    errors = []
+    for setting, default in COUNTER_CACHE_SETTINGS.items():
+        alias = getattr(settings, setting, default)
+        backend = caches[alias]
+        if isinstance(backend, TwoTierCache):
+            backend = backend.l2  # Counters go straight to L2
+        if not isinstance(backend, ATOMIC_COUNTER_BACKENDS):
+            errors.append(Error(
+                f"{setting} ('{alias}') uses {type(backend).__name__}, whose incr is not atomic.",
+                hint='Use CACHE_L2=redis or CACHE_L2=file (core.cache.LockingFileCache).',
+                id='core.E001',
+            ))
+    return errors
+
+
+@register()
+def public_media_fields(app_configs, **kwargs):
+    tracked = set(getattr(settings, 'CONTENT_ADDRESSED_FIELDS', []))
+    return [
+        Warning(
+            f'{path} is in PUBLIC_MEDIA_FIELDS but not in CONTENT_ADDRESSED_FIELDS.',
+            hint='core.media keeps serving its old files for up to PUBLIC_CACHE_TIMEOUT after they are replaced.',
+            id='core.W001',
+        )
+        for path in getattr(settings, 'PUBLIC_MEDIA_FIELDS', [])
+        if path not in tracked
+    ]
@@ -0,0 +1,63 @@
+"""
+Incremental comment feeds
+
+Detail pages render only the latest ``COMMENT_PAGE_SIZE`` comments. The
+JSON feeds page by primary key, so each request is one indexed range scan:
+
+    ?after=<id>   comments newer than id, oldest first (polling / after posting)
+    ?before=<id>  the page of comments just older than id ("load older")
+    ?limit=<n>    page size, capped at ``COMMENT_PAGE_MAX``
+"""
+from django.conf import settings
+from django.http import JsonResponse
+
+
+def page_size(limit=None):
+    default = getattr(settings, 'COMMENT_PAGE_SIZE', 20)
+    maximum = getattr(settings, 'COMMENT_PAGE_MAX', 100)
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(limit, maximum))
+
+
+def latest(comments, limit=None):
+    """Newest ``limit`` comments in display order, plus whether older ones exist"""
+    return older(comments, None, limit)
+
+
+def older(comments, before, limit=None):
+    limit = page_size(limit)
+    if before is not None:
+        comments = comments.filter(pk__lt=before)
+    page = list(comments.order_by('-pk')[:limit + 1])
+    has_more = len(page) > limit
+    return page[:limit][::-1], has_more
+
+
+def newer(comments, after, limit=None):
+    limit = page_size(limit)
+    page = list(comments.filter(pk__gt=after).order_by('pk')[:limit + 1])
+    return page[:limit], len(page) > limit
+
+
+def _int_param(request, name):
+    try:
+        return int(request.GET[name])
+    except (KeyError, ValueError):
+        return None
+
+
+def feed_response(request, comments, serialize):
+    """Answer a feed request for ``comments`` (a queryset already scoped to what the user may see)"""
+    limit = request.GET.get('limit')
+    after = _int_param(request, 'after')
+    if after is not None:
+        page, has_more = newer(comments, after, limit)
+    else:
+        page, has_more = older(comments, _int_param(request, 'before'), limit)
+    return JsonResponse({
+        'comments': [serialize(comment) for comment in page],
+        'has_more': has_more,
+    })
@@ -1,5 +1,4 @@
-from django.core.cache import cache
-from complaints.models import Complaint
+from notifications.badges import get_complaint_badge
 
 
 def complaint_badge_counts(request):
@@ -10,7 +9,8 @@ def complaint_badge_counts(request):
       (pending + in_progress) in the system.
     - For regular residents: their own unresolved complaints.
     
-    Uses caching to reduce database queries (30 second cache).
+    Served from the shared badge counters, which are invalidated whenever a
+    complaint is saved or deleted.
     """
     user = getattr(request, "user", None)
 
@@ -18,35 +18,19 @@ def complaint_badge_counts(request):
     if not user or not user.is_authenticated:
         return {}
 
-    # Create unique cache key per user
-    cache_key = f"complaint_badge_{user.id}"
-    badge_count = cache.get(cache_key)
-    
-    if badge_count is None:
-        unresolved_statuses = ["pending", "in_progress"]
-
-        try:
-            # Optimized: Use only() to fetch only needed fields, add timeout protection
-            if hasattr(user, "is_official") and user.is_official():
-                # Officials see all unresolved complaints - use only() for faster query
-                badge_count = Complaint.objects.filter(
-                    status__in=unresolved_statuses
-                ).only('id').count()
-            else:
-                # Residents see only their own unresolved complaints
-                badge_count = Complaint.objects.filter(
-                    user=user, status__in=unresolved_statuses
-                ).only('id').count()
-        except Exception:
-            # Fallback: Return 0 if query fails to prevent blocking
-            badge_count = 0
-        
-        # Optimized: Increase cache time to reduce database queries during navigation
-        cache.set(cache_key, badge_count, 60)  # 60 seconds for better performance
+    try:
+        badge_count = get_complaint_badge(user)
+    except Exception:
+        # Fallback: Return 0 if query fails to prevent blocking
+        badge_count = 0
 
     return {
         "complaints_pending_count": badge_count,
     }
 
 
+def fragments(request):
+    """Version keys for ``{% cache %}`` fragments (see core.fragments)"""
+    from core.fragments import Fragments
 
+    return {"fragments": Fragments(request)}
@@ -0,0 +1,144 @@
+"""
+Like/vote toggles with race-free counters
+
+``toggle`` removes the user's like (or vote) if there is one and adds it
+otherwise, then moves the parent's denormalized counter with ``F()`` in the
+same transaction. On PostgreSQL and SQLite 3.35+ the counter update uses
+``RETURNING``, so the fresh count comes back without another query:
+
+    unlike: DELETE, UPDATE ... RETURNING
+    like:   DELETE (no row), INSERT, UPDATE ... RETURNING
+
+A concurrent duplicate click hits the unique constraint and is reported as
+"already active" without counting twice.
+
+``allow`` rate-limits toggles per user and object (``ENGAGEMENT_RATE_LIMIT``
+toggles per ``ENGAGEMENT_RATE_WINDOW`` seconds) in the shared cache.
+``recount`` rebuilds counters from the link tables in batches
+(``manage.py reconcile_engagement``).
+"""
+from dataclasses import dataclass
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+
+@dataclass(frozen=True)
+class Counter:
+    """A parent model's counter of the rows in a (parent, user) link table"""
+    parent: str       # 'gallery.Photo'
+    field: str        # 'like_count'
+    link: str         # 'gallery.PhotoLike'
+    link_field: str   # 'photo'
+
+    @property
+    def parent_model(self):
+        return apps.get_model(self.parent)
+
+    @property
+    def link_model(self):
+        return apps.get_model(self.link)
+
+
+PHOTO_LIKES = Counter('gallery.Photo', 'like_count', 'gallery.PhotoLike', 'photo')
+SUGGESTION_VOTES = Counter('suggestions.Suggestion', 'vote_count', 'suggestions.SuggestionVote', 'suggestion')
+COUNTERS = [PHOTO_LIKES, SUGGESTION_VOTES]
+
+
+def allow(counter, user, parent_id):
+    """Whether the user may toggle this object again now (counts the attempt)"""
+    limit = getattr(settings, 'ENGAGEMENT_RATE_LIMIT', 10)
+    if not limit:
+        return True
+    cache = caches[getattr(settings, 'ENGAGEMENT_CACHE', 'shared')]
+    key = f'engagement:{counter.link}:{parent_id}:{user.pk}'
+    if cache.add(key, 1, getattr(settings, 'ENGAGEMENT_RATE_WINDOW', 60)):
+        return True
+    try:
+        return cache.incr(key) <= limit
+    except ValueError:  # Expired in between
+        return True
+
+
+def _update_returning(counter, parent_id, delta):
+    """Add ``delta`` (never below zero); returns the new count or None if the parent is gone"""
+    model = counter.parent_model
+    # UPDATE ... RETURNING: PostgreSQL, SQLite 3.35+ (same release as INSERT ... RETURNING)
+    if connection.vendor == 'postgresql' or (
+            connection.vendor == 'sqlite' and connection.features.can_return_columns_from_insert):
+        quote = connection.ops.quote_name
+        column = quote(model._meta.get_field(counter.field).column)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {quote(model._meta.db_table)} '
+                f'SET {column} = CASE WHEN {column} + %s < 0 THEN 0 ELSE {column} + %s END '
+                f'WHERE {quote(model._meta.pk.column)} = %s RETURNING {column}',
+                [delta, delta, parent_id],
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+    rows = model._base_manager.filter(pk=parent_id)
+    if not rows.update(**{counter.field: Greatest(F(counter.field) + delta, Value(0))}):
+        return None
+    return rows.values_list(counter.field, flat=True).get()
+
+
+def toggle(counter, user, parent_id, on_change=None):
+    """
+    Flip the user's like/vote on ``parent_id``.
+
+    Returns ``(active, count)``. Raises the parent model's ``DoesNotExist``
+    if there is no such object (nothing is written then). ``on_change(parent_id,
+    delta, link)`` runs in the same transaction when the count moved, with
+    the link row added or removed (it costs one extra read when removing).
+    """
+    links = counter.link_model._base_manager.filter(**{f'{counter.link_field}_id': parent_id, 'user': user})
+    link = None
+    with transaction.atomic():
+        if on_change is not None:
+            link = links.select_for_update().first()
+        removed, _ = links.delete()
+        if removed:
+            active, delta = False, -1
+        else:
+            try:
+                with transaction.atomic():
+                    link = counter.link_model._base_manager.create(
+                        **{f'{counter.link_field}_id': parent_id, 'user': user}
+                    )
+                active, delta = True, 1
+            except IntegrityError:
+                active, delta = True, 0  # Added by a concurrent request, which counts it
+
+        count = _update_returning(counter, parent_id, delta)
+        if count is None:
+            raise counter.parent_model.DoesNotExist
+        if delta and on_change is not None:
+            on_change(parent_id, delta, link)
+    return active, count
+
+
+def recount(counter, batch_size=1000):
+    """Rebuild a counter from its link table; returns how many objects were wrong"""
+    model = counter.parent_model
+    totals = (
+        counter.link_model._base_manager.filter(**{counter.link_field: OuterRef('pk')})
+        .order_by().values(counter.link_field).annotate(total=Count('pk')).values('total')
+    )
+    expected = Coalesce(Subquery(totals), 0)
+    pks = list(model._base_manager.order_by('pk').values_list('pk', flat=True))
+    fixed = 0
+    for start in range(0, len(pks), batch_size):
+        batch = pks[start:start + batch_size]
+        # One UPDATE per batch, only touching rows that drifted
+        with transaction.atomic():
+            fixed += (
+                model._base_manager.filter(pk__in=batch)
+                .annotate(expected=expected).exclude(**{counter.field: F('expected')})
+                .update(**{counter.field: expected})
+            )
+    return fixed
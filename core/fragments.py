@@ -0,0 +1,111 @@
+"""
+Version keys for cached template fragments
+
+Templates keep rendered HTML with Django's ``{% cache %}`` tag and put the
+version of the data they show into the fragment key, so a change never has
+to find and delete fragments; the old ones are simply no longer asked for:
+
+    {% load cache %}
+    {% cache fragments.timeout latest_announcements LANGUAGE_CODE fragments.announcements %}
+        {% for announcement in latest_announcements %}...{% endfor %}
+    {% endcache %}
+
+Querysets in the context are lazy, so a cache hit skips their queries too.
+
+``FRAGMENT_VERSIONS`` maps a version name to the models whose saves and
+deletes bump it (after commit). ``FRAGMENT_SCHEDULED_FIELDS`` lists date
+fields of those models that bump it again when they pass, through a task
+queued for that moment, e.g. an announcement's publish and expiry dates.
+Saving the same dates again queues no further task (a cache ``add`` guard
+per version names and moment).
+
+``fragments.nav`` is the key for the navigation: the visitor's kind
+(anonymous, resident, official) plus the complaint badge officials see.
+"""
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+
+def _cache():
+    return caches[getattr(settings, 'FRAGMENT_CACHE', 'default')]
+
+
+def _key(name):
+    return f'fragments:version:{name}'
+
+
+def version(name):
+    cache = _cache()
+    value = cache.get(_key(name))
+    if value is None:
+        cache.add(_key(name), uuid4().hex, None)
+        value = cache.get(_key(name))
+    return value
+
+
+def bump(*names):
+    """Retire every fragment rendered with these versions (task-safe)"""
+    _cache().set_many({_key(name): uuid4().hex for name in names}, None)
+
+
+def _names(label):
+    return [name for name, labels in getattr(settings, 'FRAGMENT_VERSIONS', {}).items() if label in labels]
+
+
+def _schedule_bump(names, moment):
+    from taskqueue.queue import enqueue
+
+    wait = (moment - timezone.now()).total_seconds()
+    key = f"fragments:scheduled:{','.join(sorted(names))}:{moment.isoformat()}"
+    if wait > 0 and _cache().add(key, 1, int(wait) + 60):
+        enqueue(bump, args=names, run_at=moment)
+
+
+def _changed(sender, instance, **kwargs):
+    names = _names(sender._meta.label)
+    transaction.on_commit(lambda: bump(*names))
+    now = timezone.now()
+    for field in getattr(settings, 'FRAGMENT_SCHEDULED_FIELDS', {}).get(sender._meta.label, []):
+        moment = getattr(instance, field)
+        if moment is not None and moment > now:
+            # After commit, so a rolled back save leaves no guard without its task
+            transaction.on_commit(lambda moment=moment: _schedule_bump(names, moment))
+
+
+def connect_signals():
+    labels = {label for labels in getattr(settings, 'FRAGMENT_VERSIONS', {}).values() for label in labels}
+    for label in labels:
+        post_save.connect(_changed, sender=label, dispatch_uid=f'fragments_save_{label}')
+        post_delete.connect(_changed, sender=label, dispatch_uid=f'fragments_delete_{label}')
+
+
+class Fragments:
+    """Lazy ``fragments`` template variable: ``fragments.<version name>``, ``.nav``, ``.timeout``"""
+
+    def __init__(self, request):
+        self.request = request
+
+    def __getitem__(self, name):
+        if name not in getattr(settings, 'FRAGMENT_VERSIONS', {}):
+            raise KeyError(name)
+        return version(name)
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 600)
+
+    @property
+    def nav(self):
+        from notifications.badges import get_complaint_badge
+
+        user = getattr(self.request, 'user', None)
+        if user is None or not user.is_authenticated:
+            return 'anonymous'
+        if user.is_official():
+            return f'official:{get_complaint_badge(user)}'
+        return 'resident'
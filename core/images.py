@@ -0,0 +1,286 @@
+"""
+Resized image derivatives for uploaded photos
+
+Every image field listed in ``IMAGE_DERIVATIVE_FIELDS`` gets WebP and JPEG
+copies at the sizes in ``IMAGE_DERIVATIVE_SIZES``, stored next to the
+original::
+
+    gallery/market.jpg -> gallery/market__thumb.webp, gallery/market__thumb.jpg,
+                          gallery/market__card.webp, ... gallery/market__full.jpg
+
+Derivatives are built by a background task queued when a new file is saved
+(``manage.py build_image_derivatives`` backfills older uploads) and a
+``__sizes.json`` marker records the width each one came out at, which is
+what ``srcset`` advertises. They are rotated according to the EXIF
+orientation and then written without any metadata. The uploaded original
+is re-encoded the same way before it is stored when it carries EXIF or XMP
+data, so camera details and GPS positions never leave the server
+(``build_image_derivatives --strip-originals`` cleans older uploads).
+
+Templates use the ``images`` tag library (``{% responsive_image %}``), which
+falls back to the original file until the derivatives exist.
+"""
+import json
+import logging
+import os
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db.models.signals import post_save, pre_save
+
+DEFAULT_SIZES = {'thumb': 320, 'card': 800, 'full': 1600}  # Longest side in pixels
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+READY_TIMEOUT = 24 * 3600
+MARKER = 'sizes'
+# Image.info entries that can hold camera details or positions
+METADATA_KEYS = ('exif', 'xmp', 'XML:com.adobe.xmp', 'photoshop', 'comment')
+
+logger = logging.getLogger(__name__)
+
+
+def sizes():
+    return getattr(settings, 'IMAGE_DERIVATIVE_SIZES', DEFAULT_SIZES)
+
+
+def derivative_name(name, size, fmt):
+    root, _ext = os.path.splitext(name)
+    return f'{root}__{size}.{fmt}'
+
+
+def marker_name(name):
+    return derivative_name(name, MARKER, 'json')
+
+
+def _ready_key(name):
+    return f'image_widths:{name}'
+
+
+def _stored_widths(field_file):
+    """Widths from the marker; derivatives built before markers existed are measured"""
+    from PIL import Image
+
+    storage = field_file.storage
+    marker = marker_name(field_file.name)
+    if storage.exists(marker):
+        with storage.open(marker, 'rb') as file:
+            return json.load(file)
+    widths = {}
+    for size in sizes():
+        name = derivative_name(field_file.name, size, 'jpg')
+        if not storage.exists(name):
+            return None
+        with storage.open(name, 'rb') as file, Image.open(file) as image:
+            widths[size] = image.width  # Reads the header only
+    return widths
+
+
+def widths(field_file):
+    """Pixel width of each derivative size, or None while they are pending (cached)"""
+    if not field_file:
+        return None
+    found = cache.get(_ready_key(field_file.name))
+    if found is None:
+        found = _stored_widths(field_file) or False
+        cache.set(_ready_key(field_file.name), found, READY_TIMEOUT)
+    return found or None
+
+
+def is_ready(field_file):
+    """Whether derivatives exist for this file"""
+    return widths(field_file) is not None
+
+
+def url(field_file, size, fmt='jpg'):
+    """URL of one derivative, or of the original while derivatives are pending"""
+    if is_ready(field_file):
+        return field_file.storage.url(derivative_name(field_file.name, size, fmt))
+    return field_file.url
+
+
+def srcset(field_file, fmt='jpg'):
+    """``srcset`` value listing every derivative by its actual width, or '' while pending"""
+    found = widths(field_file)
+    if not found:
+        return ''
+    by_width = {}
+    for size, width in sorted(found.items(), key=lambda item: item[1]):
+        by_width.setdefault(width, size)  # Small originals give several sizes the same width
+    storage = field_file.storage
+    return ', '.join(
+        f'{storage.url(derivative_name(field_file.name, size, fmt))} {width}w'
+        for width, size in by_width.items()
+    )
+
+
+def _prepare(image):
+    """Apply EXIF orientation and drop metadata and transparency"""
+    from PIL import Image, ImageOps
+
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    if image.mode != 'RGB':
+        return image.convert('RGB')
+    return image
+
+
+def strip_metadata(content):
+    """
+    ``content`` re-encoded without EXIF/XMP data (orientation applied), or
+    None when it carries none or is not an image Pillow can rewrite.
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    content.seek(0)
+    try:
+        with Image.open(content) as image:
+            exif = image.getexif()
+            if not exif and not any(key in image.info for key in METADATA_KEYS):
+                return None
+            image_format = image.format
+            animated = getattr(image, 'is_animated', False)
+            rotate = not animated and exif.get(0x0112, 1) != 1
+            options = {'icc_profile': image.info['icc_profile']} if 'icc_profile' in image.info else {}
+            if image_format == 'JPEG':
+                # 'keep' needs the opened JPEG itself; a rotated copy has no quantisation to keep
+                if rotate:
+                    options['quality'] = 95
+                else:
+                    options.update(quality='keep', subsampling='keep')
+            elif image_format == 'WEBP':
+                options.update(lossless=image.info.get('lossless', False), quality=90)
+            if animated:
+                options['save_all'] = True
+            if rotate:
+                image.load()
+                image = ImageOps.exif_transpose(image)
+            image.info = {}
+            buffer = BytesIO()
+            image.save(buffer, image_format, **options)
+    except UnidentifiedImageError:
+        return None  # Not an image; the form's validation deals with it
+    except (OSError, ValueError, KeyError) as exc:
+        logger.warning('Could not strip image metadata: %s', exc)
+        return None
+    finally:
+        content.seek(0)
+    return buffer.getvalue()
+
+
+def build(field_file):
+    """Write every derivative of ``field_file``; returns the names written"""
+    from PIL import Image
+
+    storage = field_file.storage
+    with storage.open(field_file.name, 'rb') as original:
+        with Image.open(original) as source:
+            source.load()
+            image = _prepare(source)
+
+    written, built_widths = [], {}
+    for size, longest_side in sorted(sizes().items(), key=lambda item: -item[1]):
+        resized = image.copy()
+        resized.thumbnail((longest_side, longest_side), Image.LANCZOS)  # Never enlarges
+        built_widths[size] = resized.width
+        for fmt, (pil_format, options) in FORMATS.items():
+            buffer = BytesIO()
+            resized.save(buffer, pil_format, **options)
+            name = derivative_name(field_file.name, size, fmt)
+            if storage.exists(name):
+                storage.delete(name)
+            written.append(storage.save(name, ContentFile(buffer.getvalue())))
+        image = resized  # Each smaller size is cut from the previous one
+
+    # Written last: its presence means every derivative is in place
+    marker = marker_name(field_file.name)
+    if storage.exists(marker):
+        storage.delete(marker)
+    written.append(storage.save(marker, ContentFile(json.dumps(built_widths).encode())))
+    cache.set(_ready_key(field_file.name), built_widths, READY_TIMEOUT)
+    return written
+
+
+def delete_derivatives(storage, name):
+    """Remove the derivatives and marker of ``name`` (not the original)"""
+    derived = [derivative_name(name, size, fmt) for size in sizes() for fmt in FORMATS]
+    for derivative in derived + [marker_name(name)]:
+        if storage.exists(derivative):
+            storage.delete(derivative)
+    cache.delete(_ready_key(name))
+
+
+def build_for(model_label, pk, field_name, name):
+    """Task: build derivatives if the instance still holds the same file"""
+    model = apps.get_model(model_label)
+    instance = model.objects.filter(pk=pk).only(field_name).first()
+    if instance is None:
+        return
+    field_file = getattr(instance, field_name)
+    if not field_file or field_file.name != name:
+        return  # Replaced or cleared since the task was queued
+    build(field_file)
+
+
+def schedule(instance, field_name):
+    from taskqueue.queue import enqueue
+
+    field_file = getattr(instance, field_name)
+    if field_file:
+        enqueue(
+            build_for,
+            args=[instance._meta.label, instance.pk, field_name, field_file.name],
+            queue='media',
+        )
+
+
+def registered_fields():
+    """(model, field name) pairs from IMAGE_DERIVATIVE_FIELDS ('app.Model.field')"""
+    fields = []
+    for path in getattr(settings, 'IMAGE_DERIVATIVE_FIELDS', []):
+        model_label, field_name = path.rsplit('.', 1)
+        fields.append((apps.get_model(model_label), field_name))
+    return fields
+
+
+def _remember_upload(sender, instance, raw=False, **kwargs):
+    # A newly assigned file is not committed to storage until the field's pre_save
+    instance._new_image_fields = [
+        field_name for field_name in _fields_by_model.get(sender, ())
+        if getattr(instance, field_name) and not getattr(instance, field_name)._committed
+    ]
+    if raw:
+        return
+    for field_name in instance._new_image_fields:
+        field_file = getattr(instance, field_name)
+        stripped = strip_metadata(field_file.file)
+        if stripped is not None:
+            field_file.file = ContentFile(stripped, name=field_file.name)
+
+
+def _queue_derivatives(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    for field_name in getattr(instance, '_new_image_fields', ()):
+        cache.delete(_ready_key(getattr(instance, field_name).name))
+        schedule(instance, field_name)
+    instance._new_image_fields = []
+
+
+_fields_by_model = {}
+
+
+def connect_signals():
+    for model, field_name in registered_fields():
+        _fields_by_model.setdefault(model, []).append(field_name)
+    for model in _fields_by_model:
+        pre_save.connect(_remember_upload, sender=model, dispatch_uid=f'images_pre_{model._meta.label}')
+        post_save.connect(_queue_derivatives, sender=model, dispatch_uid=f'images_post_{model._meta.label}')
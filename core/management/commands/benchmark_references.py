@@ -0,0 +1,85 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core import references
+from core.models import ReferenceSequence
+
+
+class Command(BaseCommand):
+    help = 'Measure reference allocation throughput with concurrent threads and check codes are unique'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4, help='Concurrent allocating threads')
+        parser.add_argument('--count', type=int, default=5000, help='References per thread')
+        parser.add_argument('--block-size', type=int, default=None, help='Override REFERENCE_BLOCK_SIZE')
+        parser.add_argument('--sequence', default='benchmark', help='Sequence name (deleted afterwards)')
+        parser.add_argument('--legacy', action='store_true',
+                            help='Also time the old random code + exists() lookup per reference')
+
+    def handle(self, *args, **options):
+        name = options['sequence']
+        if ReferenceSequence.objects.filter(name=name).exists():
+            raise CommandError(f'Sequence "{name}" already exists; pick another --sequence')
+
+        threads, count = options['threads'], options['count']
+        allocator = references.ReferenceAllocator(name, block_size=options['block_size'])
+        try:
+            codes, elapsed = self._run(threads, count, lambda: allocator.allocate())
+        finally:
+            ReferenceSequence.objects.filter(name=name).delete()
+
+        total = threads * count
+        if len(set(codes)) != total:
+            raise CommandError(f'{total - len(set(codes))} duplicate reference(s)')
+        if not all(references.is_valid(code) for code in codes):
+            raise CommandError('Invalid check character in generated references')
+        blocks = -(-total // allocator.block_size)
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} unique references from {threads} thread(s) in {elapsed:.2f}s '
+            f'({total / elapsed:,.0f}/s, about {blocks} block reservation(s) of {allocator.block_size})'
+        ))
+
+        if options['legacy']:
+            codes, elapsed = self._run(threads, count, self._legacy_reference)
+            self.stdout.write(
+                f'Legacy random + exists(): {total} references in {elapsed:.2f}s ({total / elapsed:,.0f}/s)'
+            )
+
+    def _run(self, threads, count, allocate):
+        results = [[] for _ in range(threads)]
+        errors = []
+
+        def work(index):
+            try:
+                for _ in range(count):
+                    results[index].append(allocate())
+            except Exception as exc:  # Reported after all threads finish
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=work, args=(i,)) for i in range(threads)]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+        if errors:
+            raise CommandError(f'{len(errors)} thread(s) failed: {errors[0]}')
+        return [code for result in results for code in result], elapsed
+
+    @staticmethod
+    def _legacy_reference():
+        import random
+        import string
+
+        from complaints.models import Complaint
+
+        while True:
+            reference = ''.join(random.choices(string.ascii_uppercase + string.digits, k=10))
+            if not Complaint.objects.filter(anonymous_reference=reference).exists():
+                return reference
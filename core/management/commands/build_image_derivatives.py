@@ -0,0 +1,82 @@
+import posixpath
+
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from core import images, storage
+from taskqueue.queue import enqueue
+
+
+class Command(BaseCommand):
+    help = 'Create resized WebP/JPEG derivatives for images uploaded before the pipeline existed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--field', action='append', dest='fields',
+                            help='Only this field, as app.Model.field (repeatable)')
+        parser.add_argument('--force', action='store_true', help='Rebuild derivatives that already exist')
+        parser.add_argument('--queue', action='store_true',
+                            help='Queue one task per image for run_worker instead of building here')
+        parser.add_argument('--strip-originals', action='store_true',
+                            help='Re-store originals uploaded with EXIF/XMP data (GPS, camera) without it')
+
+    def handle(self, *args, **options):
+        fields = images.registered_fields()
+        if options['fields']:
+            wanted = set(options['fields'])
+            fields = [(model, name) for model, name in fields if f'{model._meta.label}.{name}' in wanted]
+            if not fields:
+                raise CommandError('No matching field in IMAGE_DERIVATIVE_FIELDS')
+
+        for model, field_name in fields:
+            built = skipped = failed = stripped = 0
+            rows = model.objects.exclude(Q(**{field_name: ''}) | Q(**{f'{field_name}__isnull': True}))
+            for pk, name in rows.values_list('pk', field_name).iterator():
+                field_file = getattr(model(pk=pk, **{field_name: name}), field_name)
+                force = options['force']
+                if options['strip_originals']:
+                    try:
+                        new_name = self._strip_original(model, pk, field_name)
+                    except Exception as exc:  # Missing or unreadable file; keep going
+                        failed += 1
+                        self.stderr.write(f'{model._meta.label} {pk}: {name}: {exc}')
+                        continue
+                    if new_name:
+                        stripped += 1
+                        name, force = new_name, True
+                        field_file = getattr(model(pk=pk, **{field_name: name}), field_name)
+                if not force and images.is_ready(field_file):
+                    skipped += 1
+                    continue
+                if options['queue']:
+                    enqueue(images.build_for, args=[model._meta.label, pk, field_name, name], queue='media')
+                    built += 1
+                    continue
+                try:
+                    images.build(field_file)
+                    built += 1
+                except Exception as exc:  # Missing or unreadable file; keep going
+                    failed += 1
+                    self.stderr.write(f'{model._meta.label} {pk}: {name}: {exc}')
+
+            action = 'queued' if options['queue'] else 'built'
+            summary = f'{model._meta.label}.{field_name}: {built} {action}, {skipped} already done, {failed} failed'
+            if options['strip_originals']:
+                summary += f', {stripped} originals stripped'
+            self.stdout.write(self.style.SUCCESS(summary))
+
+    def _strip_original(self, model, pk, field_name):
+        """Store the original again without metadata; returns its new name, or None if it had none"""
+        instance = model._base_manager.get(pk=pk)
+        field_file = getattr(instance, field_name)
+        old_name = field_file.name
+        with field_file.open('rb'):
+            content = images.strip_metadata(field_file.file)
+        if content is None:
+            return None
+        # Saving the instance moves the blob reference counts; the old blob is cleaned up with them
+        field_file.save(posixpath.basename(old_name), ContentFile(content))
+        if not storage.is_blob(old_name):
+            images.delete_derivatives(field_file.storage, old_name)
+            field_file.storage.delete(old_name)
+        return field_file.name
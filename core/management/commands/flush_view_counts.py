@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core import viewcounts
+
+
+class Command(BaseCommand):
+    help = 'Write view counts buffered in the cache to the database'
+
+    def handle(self, *args, **options):
+        for label, updated in viewcounts.flush().items():
+            self.stdout.write(self.style.SUCCESS(f'{label}: {updated} objects updated'))
@@ -0,0 +1,86 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Q
+
+from core import images, storage
+from taskqueue.queue import enqueue
+
+
+class Command(BaseCommand):
+    help = 'Move files uploaded before content-addressed storage into blobs/ and count their references'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--field', action='append', dest='fields',
+                            help='Only this field, as app.Model.field (repeatable)')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be moved')
+        parser.add_argument('--keep-originals', action='store_true',
+                            help='Leave the old files in place after moving them')
+        parser.add_argument('--recount', action='store_true',
+                            help='Only rebuild blob reference counts from the database')
+
+    def handle(self, *args, **options):
+        if options['recount']:
+            changed = storage.recount()
+            self.stdout.write(self.style.SUCCESS(f'{changed} blob reference counts corrected'))
+            return
+
+        fields = storage.registered_fields()
+        if options['fields']:
+            wanted = set(options['fields'])
+            fields = [(model, name) for model, name in fields if f'{model._meta.label}.{name}' in wanted]
+            if not fields:
+                raise CommandError('No matching field in CONTENT_ADDRESSED_FIELDS')
+
+        image_fields = set(images.registered_fields())
+        moved_names, queued_builds = set(), set()
+        for model, field_name in fields:
+            moved = rows_updated = failed = 0
+            legacy = (
+                model._base_manager
+                .exclude(Q(**{field_name: ''}) | Q(**{f'{field_name}__isnull': True}))
+                .exclude(**{f'{field_name}__startswith': storage.PREFIX + '/'})
+                .values(field_name).annotate(total=Count('pk'))
+            )
+            for row in legacy.iterator():
+                name = row[field_name]
+                if options['dry_run']:
+                    moved += 1
+                    rows_updated += row['total']
+                    continue
+                try:
+                    with storage.content_addressed_storage.open(name, 'rb') as original:
+                        new_name = storage.content_addressed_storage.save(name, original)
+                except Exception as exc:  # Missing or unreadable file; keep going
+                    failed += 1
+                    self.stderr.write(f'{model._meta.label}.{field_name}: {name}: {exc}')
+                    continue
+
+                # queryset.update() skips the signals, so count the references here
+                updated = model._base_manager.filter(**{field_name: name}).update(**{field_name: new_name})
+                storage.adjust(new_name, updated)
+                moved += 1
+                rows_updated += updated
+                moved_names.add(name)
+                if (model, field_name) in image_fields and new_name not in queued_builds:
+                    # Derivatives belong to the file, so one row is enough to build them
+                    pk = model._base_manager.filter(**{field_name: new_name}).values_list('pk', flat=True).first()
+                    enqueue(images.build_for, args=[model._meta.label, pk, field_name, new_name], queue='media')
+                    queued_builds.add(new_name)
+
+            action = 'would move' if options['dry_run'] else 'moved'
+            self.stdout.write(self.style.SUCCESS(
+                f'{model._meta.label}.{field_name}: {action} {moved} files ({rows_updated} rows), {failed} failed'
+            ))
+
+        if not options['keep_originals']:
+            removed = sum(self._remove_original(name) for name in sorted(moved_names))
+            self.stdout.write(f'{removed} original files removed')
+
+    def _remove_original(self, name):
+        """Delete an old file (and its derivatives) once no registered field points at it"""
+        for model, field_name in storage.registered_fields():
+            if model._base_manager.filter(**{field_name: name}).exists():
+                return 0
+        files = storage.content_addressed_storage
+        images.delete_derivatives(files, name)
+        files.delete(name)
+        return 1
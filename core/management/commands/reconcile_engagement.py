@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from core import engagement
+
+
+class Command(BaseCommand):
+    help = 'Recount photo likes and suggestion votes from the PhotoLike/SuggestionVote tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Objects per UPDATE (default: 1000)')
+
+    def handle(self, *args, **options):
+        for counter in engagement.COUNTERS:
+            fixed = engagement.recount(counter, batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'{counter.parent}.{counter.field}: {fixed} corrected'))
@@ -0,0 +1,238 @@
+"""
+Permission-checked file delivery
+
+Views decide who may see a file and hand it to ``serve``, which streams it
+in chunks with ``FileResponse`` instead of reading it into memory, and adds:
+
+* single-range ``Range`` requests (206, or 416 when unsatisfiable) so PDF
+  viewers and video players can seek,
+* ``ETag`` / ``Last-Modified`` validators answered with 304 (a blob's ETag
+  is its content hash, so it never changes),
+* a content type guessed from the file name; types a browser could run as
+  a page (HTML, SVG, ...) are always sent as downloads.
+
+With ``MEDIA_OFFLOAD = 'x-accel-redirect'`` (nginx) or ``'x-sendfile'``
+(Apache, lighttpd) Django only sends the headers and the web server streams
+the file: from the internal location ``MEDIA_OFFLOAD_PREFIX`` mapped onto
+``MEDIA_ROOT``, or from its absolute path. The web server then also handles
+ranges.
+
+``public_media`` serves ``MEDIA_URL`` itself, limited to files referenced
+by ``PUBLIC_MEDIA_FIELDS`` and their image derivatives. A positive answer
+is cached until a field stops referencing the file (``storage.released``),
+so public fields must also be in ``CONTENT_ADDRESSED_FIELDS``.
+"""
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from . import images, storage as blob_storage
+
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+INLINE_TYPES = ('application/pdf', 'text/plain')
+INLINE_PREFIXES = ('image/', 'video/', 'audio/')
+PUBLIC_CACHE_TIMEOUT = 3600
+
+
+def parse_range(header, size):
+    """
+    Byte range to send for a ``Range`` header.
+
+    Returns ``(start, end)`` (inclusive), ``None`` to send the whole file
+    (no header, a malformed one, or several ranges) or ``False`` when the
+    range cannot be satisfied.
+    """
+    match = RANGE.match(header.strip()) if header else None
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if size == 0:
+        return False
+    if not first:  # Suffix range: the last N bytes
+        length = int(last)
+        return (max(size - length, 0), size - 1) if length else False
+    start = int(first)
+    if last and int(last) < start:
+        return None  # Invalid, so ignored
+    if start >= size:
+        return False
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+def _etag(name, size, modified):
+    if blob_storage.is_blob(name):
+        return '"%s"' % os.path.splitext(posixpath.basename(name))[0]
+    return '"%x-%x"' % (int(modified.timestamp() * 1000), size)
+
+
+def _content_type(filename):
+    content_type, encoding = mimetypes.guess_type(filename)
+    if encoding or not content_type:
+        return 'application/octet-stream'
+    return content_type
+
+
+def _is_inline_safe(content_type):
+    if content_type == 'image/svg+xml':
+        return False
+    return content_type in INLINE_TYPES or content_type.startswith(INLINE_PREFIXES)
+
+
+class _RangeFile:
+    """File-like view of the next ``length`` bytes of an open file"""
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size) if size else b''
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def serve_name(request, storage, name, *, filename=None, as_attachment=False, public=False):
+    """Response delivering ``name`` from ``storage`` (see module docstring)"""
+    try:
+        size = storage.size(name)
+        modified = storage.get_modified_time(name)
+    except (OSError, SuspiciousFileOperation):
+        raise Http404('File not found')
+
+    filename = filename or posixpath.basename(name)
+    content_type = _content_type(filename)
+    as_attachment = as_attachment or not _is_inline_safe(content_type)
+    etag = _etag(name, size, modified)
+    last_modified = int(modified.timestamp())
+
+    def finish(response):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        response['Accept-Ranges'] = 'bytes'
+        max_age = getattr(settings, 'MEDIA_CACHE_MAX_AGE', 3600)
+        if public:
+            patch_cache_control(response, public=True, max_age=max_age)
+        else:
+            patch_cache_control(response, private=True, max_age=max_age)
+        return response
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return finish(not_modified)
+
+    offload = getattr(settings, 'MEDIA_OFFLOAD', '')
+    if offload:
+        response = HttpResponse(content_type=content_type)
+        if offload == 'x-accel-redirect':
+            prefix = getattr(settings, 'MEDIA_OFFLOAD_PREFIX', '/protected-media/')
+            response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(name)
+        else:
+            response['X-Sendfile'] = storage.path(name)
+        disposition = 'attachment' if as_attachment else 'inline'
+        response['Content-Disposition'] = f"{disposition}; filename*=UTF-8''{quote(filename)}"
+        return finish(response)
+
+    byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if byte_range and if_range and if_range not in (etag, http_date(last_modified)):
+        byte_range = None  # The client's partial copy is stale: send it all
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return finish(response)
+
+    file = storage.open(name, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type, as_attachment=as_attachment, filename=filename)
+        return finish(response)
+
+    start, end = byte_range
+    file.seek(start)
+    response = FileResponse(
+        _RangeFile(file, end - start + 1), status=206,
+        content_type=content_type, as_attachment=as_attachment, filename=filename,
+    )
+    response['Content-Length'] = str(end - start + 1)
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return finish(response)
+
+
+def serve(request, field_file, **kwargs):
+    """Deliver the file held by a model ``FileField``"""
+    if not field_file:
+        raise Http404('No file')
+    return serve_name(request, field_file.storage, field_file.name, **kwargs)
+
+
+def public_fields():
+    """(model, field name) pairs from PUBLIC_MEDIA_FIELDS ('app.Model.field')"""
+    fields = []
+    for path in getattr(settings, 'PUBLIC_MEDIA_FIELDS', []):
+        model_label, field_name = path.rsplit('.', 1)
+        fields.append((apps.get_model(model_label), field_name))
+    return fields
+
+
+def _derivative_root(name):
+    """The original's name without extension if ``name`` is an image derivative"""
+    sizes = '|'.join(re.escape(size) for size in images.sizes())
+    formats = '|'.join(re.escape(fmt) for fmt in images.FORMATS)
+    match = re.match(rf'^(.+)__(?:{sizes})\.(?:{formats})$', name)
+    return match.group(1) if match else None
+
+
+def _public_key(stem):
+    return f'public_media:{stem}'
+
+
+def is_public(name):
+    """Whether a public field references ``name`` (positive answers are cached)"""
+    root = _derivative_root(name)
+    # One entry per original, shared with its derivatives; it holds the original's name
+    key = _public_key(root or os.path.splitext(name)[0])
+    original = cache.get(key)
+    if original and (original == name or (root and original.startswith(root + '.'))):
+        return True
+    for model, field_name in public_fields():
+        lookup = Q(**{field_name: name})
+        if root:
+            lookup |= Q(**{f'{field_name}__startswith': root + '.'})
+        original = model._base_manager.filter(lookup).values_list(field_name, flat=True).first()
+        if original:
+            cache.set(key, original, PUBLIC_CACHE_TIMEOUT)
+            return True
+    return False
+
+
+def _forget(sender, names, **kwargs):
+    """Drop cached answers for files a field stopped referencing"""
+    cache.delete_many([_public_key(os.path.splitext(name)[0]) for name in names])
+
+
+def connect_signals():
+    blob_storage.released.connect(_forget, dispatch_uid='media_forget_public')
+
+
+def public_media(request, name):
+    """Serve ``MEDIA_URL`` for photos, announcement images and profile photos"""
+    name = posixpath.normpath(name).lstrip('/')
+    if name.startswith('..') or not is_public(name):
+        raise Http404('File not found')
+    return serve_name(request, default_storage, name, public=True)
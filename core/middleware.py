@@ -0,0 +1,17 @@
+"""
+Project middleware
+"""
+from django.middleware.gzip import GZipMiddleware as BaseGZipMiddleware
+
+
+class GZipMiddleware(BaseGZipMiddleware):
+    """GZip responses, except server-sent event streams
+
+    A compressor holds data back until it has a full block, so compressed
+    events would reach the browser late or only when the stream ends.
+    """
+
+    def process_response(self, request, response):
+        if response.get('Content-Type', '').startswith('text/event-stream'):
+            return response
+        return super().process_response(request, response)
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReferenceSequence',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('next_value', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Reference Sequence',
+                'verbose_name_plural': 'Reference Sequences',
+            },
+        ),
+    ]
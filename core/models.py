@@ -0,0 +1,36 @@
+"""
+Core models shared by several apps
+"""
+from django.db import models
+
+
+class ReferenceSequence(models.Model):
+    """Next unreserved value of a reference number sequence (see core.references)"""
+
+    name = models.CharField(max_length=50, primary_key=True)
+    next_value = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Reference Sequence'
+        verbose_name_plural = 'Reference Sequences'
+
+    def __str__(self):
+        return f'{self.name}: {self.next_value}'
+
+
+class StoredBlob(models.Model):
+    """A file kept once under its content hash and shared by every field that uploaded it"""
+
+    name = models.CharField(max_length=255, unique=True)  # Storage path
+    size = models.BigIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Set while nothing references the blob; cleanup removes it after a grace period
+    orphaned_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        verbose_name = 'Stored Blob'
+        verbose_name_plural = 'Stored Blobs'
+
+    def __str__(self):
+        return f'{self.name} ({self.ref_count} refs)'
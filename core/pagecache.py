@@ -0,0 +1,169 @@
+"""
+Full-page cache for anonymous visitors
+
+Views decorated with ``cache_anonymous`` are rendered once per path,
+language and query string and served from the shared cache to anonymous
+GET/HEAD requests:
+
+    @cache_anonymous('announcements.Announcement')
+    def announcement_list(request): ...
+
+Each entry records the versions of the models the page depends on. Saving
+or deleting a model in ``PAGE_CACHE_MODELS`` replaces its version once the
+transaction commits (``invalidate`` does the same for ``update()`` and
+other writes that send no signals), so the next request renders afresh.
+The version keys and the page come back in one ``get_many``. Changes that
+are not tied to a save, such as counters updated with ``F()`` or an
+announcement reaching its publish date, show after at most
+``PAGE_CACHE_TIMEOUT`` seconds.
+
+Responses are never stored if they set cookies, use a CSRF token, show
+flash messages or are not 200s; signed-in users always get a rendered
+page. Cached pages carry an ``ETag`` and ``Cache-Control: max-age=0,
+must-revalidate``, so browsers revalidate with ``If-None-Match`` and get a
+304 without a render.
+"""
+import hashlib
+from functools import wraps
+from urllib.parse import urlencode
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags
+from django.utils.translation import get_language
+
+
+def _cache():
+    return caches[getattr(settings, 'PAGE_CACHE_ALIAS', 'shared')]
+
+
+def _version_key(label):
+    return f'page:version:{label.lower()}'
+
+
+def cache_anonymous(*models, on_hit=None):
+    """
+    Mark a view as cacheable for anonymous visitors.
+
+    ``models`` are the labels whose changes invalidate the page. ``on_hit(request,
+    *args, **kwargs)`` runs when a request is answered from the cache, for
+    side effects the view would otherwise have had (e.g. counting a view).
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            return view_func(request, *args, **kwargs)
+        wrapper.page_cache = {'models': [label.lower() for label in models], 'on_hit': on_hit}
+        return wrapper
+    return decorator
+
+
+def invalidate(*labels):
+    """Drop the cached pages that depend on these models (all processes)"""
+    _cache().set_many({_version_key(label): uuid4().hex for label in labels}, None)
+
+
+def _changed(sender, **kwargs):
+    transaction.on_commit(lambda: invalidate(sender._meta.label))
+
+
+def connect_signals():
+    for label in getattr(settings, 'PAGE_CACHE_MODELS', []):
+        post_save.connect(_changed, sender=label, dispatch_uid=f'pagecache_save_{label}')
+        post_delete.connect(_changed, sender=label, dispatch_uid=f'pagecache_delete_{label}')
+
+
+def _has_messages(request):
+    storage = getattr(request, '_messages', None)
+    return storage is not None and len(storage) > 0
+
+
+def _page_key(request, view_name):
+    query = urlencode(sorted(request.GET.lists()), doseq=True)
+    digest = hashlib.md5(f'{request.path}?{query}'.encode()).hexdigest()
+    return f'page:{view_name}:{get_language()}:{digest}'
+
+
+def _versions(cache, found, labels):
+    versions = [found.get(_version_key(label)) for label in labels]
+    if None in versions:
+        # First use, or evicted: start a fresh version rather than trust old pages
+        for label, version in zip(labels, versions):
+            if version is None:
+                cache.add(_version_key(label), uuid4().hex, None)
+        found = cache.get_many([_version_key(label) for label in labels])
+        versions = [found.get(_version_key(label)) for label in labels]
+    return versions
+
+
+def _headers(response, etag, status):
+    response['ETag'] = etag
+    response['X-Page-Cache'] = status
+    patch_cache_control(response, public=True, max_age=0, must_revalidate=True)
+    patch_vary_headers(response, ['Cookie'])
+    return response
+
+
+class PageCacheMiddleware:
+    """Serve and store ``cache_anonymous`` pages (needs auth and messages middleware before it)"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        entry = getattr(request, '_page_cache', None)
+        if entry is not None and self._storable(request, response):
+            content = response.content
+            etag = '"%s"' % hashlib.md5(content).hexdigest()
+            headers = [(name, value) for name, value in response.items() if name.lower() != 'vary']
+            _cache().set(entry['key'], {
+                'versions': entry['versions'], 'content': content, 'headers': headers, 'etag': etag,
+            }, getattr(settings, 'PAGE_CACHE_TIMEOUT', 120))
+            _headers(response, etag, 'miss')
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        options = getattr(view_func, 'page_cache', None)
+        if (options is None or request.method not in ('GET', 'HEAD')
+                or request.user.is_authenticated or _has_messages(request)):
+            return None
+
+        cache = _cache()
+        key = _page_key(request, request.resolver_match.view_name)
+        labels = options['models']
+        found = cache.get_many([key] + [_version_key(label) for label in labels])
+        versions = _versions(cache, found, labels)
+        page = found.get(key)
+        if page is None or page['versions'] != versions:
+            if request.method == 'GET':
+                request._page_cache = {'key': key, 'versions': versions}
+            return None
+
+        if options['on_hit'] is not None:
+            options['on_hit'](request, *view_args, **view_kwargs)
+        if page['etag'] in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(page['content'])
+            for name, value in page['headers']:
+                response[name] = value
+        return _headers(response, page['etag'], 'hit')
+
+    @staticmethod
+    def _storable(request, response):
+        return (
+            response.status_code == 200
+            and not response.streaming
+            and not response.cookies
+            and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+            and not response.has_header('Set-Cookie')
+            and 'private' not in response.get('Cache-Control', '')
+            and 'no-store' not in response.get('Cache-Control', '')
+            and not _has_messages(request)
+        )
@@ -0,0 +1,147 @@
+"""
+Unique, non-guessable reference numbers without lookup loops
+
+Each named sequence lives in a ``ReferenceSequence`` row. A process reserves
+a block of ``REFERENCE_BLOCK_SIZE`` values with one ``UPDATE`` and hands
+them out from memory, so most allocations touch no table at all. Values are
+unique across processes because blocks never overlap.
+
+A sequence value is turned into a code by a keyed Feistel permutation over
+50 bits (so consecutive values give unrelated codes), written as 10
+Crockford base32 characters, plus one Luhn mod 32 check character that
+catches single-character typos and most swaps:
+
+    allocate('complaint')          -> 'K3V9Q0ZT4MX'
+    allocate('service', 'SR-')     -> 'SR-7D2N5R1WQA8'
+
+``REFERENCE_SECRET`` keys the permutation. Changing it once references exist
+can make new codes collide with old ones.
+"""
+import hashlib
+import threading
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'  # Crockford base32
+CODE_LENGTH = 10
+HALF_BITS = CODE_LENGTH * 5 // 2
+HALF_MASK = (1 << HALF_BITS) - 1
+ROUNDS = 6
+
+
+def _round_keys(name):
+    secret = getattr(settings, 'REFERENCE_SECRET', None) or settings.SECRET_KEY
+    return [
+        hashlib.blake2b(f'{name}:{i}'.encode(), key=secret.encode()[:64], digest_size=16).digest()
+        for i in range(ROUNDS)
+    ]
+
+
+def permute(value, keys):
+    """Keyed bijection on [0, 2**50)"""
+    left, right = value >> HALF_BITS, value & HALF_MASK
+    for key in keys:
+        digest = hashlib.blake2b(right.to_bytes(4, 'big'), key=key, digest_size=4).digest()
+        left, right = right, left ^ (int.from_bytes(digest, 'big') & HALF_MASK)
+    return (left << HALF_BITS) | right
+
+
+def check_character(body):
+    """Luhn mod 32 check character for a base32 string"""
+    total = 0
+    factor = 2
+    for char in reversed(body):
+        addend = factor * ALPHABET.index(char)
+        total += addend // 32 + addend % 32
+        factor = 1 if factor == 2 else 2
+    return ALPHABET[(32 - total % 32) % 32]
+
+
+def encode(value, keys):
+    permuted = permute(value, keys)
+    chars = []
+    for _ in range(CODE_LENGTH):
+        permuted, digit = divmod(permuted, 32)
+        chars.append(ALPHABET[digit])
+    body = ''.join(reversed(chars))
+    return body + check_character(body)
+
+
+def is_valid(code, prefix=''):
+    """Whether ``code`` is well formed and its check character matches"""
+    if not code or not code.startswith(prefix):
+        return False
+    body, check = code[len(prefix):-1], code[-1:]
+    if len(body) != CODE_LENGTH or any(char not in ALPHABET for char in body + check):
+        return False
+    return check_character(body) == check
+
+
+class ReferenceAllocator:
+    """Hands out codes for one sequence from blocks reserved in the database"""
+
+    def __init__(self, name, block_size=None):
+        self.name = name
+        self.block_size = block_size or getattr(settings, 'REFERENCE_BLOCK_SIZE', 100)
+        self.keys = _round_keys(name)
+        self._lock = threading.Lock()
+        self._next = self._end = 0
+
+    def _reserve(self):
+        """Claim the next block; returns (start, end)"""
+        from .models import ReferenceSequence
+
+        rows = ReferenceSequence.objects.filter(name=self.name)
+        with transaction.atomic():
+            if not rows.update(next_value=F('next_value') + self.block_size):
+                try:
+                    with transaction.atomic():
+                        ReferenceSequence.objects.create(name=self.name, next_value=0)
+                except IntegrityError:
+                    pass  # Created by another process in the meantime
+                rows.update(next_value=F('next_value') + self.block_size)
+            end = rows.values_list('next_value', flat=True).get()
+        return end - self.block_size, end
+
+    def _keep(self, start, end):
+        with self._lock:
+            if self._next >= self._end:
+                self._next, self._end = start, end
+
+    def next_value(self):
+        with self._lock:
+            if self._next < self._end:
+                value = self._next
+                self._next += 1
+                return value
+
+        start, end = self._reserve()
+        if connection.in_atomic_block:
+            # A rolled-back reservation may be handed out again elsewhere, so
+            # share the rest of the block only once it has committed
+            transaction.on_commit(lambda: self._keep(start + 1, end))
+        else:
+            self._keep(start + 1, end)
+        return start
+
+    def allocate(self, prefix=''):
+        return prefix + encode(self.next_value(), self.keys)
+
+
+_allocators = {}
+_allocators_lock = threading.Lock()
+
+
+def get_allocator(name):
+    allocator = _allocators.get(name)
+    if allocator is None:
+        with _allocators_lock:
+            allocator = _allocators.setdefault(name, ReferenceAllocator(name))
+    return allocator
+
+
+def allocate(name, prefix=''):
+    """Next reference code of sequence ``name``"""
+    return get_allocator(name).allocate(prefix)
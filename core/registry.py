@@ -0,0 +1,121 @@
+"""
+In-process copies of small lookup tables (complaint, photo and service categories)
+
+Filter dropdowns and upload defaults read these tables on almost every
+page, yet they change a few times a year. Each process loads a table from
+the models in ``REGISTRY_MODELS`` once and serves it from memory. Saving or
+deleting a row bumps the table's version key in the shared cache once the
+transaction commits; every process compares its copy's version with that
+key at most every ``REGISTRY_SYNC_INTERVAL`` seconds and reloads when it
+moved.
+
+    from core import registry
+    registry.rows('complaints.ComplaintCategory')      # ordered list
+    registry.by_name('gallery.PhotoCategory', 'General')
+
+The returned model instances are shared between requests: read them, never
+modify them.
+"""
+import threading
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+
+def _cache():
+    return caches[getattr(settings, 'REGISTRY_CACHE', 'shared')]
+
+
+class Registry:
+    """One lookup table, kept in memory and reloaded when its version changes"""
+
+    def __init__(self, model):
+        self.model = model
+        self.ordering = model._meta.ordering or ['name']
+        self.version_key = f'registry:{model._meta.label_lower}'
+        self._lock = threading.Lock()
+        self._rows = None
+        self._by_pk = {}
+        self._version = None
+        self._checked_at = 0.0
+
+    def _shared_version(self):
+        cache = _cache()
+        version = cache.get(self.version_key)
+        if version is None:
+            cache.add(self.version_key, 1, None)
+            version = cache.get(self.version_key, 1)
+        return version
+
+    def rows(self):
+        now = time.monotonic()
+        if self._rows is not None and now - self._checked_at < getattr(settings, 'REGISTRY_SYNC_INTERVAL', 1):
+            return self._rows
+        version = self._shared_version()
+        with self._lock:
+            if self._rows is None or version != self._version:
+                rows = list(self.model._default_manager.order_by(*self.ordering))
+                self._by_pk = {row.pk: row for row in rows}
+                self._rows = rows
+                self._version = version
+            self._checked_at = now
+            return self._rows
+
+    def get(self, pk):
+        self.rows()
+        try:
+            return self._by_pk.get(int(pk))
+        except (TypeError, ValueError):
+            return None
+
+    def by_name(self, name):
+        return next((row for row in self.rows() if row.name == name), None)
+
+    def invalidate(self):
+        """Make every process reload the table"""
+        cache = _cache()
+        cache.add(self.version_key, 1, None)
+        try:
+            cache.incr(self.version_key)
+        except ValueError:  # Evicted in between
+            cache.set(self.version_key, 2, None)
+        with self._lock:
+            self._rows = None
+
+
+_registries = {}
+
+
+def get_registry(label):
+    """Registry of a model in REGISTRY_MODELS ('app.Model')"""
+    registry = _registries.get(label)
+    if registry is None:
+        registry = _registries.setdefault(label, Registry(apps.get_model(label)))
+    return registry
+
+
+def rows(label):
+    return get_registry(label).rows()
+
+
+def get(label, pk):
+    return get_registry(label).get(pk)
+
+
+def by_name(label, name):
+    return get_registry(label).by_name(name)
+
+
+def _changed(sender, **kwargs):
+    transaction.on_commit(get_registry(sender._meta.label).invalidate)
+
+
+def connect_signals():
+    for label in getattr(settings, 'REGISTRY_MODELS', []):
+        model = apps.get_model(label)
+        post_save.connect(_changed, sender=model, dispatch_uid=f'registry_save_{label}')
+        post_delete.connect(_changed, sender=model, dispatch_uid=f'registry_delete_{label}')
@@ -0,0 +1,120 @@
+"""
+Tiered retention for append-only history tables
+
+``settings.RETENTION_POLICIES`` lists one policy per kind of row::
+
+    {
+        'name': 'read_notifications',
+        'model': 'notifications.Notification',
+        'date_field': 'created_at',
+        'days': 90,
+        'filter': {'is_read': True},                 # optional
+        'before_delete': 'notifications.counters.forget_notifications',  # optional
+    }
+
+Rows older than the cutoff are deleted in primary-key ranges of at most
+``batch_size`` rows, each in its own short transaction, so no lock is held
+for long. History tables grow in primary-key order, so the old rows sit at
+the low end of the key and every range is a cheap index scan. Rows can be
+archived to gzip-compressed JSON lines before they are deleted.
+"""
+import gzip
+import json
+import os
+import time
+from dataclasses import dataclass
+
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+
+@dataclass
+class PolicyReport:
+    name: str
+    deleted: int = 0
+    batches: int = 0
+    elapsed: float = 0.0
+    archive: str = ''
+
+
+def policies(names=None):
+    configured = getattr(settings, 'RETENTION_POLICIES', [])
+    if names:
+        unknown = set(names) - {policy['name'] for policy in configured}
+        if unknown:
+            raise ValueError(f"Unknown retention policies: {', '.join(sorted(unknown))}")
+        return [policy for policy in configured if policy['name'] in names]
+    return list(configured)
+
+
+def expired(policy, now=None):
+    """Queryset of the rows a policy would remove"""
+    now = now or timezone.now()
+    model = apps.get_model(policy['model'])
+    cutoff = now - timezone.timedelta(days=policy['days'])
+    return model.objects.filter(
+        **policy.get('filter', {}),
+        **{f"{policy['date_field']}__lt": cutoff},
+    )
+
+
+def _archive_path(policy, archive_dir, now):
+    os.makedirs(archive_dir, exist_ok=True)
+    return os.path.join(archive_dir, f"{policy['name']}-{now:%Y%m%d-%H%M%S}.jsonl.gz")
+
+
+def prune(policy, batch_size=1000, archive_dir=None, dry_run=False, pause=0, now=None):
+    """Apply one policy; returns a ``PolicyReport``"""
+    now = now or timezone.now()
+    report = PolicyReport(policy['name'])
+    started = time.monotonic()
+    rows = expired(policy, now)
+
+    if dry_run:
+        report.deleted = rows.count()
+        report.elapsed = time.monotonic() - started
+        return report
+
+    before_delete = import_string(policy['before_delete']) if policy.get('before_delete') else None
+    archive = None
+    if archive_dir:
+        report.archive = _archive_path(policy, archive_dir, now)
+        archive = gzip.open(report.archive, 'wt', encoding='utf-8')
+
+    try:
+        last_pk = 0
+        while True:
+            remaining = rows.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)
+            upper = next(iter(remaining[batch_size - 1:batch_size]), None)
+            if upper is None:
+                upper = remaining.aggregate(upper=Max('pk'))['upper']
+                if upper is None:
+                    break
+            batch = rows.filter(pk__gt=last_pk, pk__lte=upper)
+
+            with transaction.atomic():
+                if archive is not None:
+                    for row in batch.values().iterator():
+                        archive.write(json.dumps(row, cls=DjangoJSONEncoder) + '\n')
+                if before_delete is not None:
+                    before_delete(batch)
+                deleted, _ = batch.delete()
+            report.deleted += deleted
+            report.batches += 1
+            last_pk = upper
+            if pause:
+                time.sleep(pause)
+    finally:
+        if archive is not None:
+            archive.close()
+            if not report.deleted:
+                os.remove(report.archive)
+                report.archive = ''
+
+    report.elapsed = time.monotonic() - started
+    return report
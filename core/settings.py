@@ -5,6 +5,7 @@ from pathlib import Path
 from decouple import config
 import dj_database_url
 import os
+import tempfile
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -63,6 +64,8 @@ INSTALLED_APPS = [
     'analytics',
     'dashboard',
     'home',
+    'taskqueue',
+    'core',
 ]
 
 MIDDLEWARE = [
@@ -75,10 +78,11 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.pagecache.PageCacheMiddleware',  # Anonymous full-page cache
 ]
 
 # GZip compression for better performance
-MIDDLEWARE.insert(1, 'django.middleware.gzip.GZipMiddleware')
+MIDDLEWARE.insert(1, 'core.middleware.GZipMiddleware')  # Skips event streams
 
 ROOT_URLCONF = 'core.urls'
 
@@ -95,6 +99,7 @@ TEMPLATES = [
                 'django.contrib.messages.context_processors.messages',
                 'django.template.context_processors.i18n',
                 'core.context_processors.complaint_badge_counts',
+                'core.context_processors.fragments',
             ],
         },
     },
@@ -180,18 +185,235 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 20,
 }
 
-# Caching Configuration - optimized
+# Caching Configuration - two-tier
+# Each worker keeps a small in-process L1 (core.cache.TwoTierCache) in front of
+# a cache shared by all gunicorn workers (L2). Writes bump version keys in L2 so
+# invalidations reach every worker's L1 within SYNC_INTERVAL seconds.
+#   CACHE_L2=file   (default) file-system cache under CACHE_DIR, with locked
+#                   counters (core.cache.LockingFileCache; one host only)
+#   CACHE_L2=redis  Redis-compatible server at REDIS_URL
+#   CACHE_L2=db     database table (run `manage.py createcachetable`); its incr is
+#                   not atomic, so the counter caches below refuse it (core.checks)
+#   CACHE_L2=locmem per-process stand-in for tests and local development
+CACHE_L2 = config('CACHE_L2', default='redis' if config('REDIS_URL', default='') else 'file')
+CACHE_L2_BACKENDS = {
+    'file': {
+        'BACKEND': 'core.cache.LockingFileCache',
+        'LOCATION': config('CACHE_DIR', default=os.path.join(tempfile.gettempdir(), 'barangay_portal_cache')),
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': config('REDIS_URL', default='redis://127.0.0.1:6379/1'),
+    },
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'cache_table',
+    },
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'shared-stand-in',
+    },
+}
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+        'BACKEND': 'core.cache.TwoTierCache',
+        'LOCATION': 'shared',
         'TIMEOUT': 300,  # 5 minutes default timeout
         'OPTIONS': {
-            'MAX_ENTRIES': 5000  # Increased cache size for better performance
+            'MAX_ENTRIES': 1000,  # L1 entries per worker
+            'L1_TIMEOUT': 30,  # Upper bound on how long a value stays in L1
+            'SYNC_INTERVAL': 1,  # Seconds between version-key checks against L2
+            'VERSION_BUCKETS': 64,
         }
-    }
+    },
+    'shared': {
+        **CACHE_L2_BACKENDS[CACHE_L2],
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000
+        } if CACHE_L2 in ('file', 'db', 'locmem') else {},
+    },
 }
 
+# Live badge updates (server-sent events, served by core.asgi)
+# Events come from web workers and the task worker, so the broker must be
+# shared between processes: Redis pub/sub at PUSH_REDIS_URL. Without Redis,
+# pushes stay off and browsers poll /api/badges/ (InProcessBroker only suits
+# a single-process development server with PUSH_ENABLED=True).
+PUSH_REDIS_URL = config('PUSH_REDIS_URL', default=config('REDIS_URL', default=''))
+PUSH_ENABLED = config('PUSH_ENABLED', default=bool(PUSH_REDIS_URL), cast=bool)
+PUSH_BROKER = 'notifications.push.RedisBroker' if PUSH_REDIS_URL else 'notifications.push.InProcessBroker'
+PUSH_STREAM_TIMEOUT = 55  # Seconds before the browser is asked to reconnect
+PUSH_HEARTBEAT = 15  # Seconds between keep-alive comments
+
+# Background tasks (see taskqueue.queue); run with `manage.py run_worker`
+TASK_QUEUES = {
+    'default': {'concurrency': 2},
+    'notifications': {'concurrency': 1, 'lease': 900},
+    'media': {'concurrency': 1, 'lease': 600},
+}
+TASK_EAGER = config('TASK_EAGER', default=False, cast=bool)  # Run tasks inline when no worker is deployed
+TASK_POLL_INTERVAL = 1  # Seconds
+TASK_MAX_ATTEMPTS = 5
+TASK_RETRY_BASE_DELAY = 10  # Seconds, doubled on every retry
+TASK_RETRY_MAX_DELAY = 3600
+
+# Email: SMTP in production; written to files locally (or set the locmem/console backend)
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.filebased.EmailBackend')
+EMAIL_FILE_PATH = config('EMAIL_FILE_PATH', default=os.path.join(tempfile.gettempdir(), 'barangay_portal_emails'))
+EMAIL_HOST = config('EMAIL_HOST', default='localhost')
+EMAIL_PORT = config('EMAIL_PORT', default=587, cast=int)
+EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
+EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
+EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=True, cast=bool)
+EMAIL_TIMEOUT = 30
+DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='Barangay Portal <noreply@barangay.local>')
+EMAIL_SUBJECT_PREFIX = '[Barangay Portal] '
+SITE_URL = config('SITE_URL', default='http://localhost:8000')  # Absolute links in emails
+
+# Notification digests (`manage.py send_notification_digests`)
+DIGEST_WINDOW_HOURS = 24
+DIGEST_BATCH_SIZE = 50  # Messages per send over the shared SMTP connection
+DIGEST_RATE_LIMIT = 10  # Messages per second, 0 for no limit
+
+# Comment threads: latest page rendered with the detail page, older pages on demand
+COMMENT_PAGE_SIZE = 20
+COMMENT_PAGE_MAX = 100
+
+# Gallery uploads whose perceptual hash is within this many bits of an earlier
+# photo are linked to it and held for review; see gallery.duplicates
+PHOTO_DUPLICATE_DISTANCE = 6
+
+# Resized WebP/JPEG copies of uploaded images; see core.images
+IMAGE_DERIVATIVE_FIELDS = [
+    'gallery.Photo.image',
+    'announcements.Announcement.image',
+    'accounts.CustomUser.profile_photo',
+]
+IMAGE_DERIVATIVE_SIZES = {'thumb': 320, 'card': 800, 'full': 1600}  # Longest side in pixels
+
+# Uploads stored once per distinct content under blobs/; see core.storage
+# (`manage.py migrate_media_to_blobs` moves files uploaded before)
+CONTENT_ADDRESSED_FIELDS = [
+    'accounts.CustomUser.profile_photo',
+    'accounts.CustomUser.verification_document',
+    'announcements.Announcement.image',
+    'complaints.ComplaintAttachment.file',
+    'feedback.Feedback.attachment',
+    'gallery.Photo.image',
+]
+BLOB_ORPHAN_GRACE = 600  # Seconds an unreferenced blob is kept before cleanup
+
+# Media delivery; see core.media. MEDIA_URL only serves files of these fields,
+# everything else goes through views that check permissions first.
+PUBLIC_MEDIA_FIELDS = [
+    'accounts.CustomUser.profile_photo',
+    'announcements.Announcement.image',
+    'gallery.Photo.image',
+]
+MEDIA_CACHE_MAX_AGE = 3600  # Seconds browsers may reuse a delivered file
+# '' streams from Django; 'x-accel-redirect' (nginx) or 'x-sendfile' (Apache)
+# hands the transfer to the web server. For nginx, MEDIA_OFFLOAD_PREFIX must be
+# an `internal` location aliased to MEDIA_ROOT.
+MEDIA_OFFLOAD = config('MEDIA_OFFLOAD', default='')
+MEDIA_OFFLOAD_PREFIX = config('MEDIA_OFFLOAD_PREFIX', default='/protected-media/')
+
+# Page views buffered in the shared cache and written in batches; see core.viewcounts
+VIEW_COUNTED_MODELS = ['gallery.Photo', 'announcements.Announcement']
+VIEW_COUNT_CACHE = 'shared'  # Needs an atomic incr/decr (redis or file L2; checked at startup)
+VIEW_COUNT_FLUSH_INTERVAL = 60  # Seconds
+VIEW_COUNT_DEDUPE_WINDOW = 1800  # Seconds a repeat view by the same viewer is ignored (0 counts all)
+
+# Like/vote toggles per user and object within the window; see core.engagement
+ENGAGEMENT_RATE_LIMIT = 10
+ENGAGEMENT_RATE_WINDOW = 60  # Seconds
+ENGAGEMENT_CACHE = 'shared'
+
+# Votes lose half their weight in the "hot" suggestion ordering after this long;
+# see suggestions.rankings
+SUGGESTION_HOT_HALF_LIFE = 3 * 24 * 3600  # Seconds
+SUGGESTION_HOT_REBUILD_INTERVAL = 24 * 3600  # Seconds between exact rebuilds queued by votes (0: never)
+
+# Full pages for anonymous visitors (views marked @cache_anonymous); see core.pagecache
+# Saving a model listed here invalidates the pages that depend on it
+PAGE_CACHE_MODELS = [
+    'announcements.Announcement',
+    'services.Service', 'services.ServiceCategory',
+    'gallery.Photo', 'gallery.PhotoCategory',
+    'suggestions.Suggestion',
+]
+PAGE_CACHE_ALIAS = 'shared'
+PAGE_CACHE_TIMEOUT = 120  # Seconds; bounds staleness of counters and publish/expiry dates
+
+# Rendered template fragments ({% cache %}) keyed on these versions; see core.fragments
+FRAGMENT_VERSIONS = {
+    'announcements': ['announcements.Announcement'],  # Bumped when one is saved or deleted
+}
+FRAGMENT_SCHEDULED_FIELDS = {
+    'announcements.Announcement': ['publish_date', 'expiry_date'],  # ...and when these pass
+}
+FRAGMENT_CACHE = 'default'
+FRAGMENT_CACHE_TIMEOUT = 600  # Seconds
+
+# Lookup tables kept in memory per process; see core.registry
+REGISTRY_MODELS = ['complaints.ComplaintCategory', 'gallery.PhotoCategory', 'services.ServiceCategory']
+REGISTRY_CACHE = 'shared'
+REGISTRY_SYNC_INTERVAL = 1  # Seconds between version checks; edits show up after at most this long
+
+# Reference numbers (anonymous complaints/suggestions, service requests); see core.references
+# Never change REFERENCE_SECRET once references have been issued
+REFERENCE_SECRET = config('REFERENCE_SECRET', default=SECRET_KEY)
+REFERENCE_BLOCK_SIZE = 100  # Values reserved per database round trip
+
+# Unread notifications with the same group key are merged within this window
+NOTIFICATION_COALESCE_WINDOW = 3600  # Seconds
+
+# History retention (`manage.py prune_history`); see core.retention
+RETENTION_POLICIES = [
+    {
+        'name': 'read_notifications',
+        'model': 'notifications.Notification',
+        'date_field': 'created_at',
+        'days': 90,
+        'filter': {'is_read': True},
+        'before_delete': 'notifications.counters.forget_notifications',
+    },
+    {
+        'name': 'unread_notifications',
+        'model': 'notifications.Notification',
+        'date_field': 'created_at',
+        'days': 365,
+        'filter': {'is_read': False},
+        'before_delete': 'notifications.counters.forget_notifications',
+    },
+    {
+        'name': 'announcement_notifications',
+        'model': 'announcements.AnnouncementNotification',
+        'date_field': 'sent_at',
+        'days': 180,
+    },
+    {
+        'name': 'login_history',
+        'model': 'accounts.LoginHistory',
+        'date_field': 'login_time',
+        'days': 365,
+    },
+    {
+        'name': 'finished_tasks',
+        'model': 'taskqueue.Task',
+        'date_field': 'finished_at',
+        'days': 14,
+        'filter': {'status': 'done'},
+    },
+]
+RETENTION_ARCHIVE_DIR = config('RETENTION_ARCHIVE_DIR', default=str(BASE_DIR / 'archive'))
+
+# Announcement notifications: 'broadcast' stores one row shown to every
+# resident; 'fanout' writes a row per resident in background batches
+ANNOUNCEMENT_DELIVERY = config('ANNOUNCEMENT_DELIVERY', default='broadcast')
+ANNOUNCEMENT_FANOUT_BATCH_SIZE = 500
+
 # Session Configuration (for better performance and stability)
 SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
 SESSION_CACHE_ALIAS = 'default'
@@ -0,0 +1,306 @@
+"""
+Content-addressed media storage with reference counting
+
+Uploads to the fields in ``CONTENT_ADDRESSED_FIELDS`` are hashed (SHA-256)
+while they are streamed to a temporary file, then kept once under
+
+    blobs/<2 hex>/<2 hex>/<sha256><extension>
+
+so the same barangay ID or flood photo uploaded by ten residents is stored
+once. A ``StoredBlob`` row counts how many field values point at each blob;
+model saves and deletes move the count through signals. A blob whose count
+drops to zero is removed (with its image derivatives) by a cleanup task once
+``BLOB_ORPHAN_GRACE`` has passed, which leaves time for a concurrent upload
+of the same content to claim it again.
+
+An upload claims the blob's row before it trusts a file already on disk,
+and the cleanup deletes the row and the file in one transaction, so an
+upload racing a cleanup either keeps the row (and the cleanup skips it) or
+finds the file gone and writes it again.
+
+Files saved under the blob prefix by other code (image derivatives) are
+stored as plain files, and ``delete`` never removes a blob directly.
+"""
+import hashlib
+import os
+import re
+import tempfile
+from collections import Counter
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, Value, When
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import Signal
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+PREFIX = 'blobs'
+
+# Sent after commit with ``names``: file names a registered field stopped
+# referencing (replaced, cleared or its row deleted)
+released = Signal()
+BLOB_NAME = re.compile(rf'^{PREFIX}/[0-9a-f]{{2}}/[0-9a-f]{{2}}/[0-9a-f]{{64}}(\.[A-Za-z0-9]+)?$')
+
+
+def is_blob(name):
+    return bool(name) and bool(BLOB_NAME.match(name))
+
+
+def blob_name(digest, original_name):
+    extension = os.path.splitext(original_name)[1].lower()
+    if not re.fullmatch(r'\.[a-z0-9]{1,10}', extension):
+        extension = ''
+    return f'{PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """File system storage that keeps each distinct upload once under its hash"""
+
+    def get_available_name(self, name, max_length=None):
+        # The final name comes from the content; nothing to make unique here
+        return name
+
+    def _save(self, name, content):
+        if name.startswith(PREFIX + '/'):
+            # Derived files stored next to a blob keep their given name
+            if self.exists(name):
+                super().delete(name)
+            return super()._save(name, content)
+
+        directory = os.path.join(self.location, PREFIX, 'tmp')
+        os.makedirs(directory, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        with tempfile.NamedTemporaryFile(dir=directory, delete=False) as temporary:
+            try:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    size += len(chunk)
+                    temporary.write(chunk)
+            except BaseException:
+                temporary.close()
+                os.unlink(temporary.name)
+                raise
+
+        name = blob_name(digest.hexdigest(), name)
+        register(name, size)  # Before the exists check; see the module docstring
+        path = self.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path):
+            os.unlink(temporary.name)  # Already stored once
+        else:
+            os.replace(temporary.name, path)
+            if self.file_permissions_mode is not None:
+                os.chmod(path, self.file_permissions_mode)
+        return name
+
+    def delete(self, name):
+        # Blobs are shared; reference counts decide when they go
+        if not is_blob(name):
+            super().delete(name)
+
+    def purge(self, name):
+        """Remove a blob and every file derived from it"""
+        super().delete(name)
+        directory, filename = os.path.split(self.path(name))
+        stem = os.path.splitext(filename)[0]
+        if os.path.isdir(directory):
+            for other in os.listdir(directory):
+                if other.startswith(stem + '__'):
+                    os.unlink(os.path.join(directory, other))
+
+
+content_addressed_storage = ContentAddressedStorage()
+
+
+def get_storage():
+    """Storage callable for ``FileField(storage=...)`` (keeps migrations stable)"""
+    return content_addressed_storage
+
+
+# ----------------------------------------------------------------------
+# Reference counts
+# ----------------------------------------------------------------------
+def register(name, size):
+    """Claim the row of a blob being stored; an unreferenced one (re)starts its grace period"""
+    from .models import StoredBlob
+
+    blobs = StoredBlob.objects.filter(name=name)
+    if blobs.filter(ref_count=0).update(orphaned_at=timezone.now()):
+        transaction.on_commit(schedule_cleanup)
+        return
+    if not blobs.exists():
+        try:
+            with transaction.atomic():
+                StoredBlob.objects.create(name=name, size=size, orphaned_at=timezone.now())
+        except IntegrityError:
+            return  # Stored by a concurrent upload
+        # Cleaned up if the save that stored it never references it
+        transaction.on_commit(schedule_cleanup)
+
+
+def adjust(name, delta):
+    """Move a blob's reference count; a count reaching zero starts the orphan grace period"""
+    from .models import StoredBlob
+
+    if not is_blob(name) or not delta:
+        return
+    blobs = StoredBlob.objects.filter(name=name)
+    if delta > 0:
+        if not blobs.update(ref_count=F('ref_count') + delta, orphaned_at=None):
+            # Stored before counting started (or the row was lost): count from here
+            StoredBlob.objects.get_or_create(name=name, defaults={'ref_count': delta})
+        return
+    still_used = When(ref_count__gt=-delta, then=F('ref_count') + delta)
+    blobs.update(
+        ref_count=Case(still_used, default=Value(0)),
+        orphaned_at=Case(When(ref_count__gt=-delta, then=Value(None)), default=Value(timezone.now())),
+    )
+    transaction.on_commit(schedule_cleanup)
+
+
+def schedule_cleanup():
+    """Queue one delayed cleanup unless one is already waiting"""
+    from taskqueue.models import Task
+    from taskqueue.queue import enqueue, task_name
+
+    if not Task.objects.filter(name=task_name(cleanup_orphans), status='queued').exists():
+        enqueue(cleanup_orphans, queue='media', delay=grace_period())
+
+
+def grace_period():
+    return timedelta(seconds=getattr(settings, 'BLOB_ORPHAN_GRACE', 600))
+
+
+def cleanup_orphans(grace=None):
+    """Delete blobs nobody has referenced for the grace period; returns how many went"""
+    from .models import StoredBlob
+
+    cutoff = timezone.now() - (grace_period() if grace is None else grace)
+    removed = 0
+    for blob_id, name in StoredBlob.objects.filter(ref_count=0, orphaned_at__lte=cutoff).values_list('pk', 'name'):
+        with transaction.atomic():
+            # Conditional delete: a new reference or upload since the read keeps the blob
+            deleted, _ = StoredBlob.objects.filter(pk=blob_id, ref_count=0, orphaned_at__lte=cutoff).delete()
+            if deleted:
+                # Before commit, so an upload of the same content waits for the row and rewrites the file
+                content_addressed_storage.purge(name)
+                removed += 1
+    if StoredBlob.objects.filter(ref_count=0).exists():
+        # Orphaned after this run was queued: still in their grace period
+        transaction.on_commit(schedule_cleanup)
+    return removed
+
+
+def registered_fields():
+    """(model, field name) pairs from CONTENT_ADDRESSED_FIELDS ('app.Model.field')"""
+    fields = []
+    for path in getattr(settings, 'CONTENT_ADDRESSED_FIELDS', []):
+        model_label, field_name = path.rsplit('.', 1)
+        fields.append((apps.get_model(model_label), field_name))
+    return fields
+
+
+_fields_by_model = {}
+
+
+def _current_names(instance):
+    deferred = instance.get_deferred_fields()
+    return {
+        field_name: getattr(instance, field_name).name or ''
+        for field_name in _fields_by_model[type(instance)]
+        if field_name not in deferred
+    }
+
+
+def _remember_names(sender, instance, **kwargs):
+    instance._blob_names = _current_names(instance)
+
+
+def _load_missing_names(sender, instance, raw=False, **kwargs):
+    # Fields deferred when the row was loaded: read what the database holds now
+    if instance._state.adding or instance.pk is None:
+        return
+    previous = getattr(instance, '_blob_names', {})
+    missing = [name for name in _fields_by_model[sender] if name not in previous]
+    if missing:
+        stored = sender._base_manager.filter(pk=instance.pk).values(*missing).first() or {}
+        previous.update({name: stored.get(name) or '' for name in missing})
+        instance._blob_names = previous
+
+
+def _release(sender, names):
+    names = [name for name in names if name]
+    if names:
+        transaction.on_commit(lambda: released.send(sender=sender, names=names))
+
+
+def _count_saved(sender, instance, raw=False, **kwargs):
+    previous = getattr(instance, '_blob_names', {})
+    current = _current_names(instance)
+    replaced = []
+    for field_name, name in current.items():
+        old = previous.get(field_name, '')
+        if name != old:
+            adjust(name, 1)
+            adjust(old, -1)
+            replaced.append(old)
+    instance._blob_names = current
+    _release(sender, replaced)
+
+
+def _count_deleted(sender, instance, **kwargs):
+    names = _current_names(instance).values()
+    for name in names:
+        adjust(name, -1)
+    _release(sender, names)
+
+
+def connect_signals():
+    for model, field_name in registered_fields():
+        _fields_by_model.setdefault(model, []).append(field_name)
+    for model in _fields_by_model:
+        uid = model._meta.label
+        post_init.connect(_remember_names, sender=model, dispatch_uid=f'blobs_init_{uid}')
+        pre_save.connect(_load_missing_names, sender=model, dispatch_uid=f'blobs_pre_save_{uid}')
+        post_save.connect(_count_saved, sender=model, dispatch_uid=f'blobs_save_{uid}')
+        post_delete.connect(_count_deleted, sender=model, dispatch_uid=f'blobs_delete_{uid}')
+
+
+def recount():
+    """Rebuild every reference count from the registered fields; returns how many changed"""
+    from .models import StoredBlob
+
+    counts = Counter()
+    for model, field_name in registered_fields():
+        rows = model._base_manager.filter(**{f'{field_name}__startswith': PREFIX + '/'})
+        for row in rows.values(field_name).annotate(total=Count('pk')):
+            if is_blob(row[field_name]):
+                counts[row[field_name]] += row['total']
+
+    now = timezone.now()
+    changed = []
+    for blob in StoredBlob.objects.all():
+        expected = counts.pop(blob.name, 0)
+        if blob.ref_count != expected:
+            blob.ref_count = expected
+            blob.orphaned_at = None if expected else now
+            changed.append(blob)
+    StoredBlob.objects.bulk_update(changed, ['ref_count', 'orphaned_at'])
+    # Referenced blobs without a row (e.g. rows lost in a restore)
+    StoredBlob.objects.bulk_create([
+        StoredBlob(
+            name=name,
+            size=content_addressed_storage.size(name) if content_addressed_storage.exists(name) else 0,
+            ref_count=total,
+        )
+        for name, total in counts.items()
+    ])
+    return len(changed) + len(counts)
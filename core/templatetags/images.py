@@ -0,0 +1,52 @@
+"""
+Template tags for resized image derivatives (see core.images)
+
+    {% load images %}
+    {% responsive_image photo.image 'card' alt=photo.title class='gallery-image' sizes='(max-width: 576px) 100vw, 33vw' %}
+    <img src="{% image_url user.profile_photo 'thumb' %}" ...>
+"""
+from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+
+from core import images
+
+register = template.Library()
+
+
+@register.simple_tag
+def image_url(field_file, size='card', fmt='jpg'):
+    """URL of one derivative (the original until derivatives are built)"""
+    if not field_file:
+        return ''
+    return images.url(field_file, size, fmt)
+
+
+@register.simple_tag
+def image_srcset(field_file, fmt='jpg'):
+    if not field_file:
+        return ''
+    return images.srcset(field_file, fmt)
+
+
+@register.simple_tag
+def responsive_image(field_file, size='card', sizes='100vw', lazy=True, **attrs):
+    """
+    ``<picture>`` with WebP and JPEG ``srcset``s; ``size`` picks the fallback ``src``.
+
+    Extra keyword arguments become attributes of the ``<img>``.
+    """
+    if not field_file:
+        return ''
+    if lazy:
+        attrs.setdefault('loading', 'lazy')
+    attrs.setdefault('decoding', 'async')
+    jpeg_srcset = images.srcset(field_file, 'jpg')
+    if not jpeg_srcset:
+        return format_html('<img src="{}"{}>', field_file.url, flatatt(attrs))
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}"{}></picture>',
+        images.srcset(field_file, 'webp'), sizes,
+        images.url(field_file, size, 'jpg'), jpeg_srcset, sizes, flatatt(attrs),
+    )
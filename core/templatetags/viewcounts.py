@@ -0,0 +1,16 @@
+"""
+View counts including views not yet flushed to the database (see core.viewcounts)
+
+    {% load viewcounts %}
+    {{ photo|total_views }}
+"""
+from django import template
+
+from core import viewcounts
+
+register = template.Library()
+
+
+@register.filter
+def total_views(obj):
+    return viewcounts.total(obj)
@@ -6,10 +6,15 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from django.conf.urls.i18n import i18n_patterns
+from core import media
+from notifications import views as notification_views
 
 # Non-localized URLs
 urlpatterns = [
     path('i18n/', include('django.conf.urls.i18n')),
+    path('api/badges/', notification_views.badge_counts_api, name='badge_counts'),
+    path('api/badges/stream/', notification_views.badge_stream, name='badge_stream'),
+    path(settings.MEDIA_URL.lstrip('/') + '<path:name>', media.public_media, name='public_media'),
 ]
 
 # Localized URLs
@@ -32,7 +37,6 @@ urlpatterns += i18n_patterns(
 )
 
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
 
 # Custom admin site
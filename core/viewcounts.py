@@ -0,0 +1,230 @@
+"""
+Write-behind view counters
+
+Page views of the models in ``VIEW_COUNTED_MODELS`` are counted in the
+shared cache instead of with a database write per request:
+
+    views:<model>:<pk>              pending increments (``incr``)
+    views:<model>:mark:<gen>:<pk>   set while the object waits for a flush
+    views:<model>:seq / :<n>:log    log of the objects with pending views
+
+The first view of an object since the last flush appends it to the log.
+``flush`` (a task queued at most once per ``VIEW_COUNT_FLUSH_INTERVAL``,
+or ``manage.py flush_view_counts``) walks the log, takes each pending
+count and adds it to ``view_count`` with one ``UPDATE ... SET view_count =
+view_count + CASE ...`` per model, so concurrent views are never lost and a
+popular announcement no longer locks its row on every request.
+
+With ``VIEW_COUNT_DEDUPE_WINDOW`` set, repeat views by the same user (or
+session) within that many seconds count once. Pages show
+``view_count`` plus the pending delta (``total_views`` filter).
+
+Pending counts live only in the cache: a cache flush or eviction loses at
+most the views since the last flush. A mark lasts as long as its log
+entry. When a log entry goes missing (evicted or never written) or ``seq``
+itself is lost, the flush cannot tell which objects were waiting, so it
+starts a new mark generation: every object is logged again on its next
+view and its pending count, still in the cache, is written then. The cache must have an atomic
+``incr``/``decr`` (Redis or ``core.cache.LockingFileCache``; the
+``core.E001`` check refuses others): a flush takes a count by subtracting
+exactly what it read, so views counted in between stay for the next one.
+"""
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Case, F, Value, When
+
+LOG_TIMEOUT = 24 * 3600
+LOCK_TIMEOUT = 300
+
+
+def _cache():
+    return caches[getattr(settings, 'VIEW_COUNT_CACHE', 'shared')]
+
+
+def flush_interval():
+    return getattr(settings, 'VIEW_COUNT_FLUSH_INTERVAL', 60)
+
+
+def counted_models():
+    return [apps.get_model(label) for label in getattr(settings, 'VIEW_COUNTED_MODELS', [])]
+
+
+def _prefix(model):
+    return f'views:{model._meta.label_lower}'
+
+
+def _viewer(request):
+    if request is None:
+        return None
+    if request.user.is_authenticated:
+        return f'u{request.user.pk}'
+    session_key = request.session.session_key if hasattr(request, 'session') else None
+    return f's{session_key}' if session_key else None  # No session yet: nothing to dedupe on
+
+
+def _incr(cache, key, delta=1):
+    cache.add(key, 0, None)
+    try:
+        return cache.incr(key, delta)
+    except ValueError:  # Evicted between add and incr
+        cache.set(key, delta, None)
+        return delta
+
+
+def _generation(cache, prefix):
+    return cache.get(f'{prefix}:generation') or 0
+
+
+def _new_generation(cache, prefix):
+    """Forget every mark, so objects whose log entry was lost get logged again"""
+    _incr(cache, f'{prefix}:generation')
+
+
+def _mark_key(prefix, generation, pk):
+    return f'{prefix}:mark:{generation}:{pk}'
+
+
+def _next_position(cache, prefix):
+    # A lost seq restarts after the flushed cursor; entries logged under the
+    # old one are unreachable, so their objects need a new mark
+    cursor = cache.get(f'{prefix}:cursor') or 0
+    if cache.add(f'{prefix}:seq', cursor, None) and cursor:
+        _new_generation(cache, prefix)
+    return _incr(cache, f'{prefix}:seq')
+
+
+def record_view(obj, request=None):
+    """Count one view of ``obj``; returns False for a repeat view within the dedupe window"""
+    cache = _cache()
+    prefix = _prefix(obj)
+    window = getattr(settings, 'VIEW_COUNT_DEDUPE_WINDOW', 0)
+    viewer = _viewer(request)
+    if window and viewer and not cache.add(f'{prefix}:seen:{obj.pk}:{viewer}', 1, window):
+        return False
+
+    _incr(cache, f'{prefix}:{obj.pk}')
+    if cache.add(_mark_key(prefix, _generation(cache, prefix), obj.pk), 1, LOG_TIMEOUT):
+        position = _next_position(cache, prefix)
+        cache.set(f'{prefix}:{position}:log', obj.pk, LOG_TIMEOUT)
+        _schedule_flush(cache)
+    return True
+
+
+def _schedule_flush(cache):
+    from taskqueue.queue import enqueue
+
+    if cache.add('views:flush_scheduled', 1, flush_interval()):
+        enqueue(flush, delay=flush_interval())
+
+
+def pending(obj):
+    return _cache().get(f'{_prefix(obj)}:{obj.pk}') or 0
+
+
+def attach_pending(objects):
+    """Set ``pending_views`` on each object with one cache read"""
+    objects = list(objects)
+    if objects:
+        keys = {f'{_prefix(obj)}:{obj.pk}': obj for obj in objects}
+        found = _cache().get_many(keys)
+        for key, obj in keys.items():
+            obj.pending_views = found.get(key) or 0
+    return objects
+
+
+def total(obj):
+    """Persisted plus pending views"""
+    if not hasattr(obj, 'pending_views'):
+        obj.pending_views = pending(obj)
+    return obj.view_count + obj.pending_views
+
+
+def _take(cache, prefix, pk, generation=None):
+    """Move an object's pending views out of the cache; returns them"""
+    if generation is None:
+        generation = _generation(cache, prefix)
+    # Clear the mark first: a view after this re-logs the object for the next flush
+    cache.delete(_mark_key(prefix, generation, pk))
+    key = f'{prefix}:{pk}'
+    count = cache.get(key) or 0
+    if count <= 0:
+        return 0
+    try:
+        # Atomic on the required backends: views since the read are kept
+        remaining = cache.decr(key, count)
+    except ValueError:
+        return count  # Evicted meanwhile; the read value still counts
+    if remaining < 0:
+        # Evicted and recounted from zero in between: drop the overshoot
+        cache.incr(key, -remaining)
+    return count
+
+
+def flush_model(model):
+    """Write one model's pending views; returns the number of objects updated"""
+    cache = _cache()
+    prefix = _prefix(model)
+    cursor = cache.get(f'{prefix}:cursor') or 0
+    last = cache.get(f'{prefix}:seq') or 0
+    if last < cursor:
+        # seq was lost and restarted from zero: read its log from the start
+        _new_generation(cache, prefix)
+        cursor = 0
+        cache.set(f'{prefix}:cursor', 0, None)
+    if last <= cursor:
+        return 0
+
+    positions = range(cursor + 1, last + 1)
+    log = cache.get_many([f'{prefix}:{position}:log' for position in positions])
+    new_cursor = cursor
+    gap = None
+    abandoned = False
+    pks = set()
+    for position in positions:
+        pk = log.get(f'{prefix}:{position}:log')
+        if pk is not None:
+            pks.add(pk)
+        elif gap is None:
+            if cache.get(f'{prefix}:gap') != position:
+                # Logged but not written yet (or lost): look again next time,
+                # and give up on it if it is still missing then
+                gap = position
+            else:
+                abandoned = True
+        if gap is None:
+            new_cursor = position
+    cache.set(f'{prefix}:gap', gap, LOG_TIMEOUT)
+
+    generation = _generation(cache, prefix)
+    if abandoned:
+        # The lost entry's object keeps its mark: start a new generation so it is logged again
+        _new_generation(cache, prefix)
+
+    deltas = {}
+    for pk in sorted(pks):
+        count = _take(cache, prefix, pk, generation)
+        if count:
+            deltas[pk] = count
+    if deltas:
+        model._base_manager.filter(pk__in=deltas).update(
+            view_count=F('view_count') + Case(
+                *[When(pk=pk, then=Value(count)) for pk, count in deltas.items()],
+                default=Value(0),
+            )
+        )
+    cache.delete_many([f'{prefix}:{position}:log' for position in range(cursor + 1, new_cursor + 1)])
+    cache.set(f'{prefix}:cursor', new_cursor, None)
+    return len(deltas)
+
+
+def flush():
+    """Task: write every model's pending views (one flush at a time)"""
+    cache = _cache()
+    if not cache.add('views:flush_lock', 1, LOCK_TIMEOUT):
+        return {}
+    try:
+        cache.delete('views:flush_scheduled')
+        return {model._meta.label: flush_model(model) for model in counted_models()}
+    finally:
+        cache.delete('views:flush_lock')
@@ -8,7 +8,7 @@ from complaints.models import Complaint
 from feedback.models import Feedback
 from announcements.models import Announcement
 from services.models import ServiceRequest
-from notifications.models import Notification
+from notifications import badges
 from django.db.models import Count, Q
 from django.utils import timezone
 
@@ -51,7 +51,7 @@ def resident_dashboard(request):
     recent_services = ServiceRequest.objects.filter(user=user).select_related('service', 'service__category')[:5]
     
     # Unread notifications count
-    unread_notifications = Notification.objects.filter(user=user, is_read=False).count()
+    unread_notifications = badges.get_badge_counts(user)['notifications']
     
     # Latest announcements
     latest_announcements = Announcement.objects.filter(
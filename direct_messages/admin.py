@@ -2,7 +2,14 @@
 Direct Messages admin configuration
 """
 from django.contrib import admin
-from .models import DirectMessage
+from .models import DirectMessage, MessageReceipt, MessageThread, ThreadParticipant
+
+
+class MessageReceiptInline(admin.TabularInline):
+    model = MessageReceipt
+    extra = 0
+    raw_id_fields = ['user']
+    readonly_fields = ['read_at']
 
 
 @admin.register(DirectMessage)
@@ -11,6 +18,7 @@ class DirectMessageAdmin(admin.ModelAdmin):
     list_filter = ['is_read', 'created_at']
     search_fields = ['subject', 'message', 'sender__username', 'recipient__username']
     readonly_fields = ['created_at', 'read_at']
+    inlines = [MessageReceiptInline]
     
     fieldsets = (
         ('Message Info', {
@@ -20,3 +28,17 @@ class DirectMessageAdmin(admin.ModelAdmin):
             'fields': ('is_read', 'created_at', 'read_at')
         }),
     )
+
+
+class ThreadParticipantInline(admin.TabularInline):
+    model = ThreadParticipant
+    extra = 0
+    raw_id_fields = ['user']
+
+
+@admin.register(MessageThread)
+class MessageThreadAdmin(admin.ModelAdmin):
+    list_display = ['subject', 'last_sender', 'reply_count', 'last_activity']
+    search_fields = ['subject', 'last_snippet']
+    raw_id_fields = ['root', 'last_sender']
+    inlines = [ThreadParticipantInline]
@@ -0,0 +1,100 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:34
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Q
+
+
+def backfill_threads(apps, schema_editor):
+    CustomUser = apps.get_model('accounts', 'CustomUser')
+    DirectMessage = apps.get_model('direct_messages', 'DirectMessage')
+    MessageThread = apps.get_model('direct_messages', 'MessageThread')
+    ThreadParticipant = apps.get_model('direct_messages', 'ThreadParticipant')
+
+    official_ids = list(
+        CustomUser.objects.filter(
+            Q(is_superuser=True) | Q(role__in=['chairman', 'secretary'])
+        ).values_list('id', flat=True)
+    )
+    # Replies per thread: count, latest reply and the set of people who replied
+    reply_counts, latest_replies, reply_senders = {}, {}, {}
+    for reply in DirectMessage.objects.filter(parent_message__isnull=False).order_by('created_at').iterator():
+        reply_counts[reply.parent_message_id] = reply_counts.get(reply.parent_message_id, 0) + 1
+        latest_replies[reply.parent_message_id] = reply
+        reply_senders.setdefault(reply.parent_message_id, set()).add(reply.sender_id)
+
+    for root in DirectMessage.objects.filter(parent_message__isnull=True).iterator():
+        last = latest_replies.get(root.pk, root)
+        last_activity = last.created_at
+        thread = MessageThread.objects.create(
+            root=root,
+            subject=root.subject,
+            last_activity=last_activity,
+            last_sender_id=last.sender_id,
+            last_snippet=' '.join(last.message.split())[:120],
+            reply_count=reply_counts.get(root.pk, 0),
+        )
+        audience = [root.recipient_id] if root.recipient_id else official_ids
+        rows = {
+            root.sender_id: ThreadParticipant(
+                thread=thread, user_id=root.sender_id, is_sender=True, last_activity=last_activity
+            )
+        }
+        for user_id in audience:
+            if user_id not in rows:
+                rows[user_id] = ThreadParticipant(
+                    thread=thread, user_id=user_id, in_inbox=True,
+                    unread_count=0 if root.is_read else 1, last_activity=last_activity,
+                )
+        for user_id in reply_senders.get(root.pk, ()):
+            if user_id not in rows:
+                rows[user_id] = ThreadParticipant(thread=thread, user_id=user_id, last_activity=last_activity)
+        ThreadParticipant.objects.bulk_create(rows.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('direct_messages', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MessageThread',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=200, verbose_name='Subject')),
+                ('last_activity', models.DateTimeField(verbose_name='Last Activity')),
+                ('last_snippet', models.CharField(blank=True, max_length=200, verbose_name='Last Message')),
+                ('reply_count', models.PositiveIntegerField(default=0, verbose_name='Replies')),
+                ('last_sender', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Last Sender')),
+                ('root', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='thread', to='direct_messages.directmessage', verbose_name='First Message')),
+            ],
+            options={
+                'verbose_name': 'Message Thread',
+                'verbose_name_plural': 'Message Threads',
+                'ordering': ['-last_activity'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ThreadParticipant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_sender', models.BooleanField(default=False)),
+                ('in_inbox', models.BooleanField(default=False)),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+                ('last_activity', models.DateTimeField()),
+                ('thread', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participants', to='direct_messages.messagethread')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='message_threads', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Thread Participant',
+                'verbose_name_plural': 'Thread Participants',
+                'indexes': [models.Index(fields=['user', 'in_inbox', '-last_activity'], name='direct_mess_user_id_41ddd5_idx'), models.Index(fields=['user', 'is_sender', '-last_activity'], name='direct_mess_user_id_d4f7ba_idx')],
+                'unique_together': {('thread', 'user')},
+            },
+        ),
+        migrations.RunPython(backfill_threads, migrations.RunPython.noop),
+    ]
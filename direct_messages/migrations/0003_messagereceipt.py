@@ -0,0 +1,58 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:36
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Q
+
+
+def backfill_receipts(apps, schema_editor):
+    # Existing messages keep their shared read state for every recipient
+    CustomUser = apps.get_model('accounts', 'CustomUser')
+    DirectMessage = apps.get_model('direct_messages', 'DirectMessage')
+    MessageReceipt = apps.get_model('direct_messages', 'MessageReceipt')
+
+    official_ids = list(
+        CustomUser.objects.filter(
+            Q(is_superuser=True) | Q(role__in=['chairman', 'secretary'])
+        ).values_list('id', flat=True)
+    )
+    batch = []
+    top_level = DirectMessage.objects.filter(parent_message__isnull=True).values_list(
+        'id', 'recipient_id', 'is_read', 'read_at'
+    )
+    for message_id, recipient_id, is_read, read_at in top_level.iterator():
+        for user_id in [recipient_id] if recipient_id else official_ids:
+            batch.append(MessageReceipt(message_id=message_id, user_id=user_id, is_read=is_read, read_at=read_at))
+        if len(batch) >= 1000:
+            MessageReceipt.objects.bulk_create(batch)
+            batch = []
+    MessageReceipt.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('direct_messages', '0002_messagethread'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MessageReceipt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_read', models.BooleanField(default=False, verbose_name='Read Status')),
+                ('read_at', models.DateTimeField(blank=True, null=True, verbose_name='Read At')),
+                ('message', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='receipts', to='direct_messages.directmessage')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='message_receipts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Message Receipt',
+                'verbose_name_plural': 'Message Receipts',
+                'indexes': [models.Index(fields=['user', 'is_read'], name='direct_mess_user_id_40dad8_idx')],
+                'unique_together': {('message', 'user')},
+            },
+        ),
+        migrations.RunPython(backfill_receipts, migrations.RunPython.noop),
+    ]
@@ -68,10 +68,103 @@ class DirectMessage(models.Model):
     def __str__(self):
         return f"{self.subject} - From: {self.sender.username}"
     
-    def mark_as_read(self):
-        """Mark message as read"""
-        from django.utils import timezone
-        if not self.is_read:
-            self.is_read = True
-            self.read_at = timezone.now()
-            self.save()
+    def mark_as_read(self, user):
+        """Mark message as read for one recipient"""
+        from .threads import read_message
+        return read_message(self, user)
+
+
+class MessageReceipt(models.Model):
+    """Delivery of a top-level message to one recipient, with that recipient's read state"""
+    
+    message = models.ForeignKey(
+        DirectMessage,
+        on_delete=models.CASCADE,
+        related_name='receipts'
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='message_receipts'
+    )
+    is_read = models.BooleanField(default=False, verbose_name=_("Read Status"))
+    read_at = models.DateTimeField(null=True, blank=True, verbose_name=_("Read At"))
+    
+    class Meta:
+        verbose_name = _("Message Receipt")
+        verbose_name_plural = _("Message Receipts")
+        unique_together = ['message', 'user']
+        indexes = [
+            models.Index(fields=['user', 'is_read']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user} - {self.message}"
+
+
+class MessageThread(models.Model):
+    """Summary of a conversation: a top-level message and its replies"""
+    
+    root = models.OneToOneField(
+        DirectMessage,
+        on_delete=models.CASCADE,
+        related_name='thread',
+        verbose_name=_("First Message")
+    )
+    subject = models.CharField(max_length=200, verbose_name=_("Subject"))
+    
+    # Latest activity, shown in the inbox without touching the messages
+    last_activity = models.DateTimeField(verbose_name=_("Last Activity"))
+    last_sender = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name=_("Last Sender")
+    )
+    last_snippet = models.CharField(max_length=200, blank=True, verbose_name=_("Last Message"))
+    reply_count = models.PositiveIntegerField(default=0, verbose_name=_("Replies"))
+    
+    class Meta:
+        verbose_name = _("Message Thread")
+        verbose_name_plural = _("Message Threads")
+        ordering = ['-last_activity']
+    
+    def __str__(self):
+        return self.subject
+
+
+class ThreadParticipant(models.Model):
+    """A user's view of a thread: which folders it shows in and what is unread"""
+    
+    thread = models.ForeignKey(
+        MessageThread,
+        on_delete=models.CASCADE,
+        related_name='participants'
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='message_threads'
+    )
+    
+    # Started the thread (Sent folder) / has received something in it (Inbox)
+    is_sender = models.BooleanField(default=False)
+    in_inbox = models.BooleanField(default=False)
+    unread_count = models.PositiveIntegerField(default=0)
+    
+    # Copy of thread.last_activity so folders paginate from one index
+    last_activity = models.DateTimeField()
+    
+    class Meta:
+        verbose_name = _("Thread Participant")
+        verbose_name_plural = _("Thread Participants")
+        unique_together = ['thread', 'user']
+        indexes = [
+            models.Index(fields=['user', 'in_inbox', '-last_activity']),
+            models.Index(fields=['user', 'is_sender', '-last_activity']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user} - {self.thread}"
@@ -0,0 +1,118 @@
+"""
+Thread summaries and read receipts for direct messages
+
+Every top-level message starts a ``MessageThread``; replies update its last
+activity, snippet and reply count. ``ThreadParticipant`` rows hold each
+user's folders and unread count, so the inbox and sent views paginate one
+indexed table instead of scanning messages and replies.
+
+Each recipient of a top-level message also gets a ``MessageReceipt``, so a
+message sent to all admins is read (and counted) separately by every
+official instead of through the message's shared ``is_read`` flag.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.text import Truncator
+
+from notifications import counters
+from notifications.counters import message_audience
+
+from .models import DirectMessage, MessageReceipt, MessageThread, ThreadParticipant
+
+SNIPPET_LENGTH = 120
+
+
+def snippet(text):
+    return Truncator(' '.join(text.split())).chars(SNIPPET_LENGTH)
+
+
+def start_thread(message):
+    """Create the thread summary for a new top-level message"""
+    thread = MessageThread.objects.create(
+        root=message,
+        subject=message.subject,
+        last_activity=message.created_at,
+        last_sender=message.sender,
+        last_snippet=snippet(message.message),
+    )
+    audience = message_audience(message)
+    MessageReceipt.objects.bulk_create(
+        [MessageReceipt(message=message, user_id=user_id) for user_id in audience]
+    )
+    participants = {
+        message.sender_id: ThreadParticipant(
+            thread=thread, user_id=message.sender_id, is_sender=True, last_activity=message.created_at
+        )
+    }
+    for user_id in audience:
+        if user_id not in participants:
+            participants[user_id] = ThreadParticipant(
+                thread=thread, user_id=user_id, in_inbox=True, unread_count=1, last_activity=message.created_at
+            )
+    ThreadParticipant.objects.bulk_create(participants.values())
+    return thread
+
+
+def thread_for(root):
+    """Thread of a top-level message, created on the fly for old messages"""
+    try:
+        return root.thread
+    except MessageThread.DoesNotExist:
+        return start_thread(root)
+
+
+def add_reply(reply):
+    """Record a reply on its thread and raise the other participants' unread counts"""
+    thread = thread_for(reply.parent_message)
+    MessageThread.objects.filter(pk=thread.pk).update(
+        last_activity=reply.created_at,
+        last_sender=reply.sender,
+        last_snippet=snippet(reply.message),
+        reply_count=F('reply_count') + 1,
+    )
+    ThreadParticipant.objects.get_or_create(
+        thread=thread, user=reply.sender, defaults={'last_activity': reply.created_at}
+    )
+    participants = ThreadParticipant.objects.filter(thread=thread)
+    participants.exclude(user=reply.sender).update(
+        unread_count=F('unread_count') + 1, in_inbox=True, last_activity=reply.created_at
+    )
+    participants.filter(user=reply.sender).update(last_activity=reply.created_at)
+
+
+def remove_reply(reply):
+    MessageThread.objects.filter(root_id=reply.parent_message_id, reply_count__gt=0).update(
+        reply_count=F('reply_count') - 1
+    )
+
+
+def mark_read(thread, user):
+    """Clear a user's unread count on a thread"""
+    return ThreadParticipant.objects.filter(thread=thread, user=user, unread_count__gt=0).update(unread_count=0)
+
+
+def read_message(message, user):
+    """
+    Mark a top-level message read for one recipient.
+
+    Returns True if the receipt changed; the user's counter moves only then,
+    so opening the same message twice (or from two tabs) counts once.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        changed = MessageReceipt.objects.filter(message=message, user=user, is_read=False).update(
+            is_read=True, read_at=now
+        )
+        if changed:
+            counters.adjust(user.pk, unread_messages=-1)
+            # The shared flag now only means "seen by a recipient" (shown to the sender)
+            DirectMessage.objects.filter(pk=message.pk, is_read=False).update(is_read=True, read_at=now)
+    return bool(changed)
+
+
+def forget_message(message):
+    """Take a top-level message about to be deleted out of its recipients' counters"""
+    receipts = list(MessageReceipt.objects.filter(message=message).values_list('user_id', 'is_read'))
+    counters.adjust([user_id for user_id, is_read in receipts], total_messages=-1)
+    counters.adjust([user_id for user_id, is_read in receipts if not is_read], unread_messages=-1)
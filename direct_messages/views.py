@@ -4,39 +4,58 @@ Direct Messages views
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages as django_messages
-from django.utils.translation import gettext as _
-from django.utils import timezone
-from django.db.models import Q
+from django.urls import reverse
+from django.utils.translation import gettext as _, ngettext
+from django.db import transaction
 from django.http import JsonResponse
 from django.views.decorators.csrf import ensure_csrf_cookie
 from accounts.models import CustomUser
-from .models import DirectMessage
+from django.core.paginator import Paginator
+from .models import DirectMessage, ThreadParticipant
+from . import threads
 from .forms import DirectMessageForm, ReplyMessageForm
 from notifications.models import Notification
+from notifications import badges, counters, dispatch
+
+
+def _summarize_new_messages(count, actors):
+    """Title and text of a merged "new message" notification"""
+    return _("New Messages"), ngettext(
+        "%(count)d new message from %(actors)d resident",
+        "%(count)d new messages from %(actors)d residents",
+        count,
+    ) % {'count': count, 'actors': actors}
+
+
+def _summarize_replies(count, actors, subject):
+    """Title and text of a merged "new reply" notification"""
+    return _("New Replies"), ngettext(
+        "%(count)d new reply to: %(subject)s",
+        "%(count)d new replies to: %(subject)s",
+        count,
+    ) % {'count': count, 'subject': subject}
 
 
 @login_required
 @ensure_csrf_cookie
 def inbox_view(request):
-    """View all received messages"""
+    """View received conversations (thread summaries, newest activity first)"""
     user = request.user
     
-    # Get messages where user is recipient or sent to all admins (recipient is None and user is admin)
-    if user.is_official():
-        messages = DirectMessage.objects.filter(
-            Q(recipient=user) | Q(recipient__isnull=True)
-        ).filter(parent_message__isnull=True).order_by('is_read', '-created_at')
-    else:
-        messages = DirectMessage.objects.filter(
-            recipient=user,
-            parent_message__isnull=True
-        ).order_by('is_read', '-created_at')
+    # One indexed range over the user's thread summaries
+    threads = ThreadParticipant.objects.filter(user=user, in_inbox=True).select_related(
+        'thread__root__sender', 'thread__last_sender'
+    ).order_by('-last_activity')
     
-    # Count unread messages
-    unread_count = messages.filter(is_read=False).count()
+    paginator = Paginator(threads, 20)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    
+    # Unread messages come from the inbox counter
+    unread_count = counters.get_counter(user).unread_messages
     
     context = {
-        'messages': messages,
+        'page_obj': page_obj,
+        'threads': page_obj,
         'unread_count': unread_count,
         'inbox_active': True,
     }
@@ -46,14 +65,17 @@ def inbox_view(request):
 
 @login_required
 def sent_messages_view(request):
-    """View all sent messages"""
-    messages = DirectMessage.objects.filter(
-        sender=request.user,
-        parent_message__isnull=True
-    )
+    """View conversations the user started"""
+    threads = ThreadParticipant.objects.filter(user=request.user, is_sender=True).select_related(
+        'thread__root__recipient', 'thread__last_sender'
+    ).order_by('-last_activity')
+    
+    paginator = Paginator(threads, 20)
+    page_obj = paginator.get_page(request.GET.get('page'))
     
     context = {
-        'messages': messages,
+        'page_obj': page_obj,
+        'threads': page_obj,
         'sent_active': True,
     }
     
@@ -84,19 +106,26 @@ def compose_message_view(request):
                     if secretary:
                         message.recipient = secretary
             
-            message.save()
-            
-            # Create notification for recipient
-            if message.recipient:
-                Notification.objects.create(
-                    user=message.recipient,
-                    title=_("New Message"),
-                    message=_("You have received a new message from {sender}: {subject}").format(
-                        sender=message.sender.get_full_name() or message.sender.username,
-                        subject=message.subject
-                    ),
-                    notification_type='message'
-                )
+            with transaction.atomic():
+                message.save()
+                threads.start_thread(message)
+                counters.adjust(counters.message_audience(message), unread_messages=1, total_messages=1)
+                
+                # Notify the recipient; a burst of messages becomes one notification
+                if message.recipient:
+                    dispatch.notify(
+                        message.recipient,
+                        title=_("New Message"),
+                        message=_("You have received a new message from {sender}: {subject}").format(
+                            sender=message.sender.get_full_name() or message.sender.username,
+                            subject=message.subject
+                        ),
+                        notification_type='message',
+                        link=reverse('direct_messages:inbox'),
+                        group_key='direct_messages:new',
+                        actor=message.sender,
+                        summarize=_summarize_new_messages,
+                    )
             
             django_messages.success(request, _("Message sent successfully!"))
             return redirect('direct_messages:sent')
@@ -114,7 +143,11 @@ def compose_message_view(request):
 @login_required
 def message_detail_view(request, pk):
     """View message details and replies"""
-    message = get_object_or_404(DirectMessage, pk=pk)
+    message = get_object_or_404(DirectMessage.objects.select_related('sender', 'recipient'), pk=pk)
+    
+    # Replies are shown inside their conversation
+    if message.parent_message_id:
+        return redirect('direct_messages:detail', pk=message.parent_message_id)
     
     # Check if user has permission to view this message
     if message.recipient:
@@ -129,17 +162,21 @@ def message_detail_view(request, pk):
     
     # Mark as read if user is recipient
     if request.user == message.recipient or (message.recipient is None and request.user.is_official()):
-        message.mark_as_read()
-        
-        # Also mark related "message" notifications as read so the bell badge clears
-        Notification.objects.filter(
-            user=request.user,
-            notification_type='message',
-            is_read=False,
-        ).update(is_read=True, read_at=timezone.now())
+        with transaction.atomic():
+            # Each recipient has their own receipt, so one official reading
+            # an "all admins" message leaves it unread for the others
+            if threads.read_message(message, request.user):
+                message.refresh_from_db(fields=['is_read', 'read_at'])
+            
+            threads.mark_read(threads.thread_for(message), request.user)
+            
+            # Also mark related "message" notifications as read so the bell badge clears
+            counters.mark_notifications_read(
+                request.user.id, Notification.objects.filter(notification_type='message')
+            )
     
-    # Get all replies
-    replies = message.replies.all()
+    # Get all replies with their senders in one query
+    replies = message.replies.select_related('sender')
     
     # Handle reply form
     if request.method == 'POST':
@@ -150,19 +187,25 @@ def message_detail_view(request, pk):
             reply.recipient = message.sender if request.user == message.recipient else message.recipient
             reply.subject = f"Re: {message.subject}"
             reply.parent_message = message
-            reply.save()
-            
-            # Create notification for recipient
-            if reply.recipient:
-                Notification.objects.create(
-                    user=reply.recipient,
-                    title=_("New Reply"),
-                    message=_("{sender} replied to your message: {subject}").format(
-                        sender=reply.sender.get_full_name() or reply.sender.username,
-                        subject=message.subject
-                    ),
-                    notification_type='message'
-                )
+            with transaction.atomic():
+                reply.save()
+                threads.add_reply(reply)
+                
+                # Notify the recipient; replies in one conversation are merged
+                if reply.recipient:
+                    dispatch.notify(
+                        reply.recipient,
+                        title=_("New Reply"),
+                        message=_("{sender} replied to your message: {subject}").format(
+                            sender=reply.sender.get_full_name() or reply.sender.username,
+                            subject=message.subject
+                        ),
+                        notification_type='message',
+                        link=reverse('direct_messages:detail', args=[message.pk]),
+                        group_key=f'direct_messages:reply:{message.pk}',
+                        actor=reply.sender,
+                        summarize=lambda count, actors: _summarize_replies(count, actors, message.subject),
+                    )
             
             django_messages.success(request, _("Reply sent successfully!"))
             return redirect('direct_messages:detail', pk=pk)
@@ -191,7 +234,12 @@ def delete_message_view(request, pk):
         return redirect('direct_messages:inbox')
     
     if request.method == 'POST':
-        message.delete()
+        with transaction.atomic():
+            if message.parent_message_id is None:
+                threads.forget_message(message)
+            else:
+                threads.remove_reply(message)
+            message.delete()
         
         # Return JSON for AJAX requests
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest' or request.content_type == 'application/json':
@@ -210,20 +258,5 @@ def delete_message_view(request, pk):
 @login_required
 def unread_count_api(request):
     """API endpoint to get unread message count"""
-    user = request.user
-    
-    # Get unread messages
-    if user.is_official():
-        unread_count = DirectMessage.objects.filter(
-            Q(recipient=user) | Q(recipient__isnull=True),
-            is_read=False,
-            parent_message__isnull=True
-        ).count()
-    else:
-        unread_count = DirectMessage.objects.filter(
-            recipient=user,
-            is_read=False,
-            parent_message__isnull=True
-        ).count()
-    
-    return JsonResponse({'unread_count': unread_count})
+    counts = badges.get_badge_counts(request.user)
+    return JsonResponse({'unread_count': counts['messages']})
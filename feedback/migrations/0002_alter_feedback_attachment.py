@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:49
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feedback', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='feedback',
+            name='attachment',
+            field=models.FileField(blank=True, null=True, storage=core.storage.get_storage, upload_to='feedback_attachments/'),
+        ),
+    ]
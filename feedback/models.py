@@ -4,6 +4,7 @@ Feedback models
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 from accounts.models import CustomUser
+from core.storage import get_storage
 
 
 class Feedback(models.Model):
@@ -21,7 +22,7 @@ class Feedback(models.Model):
     subject = models.CharField(max_length=255)
     message = models.TextField()
     rating = models.IntegerField(choices=RATING_CHOICES, default=3)
-    attachment = models.FileField(upload_to='feedback_attachments/', blank=True, null=True)
+    attachment = models.FileField(upload_to='feedback_attachments/', storage=get_storage, blank=True, null=True)
     
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
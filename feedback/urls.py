@@ -10,6 +10,7 @@ urlpatterns = [
     path('', views.feedback_list, name='feedback_list'),
     path('submit/', views.submit_feedback, name='submit_feedback'),
     path('<int:pk>/', views.feedback_detail, name='feedback_detail'),
+    path('<int:pk>/attachment/', views.feedback_attachment, name='feedback_attachment'),
     path('statistics/', views.feedback_statistics, name='feedback_statistics'),
     path('api/statistics/', views.feedback_statistics_api, name='feedback_statistics_api'),
 ]
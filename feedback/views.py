@@ -1,6 +1,8 @@
 """
 Feedback app views
 """
+import os
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
@@ -9,6 +11,7 @@ from django.utils.translation import gettext as _
 from django.utils import timezone
 from django.db.models import Count, Avg, Q
 from django.core.paginator import Paginator
+from core import media
 from .models import Feedback
 from .forms import FeedbackForm
 
@@ -109,6 +112,19 @@ def feedback_detail(request, pk):
     return render(request, 'feedback/feedback_detail.html', {'feedback': feedback})
 
 
+@login_required
+def feedback_attachment(request, pk):
+    """Stream a feedback attachment to its author or an official"""
+    feedback = get_object_or_404(Feedback, pk=pk)
+    
+    if not request.user.is_official() and feedback.user_id != request.user.id:
+        messages.error(request, _('Access denied.'))
+        return redirect('feedback:feedback_list')
+    
+    extension = os.path.splitext(feedback.attachment.name)[1]
+    return media.serve(request, feedback.attachment, filename=f'feedback-{feedback.pk}{extension}')
+
+
 @login_required
 def feedback_statistics(request):
     """Feedback statistics view"""
@@ -2,7 +2,7 @@
 Gallery admin
 """
 from django.contrib import admin
-from .models import PhotoCategory, Photo, PhotoLike, PhotoComment
+from .models import PhotoCategory, Photo, PhotoFingerprint, PhotoLike, PhotoComment
 
 
 @admin.register(PhotoCategory)
@@ -13,12 +13,20 @@ class PhotoCategoryAdmin(admin.ModelAdmin):
 
 @admin.register(Photo)
 class PhotoAdmin(admin.ModelAdmin):
-    list_display = ['title', 'uploaded_by', 'category', 'status', 'is_featured', 'view_count', 'like_count']
-    list_filter = ['status', 'is_featured', 'category', 'uploaded_at']
+    list_display = ['title', 'uploaded_by', 'category', 'status', 'is_featured', 'duplicate_of', 'view_count', 'like_count']
+    list_filter = ['status', 'is_featured', ('duplicate_of', admin.EmptyFieldListFilter), 'category', 'uploaded_at']
     search_fields = ['title', 'description']
+    raw_id_fields = ['duplicate_of']
     readonly_fields = ['uploaded_at', 'approved_at', 'view_count', 'like_count']
 
 
+@admin.register(PhotoFingerprint)
+class PhotoFingerprintAdmin(admin.ModelAdmin):
+    list_display = ['photo', 'dhash']
+    search_fields = ['dhash', 'photo__title']
+    raw_id_fields = ['photo']
+
+
 @admin.register(PhotoLike)
 class PhotoLikeAdmin(admin.ModelAdmin):
     list_display = ['photo', 'user', 'created_at']
@@ -0,0 +1,117 @@
+"""
+Near-duplicate photo detection
+
+Each photo gets a 64-bit difference hash (dHash): the image is shrunk to
+9x8 grey pixels and every bit records whether a pixel is brighter than its
+right-hand neighbour. Re-encoded, resized or slightly cropped copies of the
+same picture end up a few bits apart, so two photos are near-duplicates
+when the Hamming distance of their hashes is at most
+``PHOTO_DUPLICATE_DISTANCE``.
+
+Lookup uses multi-index hashing: the hash is stored as four indexed 16-bit
+bands. Two hashes within distance ``d`` have at least one band within
+``d // 4`` bits (pigeonhole), so a search only reads the rows whose band
+equals one of the few values that close to the query's band, and checks
+the full distance on those candidates. With 100k photos that is around a
+hundred rows instead of a table scan.
+"""
+from itertools import combinations
+
+from django.conf import settings
+from django.db.models import Q
+
+from .models import Photo, PhotoFingerprint
+
+BANDS = 4
+BAND_BITS = 16
+BAND_MASK = (1 << BAND_BITS) - 1
+
+
+def max_distance():
+    return getattr(settings, 'PHOTO_DUPLICATE_DISTANCE', 6)
+
+
+def dhash(file):
+    """Difference hash of an image file (any object ``PIL.Image.open`` accepts)"""
+    from PIL import Image, ImageOps
+
+    with Image.open(file) as image:
+        image.draft('L', (64, 64))  # JPEG: decode at reduced size, much faster
+        image = ImageOps.exif_transpose(image).convert('L').resize((9, 8), Image.LANCZOS)
+        pixels = list(image.getdata())
+    value = 0
+    for row in range(8):
+        for column in range(8):
+            left, right = pixels[row * 9 + column], pixels[row * 9 + column + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def bands(value):
+    return [(value >> (BAND_BITS * i)) & BAND_MASK for i in range(BANDS)]
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+def _neighbours(band, radius):
+    """Every band value within ``radius`` bits of ``band``"""
+    values = [band]
+    for flips in range(1, radius + 1):
+        for bits in combinations(range(BAND_BITS), flips):
+            flipped = band
+            for bit in bits:
+                flipped ^= 1 << bit
+            values.append(flipped)
+    return values
+
+
+def find_similar(value, distance=None, exclude=None):
+    """``[(photo_id, distance), ...]`` within ``distance`` of ``value``, closest first"""
+    distance = max_distance() if distance is None else distance
+    radius = distance // BANDS
+    lookup = Q()
+    for i, band in enumerate(bands(value)):
+        lookup |= Q(**{f'band_{i}__in': _neighbours(band, radius)})
+
+    candidates = PhotoFingerprint.objects.filter(lookup)
+    if exclude is not None:
+        candidates = candidates.exclude(photo_id=exclude)
+    matches = []
+    for photo_id, other in candidates.values_list('photo_id', 'dhash'):
+        found = hamming(value, int(other, 16))
+        if found <= distance:
+            matches.append((photo_id, found))
+    matches.sort(key=lambda match: (match[1], match[0]))
+    return matches
+
+
+def find_original(value, exclude=None, uploaded_before=None):
+    """The id of the earliest non-rejected photo ``value`` duplicates, or None"""
+    matches = dict(find_similar(value, exclude=exclude))
+    if not matches:
+        return None
+    photos = (
+        Photo.objects.filter(pk__in=matches).exclude(status='rejected')
+        .only('pk', 'duplicate_of_id', 'uploaded_at').order_by('uploaded_at', 'pk')
+    )
+    if uploaded_before is not None:
+        photos = photos.filter(uploaded_at__lt=uploaded_before)
+    for photo in photos:
+        # Link to the first upload of the picture, not to another copy
+        return photo.duplicate_of_id or photo.pk
+    return None
+
+
+def fingerprint(photo, value):
+    """Unsaved index row for ``photo``"""
+    return PhotoFingerprint(
+        photo=photo,
+        dhash=f'{value:016x}',
+        **{f'band_{i}': band for i, band in enumerate(bands(value))},
+    )
+
+
+def store(photo, value):
+    fingerprint(photo, value).save()  # The photo is the primary key: updates or inserts
@@ -12,19 +12,6 @@ class PhotoUploadForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
-        # Ensure there are some default categories available so the dropdown is never empty.
-        default_category_names = [
-            'General',
-            'Events',
-            'Programs',
-            'Services',
-            'Community',
-            'Infrastructure',
-            'Others',
-        ]
-        for name in default_category_names:
-            PhotoCategory.objects.get_or_create(name=name)
-
         # Configure category field queryset and label
         if 'category' in self.fields:
             self.fields['category'].queryset = PhotoCategory.objects.all().order_by('name')
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+
+from gallery import duplicates
+from gallery.models import Photo, PhotoFingerprint
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = 'Compute perceptual hashes for gallery photos uploaded before duplicate detection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Rehash photos that already have a hash')
+        parser.add_argument('--link', action='store_true',
+                            help='Also link each photo to an earlier near-duplicate (statuses are left alone)')
+
+    def handle(self, *args, **options):
+        photos = Photo.objects.order_by('uploaded_at', 'pk')
+        if options['force']:
+            PhotoFingerprint.objects.all().delete()
+        else:
+            photos = photos.filter(fingerprint__isnull=True)
+
+        hashed = failed = 0
+        batch = []
+        for photo in photos.only('pk', 'image').iterator(chunk_size=BATCH_SIZE):
+            try:
+                with photo.image.open('rb') as image:
+                    batch.append(duplicates.fingerprint(photo, duplicates.dhash(image)))
+            except Exception as exc:  # Missing or unreadable file; keep going
+                failed += 1
+                self.stderr.write(f'Photo {photo.pk}: {photo.image.name}: {exc}')
+                continue
+            if len(batch) >= BATCH_SIZE:
+                hashed += len(PhotoFingerprint.objects.bulk_create(batch))
+                batch = []
+        hashed += len(PhotoFingerprint.objects.bulk_create(batch))
+        self.stdout.write(self.style.SUCCESS(f'{hashed} photos hashed, {failed} failed'))
+
+        if options['link']:
+            self.stdout.write(self.style.SUCCESS(f'{self._link()} photos linked to an earlier duplicate'))
+
+    def _link(self):
+        linked = []
+        rows = (
+            PhotoFingerprint.objects.filter(photo__duplicate_of__isnull=True)
+            .order_by('photo__uploaded_at', 'photo_id')
+            .values_list('photo_id', 'photo__uploaded_at', 'dhash')
+        )
+        for photo_id, uploaded_at, dhash in rows.iterator(chunk_size=BATCH_SIZE):
+            original = duplicates.find_original(int(dhash, 16), exclude=photo_id, uploaded_before=uploaded_at)
+            if original:
+                linked.append(Photo(pk=photo_id, duplicate_of_id=original))
+        Photo.objects.bulk_update(linked, ['duplicate_of'], batch_size=BATCH_SIZE)
+        return len(linked)
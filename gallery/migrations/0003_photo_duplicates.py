@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gallery', '0002_alter_photo_image'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PhotoFingerprint',
+            fields=[
+                ('photo', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='fingerprint', serialize=False, to='gallery.photo')),
+                ('dhash', models.CharField(max_length=16)),
+                ('band_0', models.PositiveIntegerField(db_index=True)),
+                ('band_1', models.PositiveIntegerField(db_index=True)),
+                ('band_2', models.PositiveIntegerField(db_index=True)),
+                ('band_3', models.PositiveIntegerField(db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Photo Fingerprint',
+                'verbose_name_plural': 'Photo Fingerprints',
+            },
+        ),
+        migrations.AddField(
+            model_name='photo',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicates', to='gallery.photo'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Default photo categories, previously created on every upload request
+
+from django.db import migrations
+
+DEFAULT_CATEGORIES = ['General', 'Events', 'Programs', 'Services', 'Community', 'Infrastructure', 'Others']
+
+
+def create_default_categories(apps, schema_editor):
+    """Create default photo categories"""
+    PhotoCategory = apps.get_model('gallery', 'PhotoCategory')
+    for name in DEFAULT_CATEGORIES:
+        PhotoCategory.objects.get_or_create(name=name)
+
+
+def remove_default_categories(apps, schema_editor):
+    """Remove unused default categories (reverse operation)"""
+    PhotoCategory = apps.get_model('gallery', 'PhotoCategory')
+    PhotoCategory.objects.filter(name__in=DEFAULT_CATEGORIES, photos__isnull=True).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gallery', '0003_photo_duplicates'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_default_categories, remove_default_categories),
+    ]
@@ -4,6 +4,7 @@ Gallery models
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 from accounts.models import CustomUser
+from core.storage import get_storage
 
 
 class PhotoCategory(models.Model):
@@ -30,7 +31,7 @@ class Photo(models.Model):
     
     title = models.CharField(max_length=255)
     description = models.TextField(blank=True)
-    image = models.ImageField(upload_to='gallery/')
+    image = models.ImageField(upload_to='gallery/', storage=get_storage)
     category = models.ForeignKey(PhotoCategory, on_delete=models.SET_NULL, null=True, blank=True, related_name='photos')
     
     # User info
@@ -45,6 +46,9 @@ class Photo(models.Model):
     # Featured
     is_featured = models.BooleanField(default=False)
     
+    # Near-duplicate of an earlier photo (perceptual hash match); see gallery.duplicates
+    duplicate_of = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='duplicates')
+    
     # Engagement
     view_count = models.IntegerField(default=0)
     like_count = models.IntegerField(default=0)
@@ -58,6 +62,23 @@ class Photo(models.Model):
         return self.title
 
 
+class PhotoFingerprint(models.Model):
+    """64-bit difference hash of a photo, split into four indexed 16-bit bands for lookup"""
+    photo = models.OneToOneField(Photo, on_delete=models.CASCADE, primary_key=True, related_name='fingerprint')
+    dhash = models.CharField(max_length=16)  # Hex
+    band_0 = models.PositiveIntegerField(db_index=True)
+    band_1 = models.PositiveIntegerField(db_index=True)
+    band_2 = models.PositiveIntegerField(db_index=True)
+    band_3 = models.PositiveIntegerField(db_index=True)
+    
+    class Meta:
+        verbose_name = _('Photo Fingerprint')
+        verbose_name_plural = _('Photo Fingerprints')
+    
+    def __str__(self):
+        return f"{self.dhash} ({self.photo_id})"
+
+
 class PhotoLike(models.Model):
     """Track photo likes"""
     photo = models.ForeignKey(Photo, on_delete=models.CASCADE, related_name='likes')
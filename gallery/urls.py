@@ -19,6 +19,7 @@ urlpatterns = [
     # AJAX
     path('api/like/', views.like_photo, name='like_photo'),
     path('api/comment/', views.add_comment, name='add_comment'),
+    path('api/<int:pk>/comments/', views.photo_comments_api, name='photo_comments_api'),
     
     # Officials
     path('manage/', views.manage_gallery, name='manage_gallery'),
@@ -4,15 +4,23 @@ Gallery app views
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
 from django.utils.translation import gettext as _
 from django.utils import timezone
 from django.db.models import Q, Count
 from django.core.paginator import Paginator
+from django.views.decorators.http import require_http_methods
+from core import comments as comment_feed
+from core import engagement
+from core import registry
+from core import viewcounts
+from core.pagecache import cache_anonymous
 from .models import Photo, PhotoCategory, PhotoLike, PhotoComment
+from . import duplicates
 from .forms import PhotoUploadForm, PhotoCommentForm
 
 
+@cache_anonymous('gallery.Photo', 'gallery.PhotoCategory')
 def gallery_list(request):
     """Public gallery with filters, counts, pagination"""
     photos = Photo.objects.filter(status='approved').select_related('uploaded_by', 'category')
@@ -44,7 +52,7 @@ def gallery_list(request):
     page_obj = paginator.get_page(page_number)
     
     # Categories
-    categories = PhotoCategory.objects.all()
+    categories = registry.rows('gallery.PhotoCategory')
     
     context = {
         'page_obj': page_obj,
@@ -66,17 +74,17 @@ def photo_detail(request, pk):
         pk=pk
     )
     
-    # Increment view count
-    photo.view_count += 1
-    photo.save(update_fields=['view_count'])
+    # Optimized: buffered in the cache, written in batches (no row write per view)
+    viewcounts.record_view(photo, request)
     
     # Check if user has liked
     has_liked = False
     if request.user.is_authenticated:
         has_liked = PhotoLike.objects.filter(photo=photo, user=request.user).exists()
     
-    # Comments
-    comments = photo.comments.select_related('user').all()
+    # Only the latest page of comments; older ones load from the comment feed
+    all_comments = photo.comments.select_related('user')
+    comments, has_older_comments = comment_feed.latest(all_comments)
     
     # Comment form
     if request.method == 'POST' and request.user.is_authenticated:
@@ -95,6 +103,8 @@ def photo_detail(request, pk):
         'photo': photo,
         'has_liked': has_liked,
         'comments': comments,
+        'comment_count': all_comments.count() if has_older_comments else len(comments),
+        'has_older_comments': has_older_comments,
         'comment_form': comment_form,
     }
     
@@ -123,11 +133,7 @@ def category_photos(request, category_id):
 @login_required
 def upload_photo(request):
     """Upload photo (auto-approve, default category fallback)"""
-    # Ensure some default categories exist so the dropdown is not empty
-    default_category_names = ['General', 'Events', 'Programs', 'Services', 'Community', 'Infrastructure', 'Others']
-    for name in default_category_names:
-        PhotoCategory.objects.get_or_create(name=name)
-
+    # Default categories are seeded by migration 0004_default_photo_categories
     if request.method == 'POST':
         form = PhotoUploadForm(request.POST, request.FILES)
         if form.is_valid():
@@ -137,17 +143,26 @@ def upload_photo(request):
             
             # Default category if not provided
             if not photo.category:
-                default_cat, created = PhotoCategory.objects.get_or_create(name='General')
-                photo.category = default_cat
+                photo.category = registry.by_name('gallery.PhotoCategory', 'General')
+            
+            # Near-duplicates of an existing photo wait for an official instead
+            image_hash = duplicates.dhash(photo.image)
+            photo.duplicate_of_id = duplicates.find_original(image_hash)
+            if photo.duplicate_of_id:
+                photo.status = 'pending'
             
             photo.save()
+            duplicates.store(photo, image_hash)
             
+            if photo.duplicate_of_id:
+                messages.info(request, _('This photo looks like one already in the gallery, so an official will review it first.'))
+                return redirect('gallery:my_photos')
             messages.success(request, _('Photo uploaded successfully!'))
             return redirect('gallery:photo_detail', pk=photo.pk)
     else:
         form = PhotoUploadForm()
     
-    categories = PhotoCategory.objects.all()
+    categories = registry.rows('gallery.PhotoCategory')
     
     return render(request, 'gallery/upload_photo.html', {'form': form, 'categories': categories})
 
@@ -161,6 +176,7 @@ def my_photos(request):
     paginator = Paginator(photos, 12)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
+    page_obj.object_list = viewcounts.attach_pending(page_obj.object_list)
     
     return render(request, 'gallery/my_photos.html', {'page_obj': page_obj})
 
@@ -171,22 +187,20 @@ def like_photo(request):
     if request.method != 'POST':
         return JsonResponse({'error': 'POST required'}, status=400)
     
-    photo_id = request.POST.get('photo_id')
-    photo = get_object_or_404(Photo, pk=photo_id)
+    try:
+        photo_id = int(request.POST.get('photo_id'))
+    except (TypeError, ValueError):
+        return JsonResponse({'error': 'photo_id required'}, status=400)
     
-    like, created = PhotoLike.objects.get_or_create(photo=photo, user=request.user)
+    if not engagement.allow(engagement.PHOTO_LIKES, request.user, photo_id):
+        return JsonResponse({'error': _('Too many changes. Please wait a moment.')}, status=429)
     
-    if not created:
-        # Unlike
-        like.delete()
-        photo.like_count = max(0, photo.like_count - 1)
-        photo.save(update_fields=['like_count'])
-        return JsonResponse({'liked': False, 'like_count': photo.like_count})
-    else:
-        # Like
-        photo.like_count += 1
-        photo.save(update_fields=['like_count'])
-        return JsonResponse({'liked': True, 'like_count': photo.like_count})
+    # Optimized: toggle and F() counter update in one transaction, count returned by the UPDATE
+    try:
+        liked, like_count = engagement.toggle(engagement.PHOTO_LIKES, request.user, photo_id)
+    except Photo.DoesNotExist:
+        raise Http404
+    return JsonResponse({'liked': liked, 'like_count': like_count})
 
 
 @login_required
@@ -220,6 +234,35 @@ def add_comment(request):
     })
 
 
+def _serialize_comment(comment):
+    return {
+        'id': comment.id,
+        'user': comment.user.username,
+        'comment': comment.comment,
+        'created_at': comment.created_at.isoformat(),
+    }
+
+
+@require_http_methods(['GET', 'POST'])
+def photo_comments_api(request, pk):
+    """API: comment feed (GET ?after=/?before=/?limit=) and posting (POST, logged in)"""
+    photo = get_object_or_404(Photo, pk=pk)
+    
+    if request.method == 'GET':
+        return comment_feed.feed_response(request, photo.comments.select_related('user'), _serialize_comment)
+    
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Login required'}, status=403)
+    form = PhotoCommentForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({'error': 'Comment cannot be empty', 'errors': form.errors}, status=400)
+    comment = form.save(commit=False)
+    comment.photo = photo
+    comment.user = request.user
+    comment.save()
+    return JsonResponse({'success': True, 'comment': _serialize_comment(comment)})
+
+
 @login_required
 def manage_gallery(request):
     """Manage gallery (officials)"""
@@ -251,7 +294,7 @@ def manage_gallery(request):
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     
-    categories = PhotoCategory.objects.all()
+    categories = registry.rows('gallery.PhotoCategory')
     
     context = {
         'page_obj': page_obj,
@@ -327,9 +370,7 @@ def delete_photo(request, pk):
 
     photo = get_object_or_404(Photo, pk=pk)
 
-    # Delete the image file from storage first (if it exists), then the DB record
-    if photo.image:
-        photo.image.delete(save=False)
+    # The image is a shared blob: deleting the row releases it and core.storage removes it once unreferenced
     photo.delete()
 
     messages.success(request, _('Photo deleted from gallery.'))
@@ -8,8 +8,10 @@ from accounts.models import CustomUser
 from complaints.models import Complaint
 from announcements.models import Announcement
 from django.utils import timezone
+from core.pagecache import cache_anonymous
 
 
+@cache_anonymous('announcements.Announcement')
 def index(request):
     """Home page with public stats and latest announcements"""
     from django.db.models import Count, Q
@@ -87,14 +89,6 @@ def quick_stats_api(request):
         }
         cache.set(cache_key, data, 60)  # Cache for 1 minute
     
-    data = {
-        'total_residents': total_residents,
-        'total_complaints': total_complaints,
-        'pending_complaints': pending_complaints,
-        'resolved_complaints': resolved_complaints,
-        'resolution_rate': round(resolution_rate, 1),
-    }
-    
     return JsonResponse(data)
 
 
@@ -2,7 +2,7 @@
 Notifications admin
 """
 from django.contrib import admin
-from .models import Notification, NotificationPreference
+from .models import BroadcastNotification, InboxCounter, Notification, NotificationPreference
 
 
 @admin.register(Notification)
@@ -13,8 +13,24 @@ class NotificationAdmin(admin.ModelAdmin):
     readonly_fields = ['created_at', 'read_at']
 
 
+@admin.register(BroadcastNotification)
+class BroadcastNotificationAdmin(admin.ModelAdmin):
+    list_display = ['title', 'audience', 'notification_type', 'created_at']
+    list_filter = ['audience', 'notification_type', 'created_at']
+    search_fields = ['title', 'message']
+    raw_id_fields = ['announcement']
+    readonly_fields = ['created_at']
+
+
 @admin.register(NotificationPreference)
 class NotificationPreferenceAdmin(admin.ModelAdmin):
     list_display = ['user', 'email_announcements', 'email_complaints', 'email_services']
     search_fields = ['user__username']
 
+
+
+@admin.register(InboxCounter)
+class InboxCounterAdmin(admin.ModelAdmin):
+    list_display = ['user', 'unread_notifications', 'total_notifications', 'unread_messages', 'total_messages']
+    search_fields = ['user__username']
+    readonly_fields = ['unread_notifications', 'total_notifications', 'unread_messages', 'total_messages']
@@ -0,0 +1,93 @@
+"""
+Navigation badges (notifications, messages, complaints)
+
+Notification and message counts come from the user's ``InboxCounter`` row
+(one primary-key lookup) plus a count of unread broadcasts; complaint counts are kept in the shared cache
+until a complaint changes. Nothing here writes on the read path.
+
+The ``invalidate_*`` helpers are called whenever a counted row changes. They
+drop cached values and publish on the push channel (``notifications.push``)
+so open pages refresh their badges at once.
+"""
+from django.core.cache import cache
+from django.db import transaction
+
+from . import push
+
+BADGE_TIMEOUT = 300  # Safety net; complaint counts are normally invalidated on write
+
+OFFICIAL_COMPLAINTS_KEY = 'badge_complaints_officials'
+UNRESOLVED_COMPLAINT_STATUSES = ['pending', 'in_progress']
+
+
+def _complaints_key(user):
+    if user.is_official():
+        return OFFICIAL_COMPLAINTS_KEY
+    return f'badge_complaints_{user.id}'
+
+
+def _count_complaints(user):
+    from complaints.models import Complaint
+
+    complaints = Complaint.objects.filter(status__in=UNRESOLVED_COMPLAINT_STATUSES)
+    if not user.is_official():
+        complaints = complaints.filter(user=user)
+    return complaints.count()
+
+
+def get_badge_counts(user):
+    """Return ``{'notifications', 'messages', 'complaints'}`` for the navigation badges"""
+    from .broadcasts import unread_count
+    from .counters import get_counter
+
+    counter = get_counter(user)
+    return {
+        'notifications': counter.unread_notifications + unread_count(user, counter),
+        'messages': counter.unread_messages,
+        'complaints': get_complaint_badge(user),
+    }
+
+
+def get_complaint_badge(user):
+    """Unresolved complaint count shown next to the Complaints menu item"""
+    key = _complaints_key(user)
+    count = cache.get(key)
+    if count is None:
+        count = _count_complaints(user)
+        cache.set(key, count, BADGE_TIMEOUT)
+    return count
+
+
+def invalidate_notifications(user_ids):
+    """Notification counts of the given users changed"""
+    for user_id in user_ids:
+        push.publish(push.user_channel(user_id), 'notifications')
+
+
+def invalidate_all_notifications():
+    """Notification counts changed for everyone (e.g. after a bulk fan-out)"""
+    push.publish(push.ALL_USERS_CHANNEL, 'notifications')
+
+
+def invalidate_messages(user_ids):
+    """Message counts of the given users changed"""
+    for user_id in user_ids:
+        push.publish(push.user_channel(user_id), 'messages')
+
+
+def invalidate_complaints(user_ids):
+    """
+    Drop complaint counters for the given residents and for all officials.
+
+    Runs once the current transaction commits: a client refetching on the
+    push must not read (and re-cache) the count from before the change.
+    """
+    user_ids = [user_id for user_id in user_ids if user_id]
+
+    def invalidate():
+        cache.delete_many([OFFICIAL_COMPLAINTS_KEY] + [f'badge_complaints_{user_id}' for user_id in user_ids])
+        push.publish(push.OFFICIALS_CHANNEL, 'complaints')
+        for user_id in user_ids:
+            push.publish(push.user_channel(user_id), 'complaints')
+
+    transaction.on_commit(invalidate)
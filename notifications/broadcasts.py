@@ -0,0 +1,149 @@
+"""
+Fan-out-on-read broadcast notifications
+
+A broadcast is stored once in ``BroadcastNotification`` and shown to every
+member of its audience who joined before it was sent, instead of writing a
+``Notification`` row per user. Per-user state lives on the ``InboxCounter``
+row: a read watermark plus the few ids read above it, and a floor plus the
+few ids the user deleted.
+
+The notification list merges personal and broadcast rows with one UNION
+query ordered by ``created_at``; badges add the number of unread broadcasts.
+"""
+from django.db import transaction
+from django.db.models import BooleanField, Case, Count, F, Max, Q, Value, When
+
+from . import badges
+from .counters import get_counter
+from .models import BroadcastNotification, InboxCounter, Notification
+
+# Columns shared by personal and broadcast rows in the merged list
+LIST_FIELDS = ('id', 'title', 'message', 'notification_type', 'link', 'created_at', 'read', 'kind')
+
+
+def audiences_for(user):
+    return ['all', 'officials' if user.is_official() else 'residents']
+
+
+def publish(title, message, audience='all', **fields):
+    """Store a broadcast once and refresh the badges of everyone online"""
+    broadcast = BroadcastNotification.objects.create(title=title, message=message, audience=audience, **fields)
+    badges.invalidate_all_notifications()
+    return broadcast
+
+
+def visible(user, counter):
+    """Broadcasts the user can see"""
+    broadcasts = BroadcastNotification.objects.filter(
+        audience__in=audiences_for(user),
+        created_at__gte=user.date_joined,
+        pk__gt=counter.broadcast_floor,
+    )
+    if counter.broadcast_dismissed:
+        broadcasts = broadcasts.exclude(pk__in=counter.broadcast_dismissed)
+    return broadcasts
+
+
+def _read_q(counter):
+    read = Q(pk__lte=counter.broadcast_watermark)
+    if counter.broadcast_read:
+        read |= Q(pk__in=counter.broadcast_read)
+    return read
+
+
+def with_read_state(broadcasts, counter):
+    """Annotate ``is_read`` from the user's watermark and read set"""
+    return broadcasts.annotate(
+        is_read=Case(When(_read_q(counter), then=Value(True)), default=Value(False), output_field=BooleanField())
+    )
+
+
+def unread(user, counter):
+    return visible(user, counter).exclude(_read_q(counter))
+
+
+def unread_count(user, counter=None):
+    return unread(user, counter or get_counter(user)).count()
+
+
+def counts(user, counter):
+    """``(visible, unread)`` broadcast counts in one query"""
+    totals = visible(user, counter).aggregate(
+        total=Count('pk'), unread=Count('pk', filter=~_read_q(counter))
+    )
+    return totals['total'], totals['unread']
+
+
+def merged(user, counter, filter_type='all'):
+    """Personal and broadcast notifications as one queryset of dicts, newest first"""
+    personal = Notification.objects.filter(user=user)
+    broadcasts = with_read_state(visible(user, counter), counter)
+    if filter_type == 'unread':
+        personal = personal.filter(is_read=False)
+        broadcasts = broadcasts.filter(is_read=False)
+    elif filter_type == 'read':
+        personal = personal.filter(is_read=True)
+        broadcasts = broadcasts.filter(is_read=True)
+
+    personal = personal.order_by().annotate(read=F('is_read'), kind=Value('personal')).values(*LIST_FIELDS)
+    broadcasts = broadcasts.order_by().annotate(read=F('is_read'), kind=Value('broadcast')).values(*LIST_FIELDS)
+    return personal.union(broadcasts, all=True).order_by('-created_at')
+
+
+def as_items(rows):
+    """Shape merged rows like notifications; broadcast ids become ``broadcast/<id>``"""
+    items = []
+    for row in rows:
+        row = dict(row)
+        row['is_read'] = row.pop('read')
+        if row['kind'] == 'broadcast':
+            row['id'] = f"broadcast/{row['id']}"
+        items.append(row)
+    return items
+
+
+def _locked_counter(user):
+    get_counter(user)  # Make sure the row exists
+    return InboxCounter.objects.select_for_update().get(pk=user.pk)
+
+
+def _save_state(counter):
+    counter.save(update_fields=['broadcast_watermark', 'broadcast_floor', 'broadcast_read', 'broadcast_dismissed'])
+    badges.invalidate_notifications([counter.pk])
+
+
+def mark_read(user, ids=None):
+    """Mark broadcasts read (every visible one when ``ids`` is None)"""
+    with transaction.atomic():
+        counter = _locked_counter(user)
+        read = set(counter.broadcast_read)
+        if ids is not None:
+            read.update(int(pk) for pk in ids)
+            counter.broadcast_read = sorted(read)
+            first_unread = unread(user, counter).order_by('pk').values_list('pk', flat=True).first()
+        else:
+            first_unread = None
+
+        # Keep the state compact: move the watermark up to the first unread
+        # broadcast and forget the ids it now covers
+        if first_unread is None:
+            newest = BroadcastNotification.objects.aggregate(newest=Max('pk'))['newest'] or 0
+            counter.broadcast_watermark = max(counter.broadcast_watermark, newest)
+        else:
+            counter.broadcast_watermark = max(counter.broadcast_watermark, first_unread - 1)
+        counter.broadcast_read = [pk for pk in sorted(read) if pk > counter.broadcast_watermark]
+        _save_state(counter)
+
+
+def dismiss(user, ids=None):
+    """Hide broadcasts from the user's list (every current one when ``ids`` is None)"""
+    with transaction.atomic():
+        counter = _locked_counter(user)
+        if ids is None:
+            newest = BroadcastNotification.objects.aggregate(newest=Max('pk'))['newest'] or 0
+            counter.broadcast_floor = max(counter.broadcast_floor, newest)
+        else:
+            dismissed = set(counter.broadcast_dismissed) | {int(pk) for pk in ids}
+            counter.broadcast_dismissed = sorted(dismissed)
+        counter.broadcast_dismissed = [pk for pk in counter.broadcast_dismissed if pk > counter.broadcast_floor]
+        _save_state(counter)
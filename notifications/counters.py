@@ -0,0 +1,120 @@
+"""
+Denormalized inbox counters
+
+``InboxCounter`` holds each user's notification and direct-message totals so
+badges and list headers are a single primary-key lookup. Every write that
+changes what is counted calls ``adjust`` inside the same transaction, which
+updates the row with ``F()`` expressions. A missing row is rebuilt from the
+source tables on first read.
+"""
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from . import badges
+from .models import InboxCounter, Notification
+
+NOTIFICATION_FIELDS = ('unread_notifications', 'total_notifications')
+MESSAGE_FIELDS = ('unread_messages', 'total_messages')
+
+
+def official_ids():
+    """Users who share messages sent to all admins"""
+    from accounts.models import CustomUser
+    return list(CustomUser.objects.filter(
+        Q(is_superuser=True) | Q(role__in=['chairman', 'secretary'])
+    ).values_list('id', flat=True))
+
+
+def message_audience(message):
+    """Users whose inbox counts a top-level direct message"""
+    if message.recipient_id:
+        return [message.recipient_id]
+    return official_ids()
+
+
+def count_for(user):
+    """Recount a user's totals from the source tables"""
+    from direct_messages.models import MessageReceipt
+
+    notifications = Notification.objects.filter(user=user)
+    # One receipt per delivered top-level message, indexed on (user, is_read)
+    messages = MessageReceipt.objects.filter(user=user)
+    return {
+        'unread_notifications': notifications.filter(is_read=False).count(),
+        'total_notifications': notifications.count(),
+        'unread_messages': messages.filter(is_read=False).count(),
+        'total_messages': messages.count(),
+    }
+
+
+def rebuild(user):
+    counter, created = InboxCounter.objects.update_or_create(user=user, defaults=count_for(user))
+    return counter
+
+
+def get_counter(user):
+    """Read a user's counters with one primary-key lookup"""
+    try:
+        return InboxCounter.objects.get(pk=user.pk)
+    except InboxCounter.DoesNotExist:
+        return rebuild(user)
+
+
+def adjust(users, **deltas):
+    """
+    Apply deltas such as ``unread_notifications=-1`` to one or more users.
+
+    ``users`` may be a user id, an iterable of ids or a queryset of ids;
+    call inside the transaction that performs the counted write.
+    """
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return 0
+    counters = InboxCounter.objects.all()
+    if isinstance(users, int):
+        user_ids = [users]
+        counters = counters.filter(pk=users)
+    else:
+        user_ids = None if hasattr(users, 'query') else list(users)
+        counters = counters.filter(pk__in=users if user_ids is None else user_ids)
+    updated = counters.update(**{field: F(field) + delta for field, delta in deltas.items()})
+
+    # Tell open pages their badges moved
+    if any(field in deltas for field in NOTIFICATION_FIELDS):
+        if user_ids is None:
+            badges.invalidate_all_notifications()
+        else:
+            badges.invalidate_notifications(user_ids)
+    if any(field in deltas for field in MESSAGE_FIELDS):
+        badges.invalidate_messages(user_ids or [])
+    return updated
+
+
+def forget_notifications(notifications):
+    """Take rows about to be deleted (by any user) out of their owners' counters"""
+    per_user = notifications.values('user_id').annotate(
+        total=Count('id'), unread=Count('id', filter=Q(is_read=False))
+    ).order_by()
+    for row in per_user:
+        adjust(row['user_id'], total_notifications=-row['total'], unread_notifications=-row['unread'])
+
+
+def mark_notifications_read(user_id, notifications):
+    """Mark a user's notifications read and move the counter by what actually changed"""
+    with transaction.atomic():
+        changed = notifications.filter(user_id=user_id, is_read=False).update(
+            is_read=True, read_at=timezone.now()
+        )
+        adjust(user_id, unread_notifications=-changed)
+    return changed
+
+
+def delete_notifications(user_id, notifications):
+    """Delete a user's notifications and their share of the counters"""
+    with transaction.atomic():
+        notifications = notifications.filter(user_id=user_id)
+        totals = notifications.aggregate(total=Count('id'), unread=Count('id', filter=Q(is_read=False)))
+        notifications.delete()
+        adjust(user_id, total_notifications=-totals['total'], unread_notifications=-totals['unread'])
+    return totals['total']
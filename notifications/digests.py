@@ -0,0 +1,241 @@
+"""
+Email digests of pending notifications
+
+One email per user summarises the unread notifications (and announcement
+broadcasts) received since their last digest, limited to the types their
+``NotificationPreference.email_*`` flags allow. Messages go out in batches
+over a single reused SMTP connection, throttled to a maximum rate.
+
+A run reads the window's broadcasts once and each batch of users' unread
+notifications with one query, then works out every user's items in memory
+from their read watermark and dismissed list.
+"""
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import Q
+from django.template.loader import render_to_string
+from django.utils import timezone, translation
+from django.utils.translation import ngettext
+
+from accounts.models import CustomUser
+
+from . import broadcasts
+from .counters import get_counter
+from .models import BroadcastNotification, InboxCounter, Notification, NotificationPreference
+
+# notification_type -> NotificationPreference flag that allows emailing it
+EMAIL_FLAGS = {
+    'announcement': 'email_announcements',
+    'complaint': 'email_complaints',
+    'service': 'email_services',
+}
+
+ITEM_FIELDS = ('title', 'message', 'link', 'created_at', 'notification_type')
+MAX_ITEMS = 50
+USER_CHUNK = 500  # Users whose notifications are read with one query
+
+
+@dataclass
+class DigestReport:
+    users: int = 0
+    sent: int = 0
+    failed: int = 0
+    elapsed: float = 0.0
+    errors: list = field(default_factory=list)
+
+    @property
+    def rate(self):
+        return self.sent / self.elapsed if self.elapsed else 0.0
+
+
+def email_types(preferences):
+    """Notification types the user wants by email (all of them without a preferences row)"""
+    return [
+        notification_type for notification_type, flag in EMAIL_FLAGS.items()
+        if preferences is None or getattr(preferences, flag)
+    ]
+
+
+def candidates(since, shared):
+    """Users with an email address who may have something to receive"""
+    users = CustomUser.objects.filter(is_active=True, is_approved=True).exclude(email='')
+    has_personal = Q(notifications__created_at__gte=since,
+                     notifications__is_read=False,
+                     notifications__notification_type__in=list(EMAIL_FLAGS))
+    if shared:
+        return users.order_by('pk')
+    return users.filter(has_personal).distinct().order_by('pk')
+
+
+def window_broadcasts(since):
+    """Emailable broadcasts sent in the window (read once per run)"""
+    return list(
+        BroadcastNotification.objects.filter(created_at__gte=since, notification_type__in=list(EMAIL_FLAGS))
+        .order_by('-created_at')
+        .values('id', 'audience', *ITEM_FIELDS)
+    )
+
+
+def personal_items(user_ids, since):
+    """``{user_id: [unread notification, ...]}`` newest first, for a batch of users"""
+    items = {}
+    rows = (
+        Notification.objects.filter(
+            user_id__in=user_ids, is_read=False, created_at__gte=since,
+            notification_type__in=list(EMAIL_FLAGS),
+        )
+        .order_by('user_id', '-created_at')
+        .values('user_id', *ITEM_FIELDS)
+    )
+    for row in rows:
+        user_items = items.setdefault(row.pop('user_id'), [])
+        if len(user_items) < MAX_ITEMS:
+            user_items.append(row)
+    return items
+
+
+def _unread_broadcast(broadcast, user, counter, audiences):
+    """``broadcasts.unread`` for one already-loaded broadcast row"""
+    return (
+        broadcast['audience'] in audiences
+        and broadcast['created_at'] >= user.date_joined
+        and broadcast['id'] > counter.broadcast_floor
+        and broadcast['id'] not in counter.broadcast_dismissed
+        and broadcast['id'] > counter.broadcast_watermark
+        and broadcast['id'] not in counter.broadcast_read
+    )
+
+
+def pending_items(user, preferences, since, personal, shared):
+    """
+    Unread notifications since the user's last digest, newest first.
+
+    ``personal`` are the user's rows from ``personal_items`` and ``shared``
+    the run's ``window_broadcasts``; nothing is queried here.
+    """
+    types = email_types(preferences)
+    if not types:
+        return []
+    if preferences is not None and preferences.last_digest_at:
+        since = max(since, preferences.last_digest_at)
+
+    items = [item for item in personal if item['created_at'] >= since and item['notification_type'] in types]
+    if shared:
+        try:
+            counter = user.inbox_counter
+        except InboxCounter.DoesNotExist:
+            counter = get_counter(user)
+        audiences = broadcasts.audiences_for(user)
+        items += [
+            {field: broadcast[field] for field in ITEM_FIELDS} for broadcast in shared
+            if broadcast['created_at'] >= since and broadcast['notification_type'] in types
+            and _unread_broadcast(broadcast, user, counter, audiences)
+        ][:MAX_ITEMS]
+    return sorted(items, key=lambda item: item['created_at'], reverse=True)[:MAX_ITEMS]
+
+
+def build_message(user, items, connection):
+    site_url = getattr(settings, 'SITE_URL', '').rstrip('/')
+    context = {'user': user, 'items': items, 'site_url': site_url}
+    subject = ngettext(
+        '%(count)d new notification',
+        '%(count)d new notifications',
+        len(items),
+    ) % {'count': len(items)}
+    message = EmailMultiAlternatives(
+        subject=f"{settings.EMAIL_SUBJECT_PREFIX}{subject}",
+        body=render_to_string('notifications/email/digest.txt', context),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[user.email],
+        connection=connection,
+    )
+    message.attach_alternative(render_to_string('notifications/email/digest.html', context), 'text/html')
+    return message
+
+
+def send_digests(window=None, batch_size=None, rate=None, dry_run=False, limit=None):
+    """Build and send one digest per user; returns a ``DigestReport``"""
+    window = window or timedelta(hours=getattr(settings, 'DIGEST_WINDOW_HOURS', 24))
+    batch_size = batch_size or getattr(settings, 'DIGEST_BATCH_SIZE', 50)
+    rate = rate if rate is not None else getattr(settings, 'DIGEST_RATE_LIMIT', 10)
+    now = timezone.now()
+    since = now - window
+    report = DigestReport()
+    started = time.monotonic()
+
+    connection = get_connection(fail_silently=False)
+    connection.open()  # One SMTP session for the whole run
+    try:
+        batch, batch_users = [], []
+        shared = window_broadcasts(since)
+        users = candidates(since, shared).select_related('notification_preferences', 'inbox_counter')
+        for chunk in _chunks(users.iterator(chunk_size=USER_CHUNK), USER_CHUNK):
+            personal = personal_items([user.pk for user in chunk], since)
+            for user in chunk:
+                try:
+                    preferences = user.notification_preferences
+                except NotificationPreference.DoesNotExist:
+                    preferences = None
+                items = pending_items(user, preferences, since, personal.get(user.pk, []), shared)
+                if not items:
+                    continue
+                report.users += 1
+                with translation.override(settings.LANGUAGE_CODE):
+                    batch.append(build_message(user, items, connection))
+                batch_users.append(user.pk)
+                if len(batch) >= batch_size:
+                    _flush(batch, batch_users, connection, rate, started, report, now, dry_run)
+                    batch, batch_users = [], []
+                if limit and report.users >= limit:
+                    break
+            if limit and report.users >= limit:
+                break
+        if batch:
+            _flush(batch, batch_users, connection, rate, started, report, now, dry_run)
+    finally:
+        connection.close()
+
+    report.elapsed = time.monotonic() - started
+    return report
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _flush(batch, user_ids, connection, rate, started, report, now, dry_run):
+    if rate and not dry_run:
+        # Don't run ahead of the allowed messages per second
+        ahead = (report.sent + len(batch)) / rate - (time.monotonic() - started)
+        if ahead > 0:
+            time.sleep(ahead)
+    if dry_run:
+        report.sent += len(batch)
+        return
+    try:
+        sent = connection.send_messages(batch) or 0
+    except Exception as exc:
+        report.failed += len(batch)
+        report.errors.append(str(exc))
+        return
+    report.sent += sent
+    report.failed += len(batch) - sent
+
+    # Remember what was covered so the next run starts from here
+    updated = set(NotificationPreference.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True))
+    NotificationPreference.objects.filter(user_id__in=updated).update(last_digest_at=now)
+    NotificationPreference.objects.bulk_create(
+        [NotificationPreference(user_id=user_id, last_digest_at=now) for user_id in user_ids if user_id not in updated],
+        ignore_conflicts=True,
+    )
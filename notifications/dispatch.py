@@ -0,0 +1,101 @@
+"""
+Central entry point for per-user notifications
+
+Every call site creates notifications through ``notify`` so that:
+
+* ``NotificationPreference.app_*`` flags are honoured before anything is
+  written;
+* the user's ``InboxCounter`` is adjusted in the same transaction;
+* bursts are coalesced: a notification with a ``group_key`` is merged into
+  the user's unread notification with the same key created within
+  ``NOTIFICATION_COALESCE_WINDOW`` seconds. The merged row counts the events
+  and the distinct actors, moves to the top of the list, and its text is
+  rewritten by the caller's ``summarize(count, actor_count)``. Merging does
+  not change the unread count.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import badges, counters
+from .models import Notification, NotificationPreference
+
+# notification_type -> NotificationPreference flag that switches it off
+PREFERENCE_FLAGS = {
+    'announcement': 'app_announcements',
+    'complaint': 'app_complaints',
+    'service': 'app_services',
+}
+
+
+def wants(user, notification_type):
+    """Whether the user accepts in-app notifications of this type"""
+    flag = PREFERENCE_FLAGS.get(notification_type)
+    if flag is None:
+        return True
+    user_id = getattr(user, 'pk', user)
+    return not NotificationPreference.objects.filter(user_id=user_id, **{flag: False}).exists()
+
+
+def coalesce_window():
+    return timedelta(seconds=getattr(settings, 'NOTIFICATION_COALESCE_WINDOW', 3600))
+
+
+def notify(user, title, message, notification_type='info', link='', *,
+           group_key='', actor=None, summarize=None):
+    """
+    Create (or merge into) a notification for one user.
+
+    ``user`` may be a user or a user id. Returns the notification written, or
+    None when the user's preferences turned it off.
+    """
+    user_id = getattr(user, 'pk', user)
+    if not wants(user_id, notification_type):
+        return None
+    actor_id = getattr(actor, 'pk', actor)
+
+    with transaction.atomic():
+        if group_key:
+            existing = (
+                Notification.objects.select_for_update()
+                .filter(
+                    user_id=user_id,
+                    group_key=group_key,
+                    is_read=False,
+                    created_at__gte=timezone.now() - coalesce_window(),
+                )
+                .order_by('-created_at')
+                .first()
+            )
+            if existing is not None:
+                return _merge(existing, title, message, link, actor_id, summarize)
+
+        notification = Notification.objects.create(
+            user_id=user_id,
+            title=title,
+            message=message,
+            notification_type=notification_type,
+            link=link,
+            group_key=group_key,
+            actors=[actor_id] if actor_id else [],
+        )
+        counters.adjust(user_id, unread_notifications=1, total_notifications=1)
+    return notification
+
+
+def _merge(notification, title, message, link, actor_id, summarize):
+    notification.event_count += 1
+    if actor_id and actor_id not in notification.actors:
+        notification.actors.append(actor_id)
+    if summarize is not None:
+        title, message = summarize(notification.event_count, max(len(notification.actors), 1))
+    notification.title = title
+    notification.message = message
+    notification.link = link or notification.link
+    # created_at doubles as "last event at" so the merged row sorts first
+    notification.created_at = timezone.now()
+    notification.save(update_fields=['title', 'message', 'link', 'event_count', 'actors', 'created_at'])
+    badges.invalidate_notifications([notification.user_id])
+    return notification
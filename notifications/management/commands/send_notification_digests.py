@@ -0,0 +1,35 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from notifications.digests import send_digests
+
+
+class Command(BaseCommand):
+    help = 'Email each user one digest of their unread notifications (honours email_* preferences)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, default=None,
+                            help='Look back this many hours (default: DIGEST_WINDOW_HOURS)')
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Messages per send on the shared connection (default: DIGEST_BATCH_SIZE)')
+        parser.add_argument('--rate', type=float, default=None,
+                            help='Maximum messages per second, 0 for no limit (default: DIGEST_RATE_LIMIT)')
+        parser.add_argument('--limit', type=int, default=None, help='Stop after this many users')
+        parser.add_argument('--dry-run', action='store_true', help='Build the emails without sending them')
+
+    def handle(self, *args, **options):
+        report = send_digests(
+            window=timedelta(hours=options['hours']) if options['hours'] else None,
+            batch_size=options['batch_size'],
+            rate=options['rate'],
+            dry_run=options['dry_run'],
+            limit=options['limit'],
+        )
+        for error in report.errors:
+            self.stdout.write(self.style.ERROR(error))
+        verb = 'Built' if options['dry_run'] else 'Sent'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {report.sent} digest(s) for {report.users} user(s), {report.failed} failed, '
+            f'in {report.elapsed:.2f}s ({report.rate:.1f} msg/s)'
+        ))
@@ -0,0 +1,71 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:21
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Q
+
+
+def backfill_counters(apps, schema_editor):
+    CustomUser = apps.get_model('accounts', 'CustomUser')
+    Notification = apps.get_model('notifications', 'Notification')
+    DirectMessage = apps.get_model('direct_messages', 'DirectMessage')
+    InboxCounter = apps.get_model('notifications', 'InboxCounter')
+
+    notification_counts = {
+        row['user_id']: row
+        for row in Notification.objects.values('user_id').annotate(
+            total=Count('id'), unread=Count('id', filter=Q(is_read=False))
+        )
+    }
+    top_level = DirectMessage.objects.filter(parent_message__isnull=True)
+    message_counts = {
+        row['recipient_id']: row
+        for row in top_level.values('recipient_id').annotate(
+            total=Count('id'), unread=Count('id', filter=Q(is_read=False))
+        )
+    }
+    empty = {'total': 0, 'unread': 0}
+    to_officials = message_counts.get(None, empty)
+
+    counters = []
+    for user in CustomUser.objects.only('id', 'role', 'is_superuser').iterator():
+        notifications = notification_counts.get(user.id, empty)
+        messages = message_counts.get(user.id, empty)
+        is_official = user.is_superuser or user.role in ['chairman', 'secretary']
+        shared = to_officials if is_official else empty
+        counters.append(InboxCounter(
+            user_id=user.id,
+            unread_notifications=notifications['unread'],
+            total_notifications=notifications['total'],
+            unread_messages=messages['unread'] + shared['unread'],
+            total_messages=messages['total'] + shared['total'],
+        ))
+    InboxCounter.objects.bulk_create(counters, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_customuser_accounts_cu_is_appr_65d03b_idx_and_more'),
+        ('direct_messages', '0001_initial'),
+        ('notifications', '0002_notification_notificatio_user_id_f2ad08_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InboxCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='inbox_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('unread_notifications', models.IntegerField(default=0)),
+                ('total_notifications', models.IntegerField(default=0)),
+                ('unread_messages', models.IntegerField(default=0)),
+                ('total_messages', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Inbox Counter',
+                'verbose_name_plural': 'Inbox Counters',
+            },
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('announcements', '0004_announcementfanout'),
+        ('notifications', '0003_inboxcounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inboxcounter',
+            name='broadcast_dismissed',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='inboxcounter',
+            name='broadcast_floor',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='inboxcounter',
+            name='broadcast_read',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='inboxcounter',
+            name='broadcast_watermark',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='BroadcastNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=255)),
+                ('message', models.TextField()),
+                ('notification_type', models.CharField(choices=[('info', 'Information'), ('success', 'Success'), ('warning', 'Warning'), ('error', 'Error'), ('announcement', 'Announcement'), ('complaint', 'Complaint'), ('service', 'Service')], default='info', max_length=20)),
+                ('link', models.CharField(blank=True, max_length=255)),
+                ('audience', models.CharField(choices=[('all', 'Everyone'), ('residents', 'Residents'), ('officials', 'Officials')], default='all', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('announcement', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='broadcasts', to='announcements.announcement')),
+            ],
+            options={
+                'verbose_name': 'Broadcast Notification',
+                'verbose_name_plural': 'Broadcast Notifications',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['audience', '-created_at'], name='notificatio_audienc_6dd295_idx')],
+            },
+        ),
+    ]
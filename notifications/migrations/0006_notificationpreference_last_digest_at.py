@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0005_notification_coalescing'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationpreference',
+            name='last_digest_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -17,6 +17,7 @@ class Notification(models.Model):
         ('announcement', _('Announcement')),
         ('complaint', _('Complaint')),
         ('service', _('Service')),
+        ('message', _('Message')),
     ]
     
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='notifications')
@@ -27,6 +28,12 @@ class Notification(models.Model):
     # Link to related object
     link = models.CharField(max_length=255, blank=True)
     
+    # Coalescing (see notifications.dispatch): unread notifications with the
+    # same group key are merged into one row that counts the events
+    group_key = models.CharField(max_length=100, blank=True)
+    event_count = models.PositiveIntegerField(default=1)
+    actors = models.JSONField(default=list, blank=True)
+    
     # Read status
     is_read = models.BooleanField(default=False)
     read_at = models.DateTimeField(null=True, blank=True)
@@ -41,6 +48,7 @@ class Notification(models.Model):
         indexes = [
             models.Index(fields=['user', 'is_read', '-created_at']),
             models.Index(fields=['user', '-created_at']),
+            models.Index(fields=['user', 'group_key', 'is_read']),
         ]
     
     def __str__(self):
@@ -61,6 +69,9 @@ class NotificationPreference(models.Model):
     app_complaints = models.BooleanField(default=True)
     app_services = models.BooleanField(default=True)
     
+    # End of the window covered by the last email digest
+    last_digest_at = models.DateTimeField(null=True, blank=True)
+    
     class Meta:
         verbose_name = _('Notification Preference')
         verbose_name_plural = _('Notification Preferences')
@@ -68,3 +79,65 @@ class NotificationPreference(models.Model):
     def __str__(self):
         return f"Preferences for {self.user.username}"
 
+
+class BroadcastNotification(models.Model):
+    """A notification stored once and shown to a whole audience (see notifications.broadcasts)"""
+    
+    AUDIENCE_CHOICES = [
+        ('all', _('Everyone')),
+        ('residents', _('Residents')),
+        ('officials', _('Officials')),
+    ]
+    
+    title = models.CharField(max_length=255)
+    message = models.TextField()
+    notification_type = models.CharField(max_length=20, choices=Notification.TYPE_CHOICES, default='info')
+    link = models.CharField(max_length=255, blank=True)
+    audience = models.CharField(max_length=20, choices=AUDIENCE_CHOICES, default='all')
+    
+    # Source announcement, if any
+    announcement = models.ForeignKey(
+        'announcements.Announcement', on_delete=models.CASCADE,
+        null=True, blank=True, related_name='broadcasts'
+    )
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = _('Broadcast Notification')
+        verbose_name_plural = _('Broadcast Notifications')
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['audience', '-created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.title} - {self.get_audience_display()}"
+
+
+class InboxCounter(models.Model):
+    """Denormalized per-user inbox totals (see notifications.counters)"""
+    user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, primary_key=True, related_name='inbox_counter')
+    
+    # Notifications
+    unread_notifications = models.IntegerField(default=0)
+    total_notifications = models.IntegerField(default=0)
+    
+    # Top-level direct messages received (including "all admins" for officials)
+    unread_messages = models.IntegerField(default=0)
+    total_messages = models.IntegerField(default=0)
+    
+    # Broadcast read state: every broadcast with id <= watermark is read, plus
+    # the ids in broadcast_read. Broadcasts with id <= floor or listed in
+    # broadcast_dismissed were deleted by the user and stay hidden
+    broadcast_watermark = models.BigIntegerField(default=0)
+    broadcast_floor = models.BigIntegerField(default=0)
+    broadcast_read = models.JSONField(default=list, blank=True)
+    broadcast_dismissed = models.JSONField(default=list, blank=True)
+    
+    class Meta:
+        verbose_name = _('Inbox Counter')
+        verbose_name_plural = _('Inbox Counters')
+    
+    def __str__(self):
+        return f"Inbox counter for {self.user.username}"
@@ -0,0 +1,179 @@
+"""
+Publish/subscribe channel for live badge updates
+
+Writers publish small events ("your notifications changed") on named
+channels; open server-sent event streams subscribe to the channels of their
+user and re-read the badge counters when something arrives.
+
+``settings.PUSH_BROKER`` picks the broker:
+
+* ``RedisBroker`` relays events through Redis pub/sub, so events published
+  by any web worker or by the task worker reach every open stream.
+* ``InProcessBroker`` only reaches streams served by the same process; it
+  suits a single-process development server.
+
+Without a shared broker ``PUSH_ENABLED`` stays off and browsers poll
+``/api/badges/``.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+ALL_USERS_CHANNEL = 'all'
+OFFICIALS_CHANNEL = 'officials'
+
+
+def user_channel(user_id):
+    return f'user:{user_id}'
+
+
+def channels_for(user):
+    """Channels a user's stream listens on"""
+    channels = [user_channel(user.pk), ALL_USERS_CHANNEL]
+    if user.is_official():
+        channels.append(OFFICIALS_CHANNEL)
+    return channels
+
+
+class Subscription:
+    """Queue of pending events for one open stream"""
+
+    def __init__(self, channels, maxsize=100):
+        self.channels = list(channels)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    async def get(self, timeout=None):
+        """Wait for the next event; returns None on timeout"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def drain(self):
+        """Discard events that piled up while the last one was handled"""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+
+
+class InProcessBroker:
+    """Fan events out to subscriptions living in this process"""
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, channels):
+        """Register a subscription on the running event loop"""
+        subscription = Subscription(channels)
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscribers[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[channel]
+
+    def publish(self, channel, message):
+        """Deliver a message to every subscriber; safe to call from any thread"""
+        self._deliver(channel, message)
+
+    def _deliver(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(_offer, subscription.queue, message)
+            except RuntimeError:
+                # The subscriber's event loop has shut down
+                pass
+
+
+class RedisBroker(InProcessBroker):
+    """
+    Relay events through Redis pub/sub (``PUSH_REDIS_URL``)
+
+    ``publish`` is a Redis ``PUBLISH`` and works from any process. A process
+    with open streams runs one listener thread that hands incoming events to
+    its own subscriptions, reconnecting if Redis goes away.
+    """
+
+    prefix = 'push:'
+
+    def __init__(self):
+        import redis
+
+        super().__init__()
+        self._redis = redis.Redis.from_url(settings.PUSH_REDIS_URL)
+        self._errors = redis.RedisError
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def subscribe(self, channels):
+        with self._listener_lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name='push-listener', daemon=True)
+                self._listener.start()
+        return super().subscribe(channels)
+
+    def publish(self, channel, message):
+        try:
+            self._redis.publish(self.prefix + channel, message)
+        except self._errors:
+            # Badges are still right on the next poll or reconnect
+            logger.warning('Could not publish %s on %s', message, channel, exc_info=True)
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(self.prefix + '*')
+                for item in pubsub.listen():
+                    channel = item['channel'].decode()[len(self.prefix):]
+                    self._deliver(channel, item['data'].decode())
+            except self._errors:
+                logger.warning('Push listener lost Redis, reconnecting', exc_info=True)
+                time.sleep(1)
+
+
+def _offer(queue, message):
+    try:
+        queue.put_nowait(message)
+    except asyncio.QueueFull:
+        # A slow consumer only needs to know *something* changed
+        pass
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                broker_path = getattr(settings, 'PUSH_BROKER', 'notifications.push.InProcessBroker')
+                _broker = import_string(broker_path)()
+    return _broker
+
+
+def publish(channel, message):
+    """Publish once the surrounding transaction commits (immediately in autocommit)"""
+    if not getattr(settings, 'PUSH_ENABLED', True):
+        return
+    transaction.on_commit(lambda: get_broker().publish(channel, message))
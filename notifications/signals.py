@@ -0,0 +1,25 @@
+"""
+Keep badges and inbox counters in sync with the rows they count
+
+Notification and direct-message writes adjust ``InboxCounter`` explicitly
+(see ``notifications.counters``); complaints only need their cached badge
+dropped, which row-level saves and deletes handle here.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.models import CustomUser
+from complaints.models import Complaint
+
+from . import badges, counters
+
+
+@receiver([post_save, post_delete], sender=Complaint)
+def complaint_changed(sender, instance, **kwargs):
+    badges.invalidate_complaints([instance.user_id])
+
+
+@receiver(post_save, sender=CustomUser)
+def create_inbox_counter(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.rebuild(instance)
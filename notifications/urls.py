@@ -17,6 +17,9 @@ urlpatterns = [
     path('<int:pk>/delete/', views.delete_notification, name='delete_notification'),
     path('delete-all/', views.delete_all_notifications, name='delete_all_notifications'),
     path('delete-selected/', views.delete_selected_notifications, name='delete_selected_notifications'),
+    path('broadcast/<int:pk>/', views.broadcast_detail, name='broadcast_detail'),
+    path('broadcast/<int:pk>/read/', views.mark_broadcast_read, name='mark_broadcast_read'),
+    path('broadcast/<int:pk>/delete/', views.delete_broadcast, name='delete_broadcast'),
     
     # Preferences
     path('preferences/', views.notification_preferences, name='notification_preferences'),
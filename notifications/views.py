@@ -1,40 +1,61 @@
 """
 Notifications app views
 """
+import asyncio
 import json
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponseBadRequest
+from django.http import HttpResponse, JsonResponse, HttpResponseBadRequest, StreamingHttpResponse
 from django.utils.translation import gettext as _
 from django.utils import timezone
 from django.core.paginator import Paginator
 from .models import Notification, NotificationPreference
-from direct_messages.models import DirectMessage
+from . import badges, broadcasts, counters, push
+
+
+def _split_ids(ids):
+    """Separate personal notification ids from ``broadcast/<id>`` ones"""
+    personal, broadcast = [], []
+    for value in ids:
+        value = str(value)
+        if value.startswith('broadcast/'):
+            value = value.split('/', 1)[1]
+            if value.isdigit():
+                broadcast.append(int(value))
+        elif value.isdigit():
+            personal.append(int(value))
+    return personal, broadcast
 
 
 @login_required
 def notification_list(request):
     """User inbox with optional mark all read"""
-    # Base queryset
-    notifications_qs = Notification.objects.filter(user=request.user)
-    
-    # Filter by read/unread
     filter_type = request.GET.get('filter', 'all')
-    if filter_type == 'unread':
-        notifications_qs = notifications_qs.filter(is_read=False)
-    elif filter_type == 'read':
-        notifications_qs = notifications_qs.filter(is_read=True)
     
-    # Counts for badges - optimized: reuse queryset for unread count
-    total_count = notifications_qs.count()
-    # Use the base queryset to avoid duplicate query
-    unread_count = Notification.objects.filter(user=request.user, is_read=False).count()
+    # Personal and broadcast notifications merged at read time
+    counter = counters.get_counter(request.user)
+    notifications_qs = broadcasts.merged(request.user, counter, filter_type)
     
-    # Pagination
+    # Personal counts come from the inbox counter (one primary-key lookup);
+    # broadcasts are few enough to count directly
+    broadcast_total, broadcast_unread = broadcasts.counts(request.user, counter)
+    unread_count = counter.unread_notifications + broadcast_unread
+    all_count = counter.total_notifications + broadcast_total
+    total_count = {
+        'unread': unread_count,
+        'read': all_count - unread_count,
+    }.get(filter_type, all_count)
+    
+    # Pagination - the counts are already known, skip the COUNT(*)
     paginator = Paginator(notifications_qs, 20)
+    paginator.count = total_count
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
+    page_obj.object_list = broadcasts.as_items(page_obj.object_list)
     
     context = {
         # For template compatibility: use both page_obj and notifications
@@ -56,9 +77,8 @@ def notification_detail(request, pk):
     
     # Mark as read
     if not notification.is_read:
-        notification.is_read = True
-        notification.read_at = timezone.now()
-        notification.save()
+        counters.mark_notifications_read(request.user.id, Notification.objects.filter(pk=pk))
+        notification.refresh_from_db(fields=['is_read', 'read_at'])
     
     return render(request, 'notifications/notification_detail.html', {'notification': notification})
 
@@ -67,9 +87,7 @@ def notification_detail(request, pk):
 def mark_notification_read(request, pk):
     """Mark single notification as read"""
     notification = get_object_or_404(Notification, pk=pk, user=request.user)
-    notification.is_read = True
-    notification.read_at = timezone.now()
-    notification.save()
+    counters.mark_notifications_read(request.user.id, Notification.objects.filter(pk=notification.pk))
     
     messages.success(request, _('Notification marked as read.'))
     return redirect('notifications:notification_list')
@@ -78,10 +96,8 @@ def mark_notification_read(request, pk):
 @login_required
 def mark_all_notifications_read(request):
     """Mark all notifications as read"""
-    Notification.objects.filter(user=request.user, is_read=False).update(
-        is_read=True,
-        read_at=timezone.now()
-    )
+    counters.mark_notifications_read(request.user.id, Notification.objects.all())
+    broadcasts.mark_read(request.user)
     
     messages.success(request, _('All notifications marked as read.'))
     return redirect('notifications:notification_list')
@@ -91,7 +107,7 @@ def mark_all_notifications_read(request):
 def delete_notification(request, pk):
     """Delete single notification"""
     notification = get_object_or_404(Notification, pk=pk, user=request.user)
-    notification.delete()
+    counters.delete_notifications(request.user.id, Notification.objects.filter(pk=notification.pk))
     
     messages.success(request, _('Notification deleted.'))
     return redirect('notifications:notification_list')
@@ -101,12 +117,45 @@ def delete_notification(request, pk):
 def delete_all_notifications(request):
     """Delete all notifications"""
     if request.method == 'POST':
-        Notification.objects.filter(user=request.user).delete()
+        counters.delete_notifications(request.user.id, Notification.objects.all())
+        broadcasts.dismiss(request.user)
         messages.success(request, _('All notifications deleted.'))
     
     return redirect('notifications:notification_list')
 
 
+@login_required
+def broadcast_detail(request, pk):
+    """Broadcast notification detail (marks as read)"""
+    counter = counters.get_counter(request.user)
+    notification = get_object_or_404(broadcasts.visible(request.user, counter), pk=pk)
+    broadcasts.mark_read(request.user, [pk])
+    notification.is_read = True
+    
+    return render(request, 'notifications/notification_detail.html', {
+        'notification': notification,
+        'is_broadcast': True,
+    })
+
+
+@login_required
+def mark_broadcast_read(request, pk):
+    """Mark a single broadcast notification as read"""
+    broadcasts.mark_read(request.user, [pk])
+    
+    messages.success(request, _('Notification marked as read.'))
+    return redirect('notifications:notification_list')
+
+
+@login_required
+def delete_broadcast(request, pk):
+    """Hide a single broadcast notification"""
+    broadcasts.dismiss(request.user, [pk])
+    
+    messages.success(request, _('Notification deleted.'))
+    return redirect('notifications:notification_list')
+
+
 @login_required
 def notification_preferences(request):
     """Notification preferences"""
@@ -130,36 +179,81 @@ def notification_preferences(request):
 
 @login_required
 def get_unread_notifications_count(request):
-    """API: Get unread count"""
-    # Auto-sync message notifications with direct messages:
-    # if user has no unread direct messages, mark all "message" notifications as read
-    user = request.user
-    
-    has_unread_messages = DirectMessage.objects.filter(
-        recipient=user,
-        is_read=False,
-        parent_message__isnull=True,
-    ).exists()
-    
-    if not has_unread_messages:
-        Notification.objects.filter(
-            user=user,
-            notification_type='message',
-            is_read=False,
-        ).update(is_read=True, read_at=timezone.now())
-    
-    count = Notification.objects.filter(user=user, is_read=False).count()
-    return JsonResponse({'unread_count': count})
+    """API: Get unread count (read-only, served from the badge counters)"""
+    counts = badges.get_badge_counts(request.user)
+    return JsonResponse({'unread_count': counts['notifications']})
+
+
+@login_required
+def badge_counts_api(request):
+    """API: Notification, message and complaint badges in one request"""
+    response = JsonResponse(badges.get_badge_counts(request.user))
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+def _sse_event(name, data):
+    return f'event: {name}\ndata: {json.dumps(data)}\n\n'
+
+
+async def _badge_events(user):
+    """Send the current badges, then again whenever a pushed event changes them"""
+    broker = push.get_broker()
+    subscription = broker.subscribe(push.channels_for(user))
+    get_counts = sync_to_async(badges.get_badge_counts)
+    timeout = getattr(settings, 'PUSH_STREAM_TIMEOUT', 55)
+    heartbeat = getattr(settings, 'PUSH_HEARTBEAT', 15)
+    try:
+        counts = await get_counts(user)
+        # Ask the browser to reconnect quickly once this stream ends
+        yield 'retry: 3000\n' + _sse_event('badges', counts)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while (remaining := deadline - loop.time()) > 0:
+            event = await subscription.get(timeout=min(heartbeat, remaining))
+            if event is None:
+                yield ': keep-alive\n\n'
+                continue
+            subscription.drain()
+            latest = await get_counts(user)
+            if latest != counts:
+                counts = latest
+                yield _sse_event('badges', counts)
+    finally:
+        broker.unsubscribe(subscription)
+
+
+async def badge_stream(request):
+    """API: Server-sent events with live badge counts (ASGI only)
+
+    Under WSGI a long-lived stream would tie up a whole worker, so the view
+    answers 204 and the browser falls back to polling ``/api/badges/``.
+    """
+    if not isinstance(request, ASGIRequest) or not getattr(settings, 'PUSH_ENABLED', True):
+        return HttpResponse(status=204)
+
+    user = await sync_to_async(lambda: request.user if request.user.is_authenticated else None)()
+    if user is None:
+        return HttpResponse(status=204)
+
+    response = StreamingHttpResponse(_badge_events(user), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-store'
+    # Keep reverse proxies from buffering the stream (GZip skips it, see core.middleware)
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 
 @login_required
 def get_recent_notifications(request):
     """API: Get recent notifications"""
-    notifications = Notification.objects.filter(user=request.user)[:10].values(
-        'id', 'title', 'message', 'notification_type', 'is_read', 'created_at'
-    )
+    counter = counters.get_counter(request.user)
+    notifications = broadcasts.as_items(broadcasts.merged(request.user, counter)[:10])
     
-    return JsonResponse({'notifications': list(notifications)})
+    return JsonResponse({'notifications': [
+        {key: item[key] for key in ('id', 'title', 'message', 'notification_type', 'is_read', 'created_at')}
+        for item in notifications
+    ]})
 
 
 @login_required
@@ -177,9 +271,11 @@ def delete_selected_notifications(request):
     if not isinstance(ids, list):
         return HttpResponseBadRequest('Invalid IDs payload')
 
-    qs = Notification.objects.filter(user=request.user, pk__in=ids)
-    deleted_count = qs.count()
-    qs.delete()
+    personal_ids, broadcast_ids = _split_ids(ids)
+    deleted_count = counters.delete_notifications(request.user.id, Notification.objects.filter(pk__in=personal_ids))
+    if broadcast_ids:
+        broadcasts.dismiss(request.user, broadcast_ids)
+        deleted_count += len(broadcast_ids)
 
     return JsonResponse({'deleted_count': deleted_count})
 
@@ -4,6 +4,7 @@ Services models
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 from accounts.models import CustomUser
+from core import references
 
 
 class ServiceCategory(models.Model):
@@ -79,8 +80,6 @@ class ServiceRequest(models.Model):
     def save(self, *args, **kwargs):
         # Generate reference number
         if not self.reference_number:
-            import random
-            import string
-            self.reference_number = 'SR-' + ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
+            self.reference_number = references.allocate('service_request', 'SR-')
         super().save(*args, **kwargs)
 
@@ -8,10 +8,13 @@ from django.utils.translation import gettext as _
 from django.utils import timezone
 from django.db.models import Q
 from django.core.paginator import Paginator
-from .models import Service, ServiceCategory, ServiceRequest
+from core import registry
+from core.pagecache import cache_anonymous
+from .models import Service, ServiceRequest
 from .forms import ServiceRequestForm
 
 
+@cache_anonymous('services.Service', 'services.ServiceCategory')
 def service_list(request):
     """Service catalog with categories, search, active services"""
     services = Service.objects.filter(is_active=True).select_related('category')
@@ -28,7 +31,7 @@ def service_list(request):
         )
     
     # Categories
-    categories = ServiceCategory.objects.all()
+    categories = registry.rows('services.ServiceCategory')
     
     # Pagination
     paginator = Paginator(services, 12)
@@ -45,6 +48,7 @@ def service_list(request):
     return render(request, 'services/service_list.html', context)
 
 
+@cache_anonymous('services.Service', 'services.ServiceCategory')
 def service_detail(request, pk):
     """Service detail page"""
     service = get_object_or_404(Service, pk=pk)
@@ -0,0 +1,156 @@
+// Incremental comment feeds (complaints, gallery)
+//
+// Markup:
+//   <div data-comment-feed data-feed-url="...">
+//     <span data-comment-count>..</span>
+//     <button data-comment-older>Load older</button>
+//     <div data-comment-list> ...items with data-comment-id... </div>
+//     <p data-comment-empty>No comments</p>
+//     <template data-comment-template> ...[data-field="user|comment|created_at"]... </template>
+//     <form data-comment-form> ... </form>
+//   </div>
+//
+// The page renders the newest comments; "load older" asks the feed for
+// ?before=<oldest id> and posting a comment asks for ?after=<newest id>, so
+// the page never reloads the whole thread.
+(function() {
+    'use strict';
+
+    function initFeed(feed) {
+        const url = feed.dataset.feedUrl;
+        const list = feed.querySelector('[data-comment-list]');
+        const template = feed.querySelector('template[data-comment-template]');
+        const olderButton = feed.querySelector('[data-comment-older]');
+        const form = feed.querySelector('form[data-comment-form]');
+        const countEl = feed.querySelector('[data-comment-count]');
+        if (!url || !list || !template) {
+            return;
+        }
+
+        function ids() {
+            return Array.from(list.querySelectorAll('[data-comment-id]'))
+                .map(el => parseInt(el.dataset.commentId, 10));
+        }
+
+        function render(comment) {
+            const node = template.content.firstElementChild.cloneNode(true);
+            node.dataset.commentId = comment.id;
+            node.querySelectorAll('[data-field]').forEach(function(el) {
+                const field = el.dataset.field;
+                if (field === 'created_at') {
+                    el.textContent = new Date(comment.created_at).toLocaleString([], {
+                        month: 'short', day: 'numeric', year: 'numeric', hour: '2-digit', minute: '2-digit'
+                    });
+                } else if (field === 'initial') {
+                    el.textContent = (comment.user || '?').charAt(0).toUpperCase();
+                } else {
+                    el.textContent = comment[field] == null ? '' : comment[field];
+                }
+            });
+            node.querySelectorAll('[data-if]').forEach(function(el) {
+                if (!comment[el.dataset.if]) {
+                    el.remove();
+                }
+            });
+            return node;
+        }
+
+        function setCount(delta) {
+            if (countEl) {
+                countEl.textContent = (parseInt(countEl.textContent, 10) || 0) + delta;
+            }
+        }
+
+        function fetchPage(params) {
+            return fetch(url + '?' + new URLSearchParams(params), {
+                headers: {'X-Requested-With': 'XMLHttpRequest'},
+                credentials: 'same-origin'
+            }).then(response => response.json());
+        }
+
+        function loadNewer() {
+            const known = ids();
+            const after = known.length ? Math.max.apply(null, known) : 0;
+            return fetchPage({after: after}).then(function(data) {
+                const seen = new Set(known);
+                let added = 0;
+                data.comments.forEach(function(comment) {
+                    if (!seen.has(comment.id)) {
+                        list.appendChild(render(comment));
+                        added++;
+                    }
+                });
+                if (added) {
+                    setCount(added);
+                    const empty = feed.querySelector('[data-comment-empty]');
+                    if (empty) {
+                        empty.remove();
+                    }
+                }
+                // A long burst arrived: keep reading until caught up
+                if (data.has_more) {
+                    return loadNewer();
+                }
+            });
+        }
+
+        if (olderButton) {
+            olderButton.addEventListener('click', function() {
+                const known = ids();
+                if (!known.length) {
+                    return;
+                }
+                olderButton.disabled = true;
+                fetchPage({before: Math.min.apply(null, known)}).then(function(data) {
+                    const fragment = document.createDocumentFragment();
+                    data.comments.forEach(comment => fragment.appendChild(render(comment)));
+                    list.insertBefore(fragment, list.firstChild);
+                    olderButton.disabled = false;
+                    if (!data.has_more) {
+                        olderButton.remove();
+                    }
+                }).catch(function() {
+                    olderButton.disabled = false;
+                });
+            });
+        }
+
+        if (form && window.fetch) {
+            form.addEventListener('submit', function(event) {
+                event.preventDefault();
+                const submit = form.querySelector('[type="submit"]');
+                if (submit) {
+                    submit.disabled = true;
+                }
+                const body = new FormData(form);
+                fetch(url, {
+                    method: 'POST',
+                    body: body,
+                    headers: {
+                        'X-CSRFToken': body.get('csrfmiddlewaretoken'),
+                        'X-Requested-With': 'XMLHttpRequest'
+                    },
+                    credentials: 'same-origin'
+                }).then(function(response) {
+                    if (!response.ok) {
+                        throw new Error('Comment rejected');
+                    }
+                    form.reset();
+                    // The comment is saved; a failed refresh only delays showing it
+                    loadNewer().catch(function() {});
+                }).catch(function() {
+                    // Fall back to a regular form post (shows validation errors)
+                    form.submit();
+                }).finally(function() {
+                    if (submit) {
+                        submit.disabled = false;
+                    }
+                });
+            });
+        }
+    }
+
+    document.addEventListener('DOMContentLoaded', function() {
+        document.querySelectorAll('[data-comment-feed]').forEach(initFeed);
+    });
+})();
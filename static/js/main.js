@@ -21,50 +21,11 @@
             // Silently fail if elements don't exist
         }
         
-        // Optimized: Delay AJAX calls to not block navigation
+        // Optimized: Delay badge updates to not block navigation
         setTimeout(function() {
-            // Update notification count - Only if user is authenticated and page is visible
-            if ($('#notification-count').length && document.visibilityState === 'visible') {
-                updateNotificationCount();
-                // Optimized: Check visibility before updating, reduce frequency if page hidden
-                let notificationInterval = setInterval(function() {
-                    if (document.visibilityState === 'visible') {
-                        updateNotificationCount();
-                    }
-                }, 60000); // Increased to 60 seconds for better performance
-                
-                // Pause when page is hidden
-                document.addEventListener('visibilitychange', function() {
-                    if (document.hidden) {
-                        clearInterval(notificationInterval);
-                    } else {
-                        notificationInterval = setInterval(function() {
-                            updateNotificationCount();
-                        }, 60000);
-                    }
-                });
-            }
-            
-            // Update message count - Only if user is authenticated and page is visible
-            if ($('#message-count').length && document.visibilityState === 'visible') {
-                updateMessageCount();
-                // Optimized: Check visibility before updating, reduce frequency if page hidden
-                let messageInterval = setInterval(function() {
-                    if (document.visibilityState === 'visible') {
-                        updateMessageCount();
-                    }
-                }, 60000); // Increased to 60 seconds for better performance
-                
-                // Pause when page is hidden
-                document.addEventListener('visibilitychange', function() {
-                    if (document.hidden) {
-                        clearInterval(messageInterval);
-                    } else {
-                        messageInterval = setInterval(function() {
-                            updateMessageCount();
-                        }, 60000);
-                    }
-                });
+            // Only if user is authenticated (badges are rendered) and page is visible
+            if (($('#notification-count').length || $('#message-count').length) && document.visibilityState === 'visible') {
+                startBadgeUpdates();
             }
         }, 500); // Delay 500ms to not block navigation
     }
@@ -81,40 +42,98 @@
     }
 })();
 
-function updateNotificationCount() {
-    // Optimized: Use fetch API with timeout for better performance
-    const controller = new AbortController();
-    const timeoutId = setTimeout(() => controller.abort(), 5000); // 5 second timeout
+// Live badges: server-sent events pushed as soon as something changes,
+// falling back to polling /api/badges/ when the stream is unavailable
+var badgeStream = null;
+var badgePollInterval = null;
+var badgeStreamFailures = 0;
+
+function startBadgeUpdates() {
+    if (window.EventSource && badgeStreamFailures < 3) {
+        openBadgeStream();
+    } else {
+        startBadgePolling();
+    }
     
-    fetch(window.location.origin + '/en/notifications/api/unread-count/', {
-        method: 'GET',
-        signal: controller.signal,
-        cache: 'no-store'
-    })
-    .then(response => response.json())
-    .then(data => {
-        clearTimeout(timeoutId);
-        var count = parseInt(data.unread_count) || 0;
-        
-        if (count > 0) {
-            $('#notification-count').text(count).css('display', 'inline-block');
+    // Pause when page is hidden
+    document.addEventListener('visibilitychange', function() {
+        if (document.hidden) {
+            stopBadgeUpdates();
+        } else if (window.EventSource && badgeStreamFailures < 3) {
+            openBadgeStream();
         } else {
-            $('#notification-count').text('').css('display', 'none');
+            startBadgePolling();
         }
-    })
-    .catch(error => {
-        clearTimeout(timeoutId);
-        // Silently fail - don't log to console for better performance
-        $('#notification-count').text('').css('display', 'none');
     });
 }
 
-function updateMessageCount() {
+function openBadgeStream() {
+    if (badgeStream) {
+        return;
+    }
+    badgeStream = new EventSource(window.location.origin + '/api/badges/stream/');
+    
+    badgeStream.addEventListener('badges', function(event) {
+        badgeStreamFailures = 0;
+        applyBadgeCounts(JSON.parse(event.data));
+    });
+    
+    badgeStream.onerror = function() {
+        // CLOSED means the server declined the stream (e.g. WSGI deployment);
+        // otherwise the browser retries on its own unless it keeps failing
+        badgeStreamFailures++;
+        if (badgeStream.readyState === EventSource.CLOSED || badgeStreamFailures >= 3) {
+            badgeStream.close();
+            badgeStream = null;
+            startBadgePolling();
+        }
+    };
+}
+
+function startBadgePolling() {
+    if (badgePollInterval) {
+        return;
+    }
+    updateBadgeCounts();
+    // Optimized: Check visibility before updating
+    badgePollInterval = setInterval(function() {
+        if (document.visibilityState === 'visible') {
+            updateBadgeCounts();
+        }
+    }, 60000); // 60 seconds
+}
+
+function stopBadgeUpdates() {
+    if (badgeStream) {
+        badgeStream.close();
+        badgeStream = null;
+    }
+    if (badgePollInterval) {
+        clearInterval(badgePollInterval);
+        badgePollInterval = null;
+    }
+}
+
+function applyBadgeCounts(data) {
+    setBadge('#notification-count', parseInt(data.notifications) || 0);
+    setBadge('#message-count', parseInt(data.messages) || 0);
+    setBadge('#complaint-count', parseInt(data.complaints) || 0);
+}
+
+function setBadge(selector, count) {
+    if (count > 0) {
+        $(selector).text(count).css('display', 'inline-block');
+    } else {
+        $(selector).text('').css('display', 'none');
+    }
+}
+
+function updateBadgeCounts() {
     // Optimized: Use fetch API with timeout for better performance
     const controller = new AbortController();
     const timeoutId = setTimeout(() => controller.abort(), 5000); // 5 second timeout
     
-    fetch(window.location.origin + '/en/messages/api/unread-count/', {
+    fetch(window.location.origin + '/api/badges/', {
         method: 'GET',
         signal: controller.signal,
         cache: 'no-store'
@@ -122,18 +141,13 @@ function updateMessageCount() {
     .then(response => response.json())
     .then(data => {
         clearTimeout(timeoutId);
-        var count = parseInt(data.unread_count) || 0;
-        
-        if (count > 0) {
-            $('#message-count').text(count).css('display', 'inline-block');
-        } else {
-            $('#message-count').text('').css('display', 'none');
-        }
+        applyBadgeCounts(data);
     })
     .catch(error => {
         clearTimeout(timeoutId);
         // Silently fail - don't log to console for better performance
-        $('#message-count').text('').css('display', 'none');
+        setBadge('#notification-count', 0);
+        setBadge('#message-count', 0);
     });
 }
 
@@ -10,7 +10,7 @@ class SuggestionAdmin(admin.ModelAdmin):
     list_display = ['title', 'user', 'status', 'vote_count', 'created_at']
     list_filter = ['status', 'created_at']
     search_fields = ['title', 'description', 'user__username']
-    readonly_fields = ['created_at', 'updated_at', 'reviewed_at', 'vote_count']
+    readonly_fields = ['created_at', 'updated_at', 'reviewed_at', 'vote_count', 'hot_score']
 
 
 @admin.register(SuggestionVote)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from suggestions import rankings
+
+
+class Command(BaseCommand):
+    help = 'Recompute the "hot" scores of suggestions from their vote timestamps (also queued by votes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Suggestions per batch (default: 500)')
+
+    def handle(self, *args, **options):
+        changed = rankings.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{changed} hot scores corrected'))
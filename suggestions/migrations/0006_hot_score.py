@@ -0,0 +1,43 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:02
+
+from django.db import migrations, models
+
+
+def backfill_hot_scores(apps, schema_editor):
+    from suggestions.rankings import log_sum, weight
+
+    Suggestion = apps.get_model('suggestions', 'Suggestion')
+    SuggestionVote = apps.get_model('suggestions', 'SuggestionVote')
+
+    votes = {}
+    for suggestion_id, created_at in SuggestionVote.objects.values_list('suggestion_id', 'created_at').iterator():
+        votes.setdefault(suggestion_id, []).append(weight(created_at))
+    batch = []
+    for suggestion in Suggestion.objects.only('pk', 'created_at').iterator():
+        suggestion.hot_score = log_sum([weight(suggestion.created_at)] + votes.get(suggestion.pk, []))
+        batch.append(suggestion)
+    Suggestion.objects.bulk_update(batch, ['hot_score'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('suggestions', '0005_suggestion_category'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='suggestion',
+            name='hot_score',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddIndex(
+            model_name='suggestion',
+            index=models.Index(fields=['-hot_score'], name='suggestion_hot_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='suggestion',
+            index=models.Index(fields=['-vote_count', '-created_at'], name='suggestion_top_idx'),
+        ),
+        migrations.RunPython(backfill_hot_scores, migrations.RunPython.noop),
+    ]
@@ -4,6 +4,7 @@ Suggestions models
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 from accounts.models import CustomUser
+from core import references
 
 
 class Suggestion(models.Model):
@@ -50,11 +51,17 @@ class Suggestion(models.Model):
     
     # Voting
     vote_count = models.IntegerField(default=0)
+    # Time-decayed votes for the "hot" ordering; see suggestions.rankings
+    hot_score = models.FloatField(default=0.0)
     
     class Meta:
         verbose_name = _('Suggestion')
         verbose_name_plural = _('Suggestions')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-hot_score'], name='suggestion_hot_idx'),
+            models.Index(fields=['-vote_count', '-created_at'], name='suggestion_top_idx'),
+        ]
     
     def __str__(self):
         return self.title
@@ -66,24 +73,12 @@ class Suggestion(models.Model):
 
         # Generate anonymous reference if needed
         if self.is_anonymous and not self.anonymous_reference:
-            import random
-            import string
+            self.anonymous_reference = references.allocate('suggestion')
 
-            # Optimized: Add max attempts to prevent infinite loop
-            max_attempts = 100
-            attempts = 0
-            while attempts < max_attempts:
-                reference = ''.join(
-                    random.choices(string.ascii_uppercase + string.digits, k=10)
-                )
-                if not Suggestion.objects.filter(anonymous_reference=reference).exists():
-                    self.anonymous_reference = reference
-                    break
-                attempts += 1
-            else:
-                # Fallback: Use timestamp-based reference if all attempts fail
-                import time
-                self.anonymous_reference = f"REF{int(time.time())}{random.randint(1000, 9999)}"
+        # A new suggestion starts with the weight of one vote cast now
+        if self._state.adding and not self.hot_score:
+            from . import rankings
+            self.hot_score = rankings.weight()
 
         super().save(*args, **kwargs)
 
@@ -0,0 +1,110 @@
+"""
+Suggestion rankings: "hot" (recent votes count more) and "top" (all votes)
+
+Top is ``vote_count``, kept by ``core.engagement``. Hot uses forward decay:
+a suggestion and each of its votes weigh ``2 ** ((t - EPOCH) / half-life)``
+where ``t`` is when they happened, and ``hot_score`` holds the natural log
+of the sum. Letting time pass divides every suggestion's decayed total by
+the same factor, so ordering by ``hot_score`` always orders by votes
+decayed to *now*, and a row only changes when its votes do:
+
+* a vote adds its weight with one ``UPDATE`` (log-add-exp in SQL),
+* an unvote takes out the weight the removed vote added (from its
+  ``created_at``),
+* ``rebuild`` recomputes the scores from the vote timestamps, clearing
+  floating-point drift. Votes queue it at most once per
+  ``SUGGESTION_HOT_REBUILD_INTERVAL``; ``manage.py
+  rebuild_suggestion_rankings`` runs it by hand.
+
+Both orderings are served from indexes on ``hot_score`` and
+``(vote_count, created_at)``.
+"""
+import math
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Abs, Exp, Greatest, Ln
+from django.utils import timezone
+
+from core import pagecache
+
+EPOCH = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+FLOOR = 0.0  # Score left when every weight has been taken out
+
+
+def half_life():
+    return getattr(settings, 'SUGGESTION_HOT_HALF_LIFE', 3 * 24 * 3600)
+
+
+def weight(moment=None):
+    """Log-weight of something that happened at ``moment`` (default: now)"""
+    moment = moment or timezone.now()
+    return math.log(2) * (moment - EPOCH).total_seconds() / half_life()
+
+
+def log_sum(weights):
+    """log(sum(exp(w))) without overflow"""
+    weights = list(weights)
+    if not weights:
+        return FLOOR
+    top = max(weights)
+    return top + math.log(sum(math.exp(w - top) for w in weights))
+
+
+def _added(w):
+    score = F('hot_score')
+    return Greatest(score, Value(w)) + Ln(Value(1.0) + Exp(-Abs(score - Value(w))))
+
+
+def _removed(w):
+    score = F('hot_score')
+    return Case(
+        When(hot_score__gt=w + 1e-9, then=score + Ln(Value(1.0) - Exp(Value(w) - score))),
+        default=Value(FLOOR),
+    )
+
+
+def record_vote(suggestion_id, delta, vote=None):
+    """Move a suggestion's hot score for ``vote`` added (+1) or removed (-1)"""
+    from .models import Suggestion
+
+    if delta:
+        w = weight(vote.created_at if vote is not None else None)
+        Suggestion.objects.filter(pk=suggestion_id).update(hot_score=_added(w) if delta > 0 else _removed(w))
+        _schedule_rebuild()
+
+
+def _schedule_rebuild():
+    from taskqueue.queue import enqueue
+
+    interval = getattr(settings, 'SUGGESTION_HOT_REBUILD_INTERVAL', 24 * 3600)
+    cache = caches[getattr(settings, 'ENGAGEMENT_CACHE', 'shared')]
+    if interval and cache.add('suggestions:rebuild_scheduled', 1, interval):
+        enqueue(rebuild, delay=interval)
+
+
+def rebuild(batch_size=500):
+    """Recompute every hot score from the vote timestamps; returns how many changed"""
+    from .models import Suggestion, SuggestionVote
+
+    pks = list(Suggestion.objects.order_by('pk').values_list('pk', flat=True))
+    changed = 0
+    for start in range(0, len(pks), batch_size):
+        batch = pks[start:start + batch_size]
+        votes = {}
+        for suggestion_id, created_at in SuggestionVote.objects.filter(
+                suggestion_id__in=batch).values_list('suggestion_id', 'created_at'):
+            votes.setdefault(suggestion_id, []).append(weight(created_at))
+
+        stale = []
+        for suggestion in Suggestion.objects.filter(pk__in=batch).only('pk', 'created_at', 'hot_score'):
+            score = log_sum([weight(suggestion.created_at)] + votes.get(suggestion.pk, []))
+            if not math.isclose(suggestion.hot_score, score, rel_tol=0, abs_tol=1e-6):
+                suggestion.hot_score = score
+                stale.append(suggestion)
+        changed += Suggestion.objects.bulk_update(stale, ['hot_score'])
+    if changed:
+        pagecache.invalidate('suggestions.Suggestion')
+    return changed
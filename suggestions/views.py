@@ -4,20 +4,22 @@ Suggestions app views
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
 from django.utils.translation import gettext as _
 from django.utils import timezone
 from django.db.models import Q, Count
 from django.core.paginator import Paginator
+from core import engagement
+from core.pagecache import cache_anonymous
 from .models import Suggestion, SuggestionVote
 from .forms import SuggestionForm
+from . import rankings
 
 
+@cache_anonymous('suggestions.Suggestion')
 def suggestion_list(request):
     """Public suggestion list with filters and stats"""
-    suggestions = Suggestion.objects.select_related('user').annotate(
-        vote_count_calc=Count('votes')
-    )
+    suggestions = Suggestion.objects.select_related('user')
     
     # Filters
     status = request.GET.get('status')
@@ -30,14 +32,15 @@ def suggestion_list(request):
             Q(title__icontains=search) | Q(description__icontains=search)
         )
     
-    # Sort by votes
-    sort_by = request.GET.get('sort', '-vote_count')
-    if sort_by == 'votes':
-        suggestions = suggestions.order_by('-vote_count')
+    # Optimized: hot/top orderings read the indexed score columns (no vote join)
+    sort_by = request.GET.get('sort', 'hot')
+    if sort_by in ('votes', '-vote_count'):
+        suggestions = suggestions.order_by('-vote_count', '-created_at')
     elif sort_by == 'recent':
         suggestions = suggestions.order_by('-created_at')
     else:
-        suggestions = suggestions.order_by('-vote_count')
+        sort_by = 'hot'
+        suggestions = suggestions.order_by('-hot_score', '-pk')
     
     # Statistics - optimized with single aggregation query
     stats = suggestions.aggregate(
@@ -46,18 +49,18 @@ def suggestion_list(request):
         approved=Count('id', filter=Q(status='approved'))
     )
     
-    # Track which suggestions current user has voted for (for UI state)
-    user_voted_ids = []
-    if request.user.is_authenticated:
-        user_voted_ids = list(
-            SuggestionVote.objects.filter(user=request.user).values_list('suggestion_id', flat=True)
-        )
-    
     # Pagination
     paginator = Paginator(suggestions, 20)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     
+    # Which suggestions on this page the user voted for (for UI state)
+    user_voted_ids = []
+    if request.user.is_authenticated:
+        user_voted_ids = list(SuggestionVote.objects.filter(
+            user=request.user, suggestion_id__in=[suggestion.pk for suggestion in page_obj]
+        ).values_list('suggestion_id', flat=True))
+    
     context = {
         'page_obj': page_obj,
         'total': stats['total'],
@@ -148,22 +151,22 @@ def vote_suggestion(request):
     if not request.user.is_approved:
         return JsonResponse({'error': 'Your account needs to be approved before you can vote.'}, status=403)
     
-    suggestion_id = request.POST.get('suggestion_id')
-    suggestion = get_object_or_404(Suggestion, pk=suggestion_id)
+    try:
+        suggestion_id = int(request.POST.get('suggestion_id'))
+    except (TypeError, ValueError):
+        return JsonResponse({'error': 'suggestion_id required'}, status=400)
     
-    vote, created = SuggestionVote.objects.get_or_create(suggestion=suggestion, user=request.user)
+    if not engagement.allow(engagement.SUGGESTION_VOTES, request.user, suggestion_id):
+        return JsonResponse({'error': _('Too many changes. Please wait a moment.')}, status=429)
     
-    if not created:
-        # Unvote
-        vote.delete()
-        suggestion.vote_count = max(0, suggestion.vote_count - 1)
-        suggestion.save(update_fields=['vote_count'])
-        return JsonResponse({'voted': False, 'vote_count': suggestion.vote_count})
-    else:
-        # Vote
-        suggestion.vote_count += 1
-        suggestion.save(update_fields=['vote_count'])
-        return JsonResponse({'voted': True, 'vote_count': suggestion.vote_count})
+    # Optimized: toggle and F() counter update in one transaction, count returned by the UPDATE
+    try:
+        voted, vote_count = engagement.toggle(
+            engagement.SUGGESTION_VOTES, request.user, suggestion_id, on_change=rankings.record_vote
+        )
+    except Suggestion.DoesNotExist:
+        raise Http404
+    return JsonResponse({'voted': voted, 'vote_count': vote_count})
 
 
 @login_required
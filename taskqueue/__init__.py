@@ -0,0 +1 @@
+# Task queue app
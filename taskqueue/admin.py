@@ -0,0 +1,31 @@
+"""
+Task queue admin
+"""
+from django.contrib import admin
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from . import queue as task_queue
+from .models import Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ['name', 'queue', 'status', 'priority', 'attempts', 'run_at', 'started_at', 'finished_at']
+    list_filter = ['status', 'queue']
+    search_fields = ['name', 'last_error']
+    readonly_fields = ['attempts', 'locked_by', 'locked_until', 'last_error', 'created_at', 'started_at', 'finished_at']
+    actions = ['retry_tasks']
+    
+    def changelist_view(self, request, extra_context=None):
+        extra_context = extra_context or {}
+        extra_context['queue_stats'] = task_queue.stats()
+        return super().changelist_view(request, extra_context=extra_context)
+    
+    @admin.action(description=_('Retry selected tasks now'))
+    def retry_tasks(self, request, queryset):
+        updated = queryset.exclude(status='running').update(
+            status='queued', run_at=timezone.now(), attempts=0,
+            locked_by='', locked_until=None, finished_at=None,
+        )
+        self.message_user(request, _('%(count)d task(s) queued again.') % {'count': updated})
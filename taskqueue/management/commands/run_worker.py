@@ -0,0 +1,38 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from taskqueue.worker import Worker
+
+
+class Command(BaseCommand):
+    help = 'Run queued background tasks (announcement fan-out, image processing, ...)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queue', action='append', dest='queues',
+                            help='Queue to serve (repeatable; default: every queue in TASK_QUEUES)')
+        parser.add_argument('--concurrency', type=int, default=None,
+                            help='Threads per queue (default: the queue\'s TASK_QUEUES setting)')
+        parser.add_argument('--poll-interval', type=float, default=None,
+                            help='Seconds to wait when a queue is empty (default: TASK_POLL_INTERVAL)')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once every queue is empty instead of waiting for work')
+
+    def handle(self, *args, **options):
+        worker = Worker(
+            queues=options['queues'],
+            concurrency=options['concurrency'],
+            poll_interval=options['poll_interval'],
+            once=options['once'],
+        )
+        if threading.current_thread() is threading.main_thread():
+            # Let the platform stop the worker gracefully on redeploys
+            signal.signal(signal.SIGTERM, lambda signum, frame: worker.stop())
+
+        slots = ', '.join(f'{queue}[{slot}]' for queue, slot in worker.slots())
+        self.stdout.write(f'Worker started: {slots}')
+        worker.run()
+        self.stdout.write(self.style.SUCCESS(
+            f'Worker stopped: {worker.processed} task(s) run, {worker.failed} failed'
+        ))
@@ -0,0 +1,271 @@
+"""
+Durable task queue on top of the project database
+
+Other apps defer work with ``enqueue``::
+
+    from taskqueue.queue import enqueue
+
+    enqueue('announcements.fanout.run', args=[fanout.pk], queue='notifications')
+
+The task row is written in the caller's transaction, so work is only queued
+if the surrounding write commits. ``manage.py run_worker`` claims due tasks,
+runs them and retries failures with exponential backoff.
+
+Claiming uses ``SELECT ... FOR UPDATE SKIP LOCKED`` where the database
+supports it (PostgreSQL). Elsewhere (SQLite) a worker claims a task with a
+conditional UPDATE that only succeeds while the row is still in the state it
+read, so two workers never take the same task. Either way the claim carries
+a lease, which the worker renews while the task runs. A task whose lease
+expired (its worker died) is claimed again, or failed once it has used
+``max_attempts``.
+
+With ``TASK_EAGER`` (no worker deployed) due tasks run right after the
+enqueueing transaction commits; delayed ones stay queued until a later
+enqueue finds them due.
+"""
+import logging
+import random
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_OPTIONS = {
+    'concurrency': 1,  # Threads per worker process
+    'lease': 300,      # Seconds a claimed task stays locked to its worker
+}
+CLAIM_CANDIDATES = 5  # Rows read per lease-based claim attempt
+ORDERING = ('-priority', 'run_at', 'pk')
+
+
+def queue_options(queue):
+    options = dict(DEFAULT_QUEUE_OPTIONS)
+    options.update(getattr(settings, 'TASK_QUEUES', {}).get(queue, {}))
+    return options
+
+
+def configured_queues():
+    return list(getattr(settings, 'TASK_QUEUES', {}) or ['default'])
+
+
+def task_name(func):
+    """Dotted path for a function or an already dotted string"""
+    if isinstance(func, str):
+        return func
+    return f'{func.__module__}.{func.__qualname__}'
+
+
+def enqueue(func, args=None, kwargs=None, *, queue='default', priority=0,
+            run_at=None, delay=None, max_attempts=None):
+    """
+    Queue ``func(*args, **kwargs)`` to run in a worker.
+
+    ``func`` is a module-level function or its dotted path; arguments must be
+    JSON serialisable. ``delay`` (seconds or timedelta) or ``run_at`` schedule
+    the task for later.
+    """
+    if run_at is None:
+        run_at = timezone.now()
+        if delay:
+            run_at += delay if isinstance(delay, timedelta) else timedelta(seconds=delay)
+    task = Task.objects.create(
+        queue=queue,
+        name=task_name(func),
+        args=list(args or []),
+        kwargs=dict(kwargs or {}),
+        priority=priority,
+        run_at=run_at,
+        max_attempts=max_attempts or getattr(settings, 'TASK_MAX_ATTEMPTS', 5),
+    )
+    if getattr(settings, 'TASK_EAGER', False):
+        # No worker (tests, local development): run what is due after commit
+        transaction.on_commit(run_due)
+    return task
+
+
+def _due(queue, now):
+    """Queued tasks that are due, and running tasks whose lease expired with attempts left"""
+    return Task.objects.filter(queue=queue).filter(
+        Q(status='queued', run_at__lte=now)
+        | Q(status='running', locked_until__lt=now, attempts__lt=F('max_attempts'))
+    )
+
+
+def _fail_abandoned(queue, now):
+    """Fail tasks whose last allowed attempt lost its worker (e.g. the task killed it)"""
+    return Task.objects.filter(
+        queue=queue, status='running', locked_until__lt=now, attempts__gte=F('max_attempts'),
+    ).update(
+        status='failed', finished_at=now, locked_until=None,
+        last_error='Lease expired on the last attempt; the worker stopped while running the task.',
+    )
+
+
+def _claim_fields(worker_id, now, lease):
+    return {
+        'status': 'running',
+        'locked_by': worker_id,
+        'locked_until': now + timedelta(seconds=lease),
+        'attempts': F('attempts') + 1,
+        'started_at': now,
+    }
+
+
+def claim(queue, worker_id):
+    """Lock the next due task of a queue for this worker; returns it or None"""
+    now = timezone.now()
+    lease = queue_options(queue)['lease']
+    _fail_abandoned(queue, now)
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            pk = (
+                _due(queue, now)
+                .select_for_update(skip_locked=True)
+                .order_by(*ORDERING)
+                .values_list('pk', flat=True)
+                .first()
+            )
+            if pk is None:
+                return None
+            Task.objects.filter(pk=pk).update(**_claim_fields(worker_id, now, lease))
+        return Task.objects.get(pk=pk)
+
+    # Lease-based claim: only succeeds if nobody changed the row since we read it
+    candidates = _due(queue, now).order_by(*ORDERING).values('pk', 'status', 'locked_until')
+    for candidate in candidates[:CLAIM_CANDIDATES]:
+        claimed = Task.objects.filter(
+            pk=candidate['pk'],
+            status=candidate['status'],
+            locked_until=candidate['locked_until'],
+        ).update(**_claim_fields(worker_id, now, lease))
+        if claimed:
+            return Task.objects.get(pk=candidate['pk'])
+    return None
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter, in seconds"""
+    base = getattr(settings, 'TASK_RETRY_BASE_DELAY', 10)
+    ceiling = getattr(settings, 'TASK_RETRY_MAX_DELAY', 3600)
+    return min(ceiling, base * 2 ** max(attempts - 1, 0)) * random.uniform(0.8, 1.2)
+
+
+class _LeaseRenewal(threading.Thread):
+    """Extend a running task's lease every third of the lease until stopped"""
+
+    def __init__(self, owned, lease):
+        super().__init__(name='task-lease', daemon=True)
+        self.owned = owned
+        self.lease = lease
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(self.lease / 3):
+                renewed = self.owned.update(locked_until=timezone.now() + timedelta(seconds=self.lease))
+                if not renewed:
+                    logger.warning('Lost the lease on a running task (%s)', self.owned.query)
+                    return
+        finally:
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+
+
+def execute(task):
+    """Run a claimed task and record the outcome; returns True on success"""
+    # Only the worker that still holds the lease may record the result
+    owned = Task.objects.filter(pk=task.pk, status='running', locked_by=task.locked_by, attempts=task.attempts)
+    renewal = _LeaseRenewal(owned, queue_options(task.queue)['lease'])
+    renewal.start()
+    try:
+        import_string(task.name)(*task.args, **task.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        logger.exception('Task %s (%s) failed on attempt %s', task.pk, task.name, task.attempts)
+        now = timezone.now()
+        if task.attempts >= task.max_attempts:
+            owned.update(status='failed', last_error=error, finished_at=now, locked_until=None)
+        else:
+            owned.update(
+                status='queued',
+                last_error=error,
+                run_at=now + timedelta(seconds=retry_delay(task.attempts)),
+                locked_by='',
+                locked_until=None,
+            )
+        return False
+    finally:
+        renewal.stop()
+
+    owned.update(status='done', finished_at=timezone.now(), locked_until=None)
+    return True
+
+
+def run_now(task_pk):
+    """Claim and run one task immediately, whatever its schedule (admin)"""
+    now = timezone.now()
+    claimed = Task.objects.filter(pk=task_pk, status='queued').update(
+        **_claim_fields('eager', now, DEFAULT_QUEUE_OPTIONS['lease'])
+    )
+    if claimed:
+        return execute(Task.objects.get(pk=task_pk))
+    return None
+
+
+def run_due():
+    """Eager mode: run every queued task that is due"""
+    now = timezone.now()
+    due = Task.objects.filter(status='queued', run_at__lte=now).order_by(*ORDERING).values_list('pk', flat=True)
+    for pk in list(due):
+        run_now(pk)
+
+
+def stats():
+    """Depth and latency per queue for the admin"""
+    now = timezone.now()
+    rows = {}
+    for queue in sorted(set(configured_queues()) | set(Task.objects.values_list('queue', flat=True).distinct())):
+        rows[queue] = {
+            'queue': queue,
+            'concurrency': queue_options(queue)['concurrency'],
+            'ready': 0, 'scheduled': 0, 'running': 0, 'failed': 0,
+            'oldest_wait': None, 'avg_wait': None,
+        }
+
+    by_status = Task.objects.exclude(status='done').values('queue', 'status').annotate(
+        total=Count('pk'),
+        ready=Count('pk', filter=Q(run_at__lte=now)),
+        oldest=Min('run_at'),
+    )
+    for row in by_status:
+        entry = rows[row['queue']]
+        if row['status'] == 'queued':
+            entry['ready'] = row['ready']
+            entry['scheduled'] = row['total'] - row['ready']
+            if row['ready']:
+                entry['oldest_wait'] = max(0, (now - row['oldest']).total_seconds())
+        else:
+            entry[row['status']] = row['total']
+
+    # Average time from due to started over the last hour's work
+    recent = Task.objects.filter(
+        started_at__gte=now - timedelta(hours=1), started_at__isnull=False
+    ).values_list('queue', 'run_at', 'started_at')[:1000]
+    waits = {}
+    for queue, run_at, started_at in recent:
+        waits.setdefault(queue, []).append(max(0, (started_at - run_at).total_seconds()))
+    for queue, values in waits.items():
+        rows[queue]['avg_wait'] = sum(values) / len(values)
+    return list(rows.values())
@@ -0,0 +1,80 @@
+"""
+Worker process for the database task queue
+
+One thread per concurrency slot of every served queue; each thread claims a
+task, runs it, and sleeps for the poll interval when its queue is empty.
+"""
+import logging
+import os
+import socket
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+from . import queue as task_queue
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    """Runs queued tasks until stopped (or, with ``once``, until queues are empty)"""
+
+    def __init__(self, queues=None, concurrency=None, poll_interval=None, once=False):
+        self.queues = queues or task_queue.configured_queues()
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval or getattr(settings, 'TASK_POLL_INTERVAL', 1)
+        self.once = once
+        self.stop_event = threading.Event()
+        self.processed = 0
+        self.failed = 0
+        self._counter_lock = threading.Lock()
+        self._identity = f'{socket.gethostname()}:{os.getpid()}'
+
+    def slots(self):
+        for queue in self.queues:
+            count = self.concurrency or task_queue.queue_options(queue)['concurrency']
+            for slot in range(max(1, count)):
+                yield queue, slot
+
+    def run(self):
+        threads = [
+            threading.Thread(target=self._loop, args=(queue, slot), name=f'worker-{queue}-{slot}', daemon=True)
+            for queue, slot in self.slots()
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(timeout=0.5)
+        except KeyboardInterrupt:
+            self.stop()
+            for thread in threads:
+                thread.join()
+
+    def stop(self):
+        """Finish the tasks in progress, then exit"""
+        self.stop_event.set()
+
+    def _loop(self, queue, slot):
+        worker_id = f'{self._identity}:{queue}:{slot}'
+        try:
+            while not self.stop_event.is_set():
+                close_old_connections()
+                try:
+                    task = task_queue.claim(queue, worker_id)
+                except Exception:
+                    logger.exception('Could not claim a task from %s', queue)
+                    task = None
+                if task is None:
+                    if self.once:
+                        break
+                    self.stop_event.wait(self.poll_interval)
+                    continue
+                succeeded = task_queue.execute(task)
+                with self._counter_lock:
+                    self.processed += 1
+                    self.failed += not succeeded
+        finally:
+            connection.close()